@@ -0,0 +1,264 @@
+"""
+行情/回测 JSON 接口 - 按需返回数据切片，替代前端整份下载静态文件
+
+接口：
+  GET /signal                                  当前 RSI 信号（字段同 docs/data.json）
+  GET /equity?strategy=strategy_ideal&from=2023-01-01&to=2024-12-31
+                                               某条策略/基准净值曲线的日期区间切片
+  GET /backtest?period=15&buy=32&sell=77       任意参数的 RSI 回测（向量化引擎，联接基金模式）
+
+缓存：
+  - 指标状态（MonitorState）常驻内存，--monitor 时同进程内按间隔轮询实时行情
+  - backtest_result.json 只在文件更新后重新解析，价格走 backtest_prices.npy 内存映射
+  - 响应体按 (接口, 参数, 数据版本) 缓存，已压缩的 gzip 结果一并缓存
+  - 带 ETag / Last-Modified，客户端重复请求命中时返回 304
+
+用法：
+  python api_server.py                        # http://127.0.0.1:5000
+  python api_server.py --monitor --port 8000  # 同时启动实时行情轮询
+"""
+
+import os
+import gzip
+import json
+import bisect
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+from flask import Flask, request, Response
+
+import github_action_runner as runner  # 同时把 backtest/ 加入 sys.path
+from monitor_daemon import MonitorState, create_scheduler, create_quote_source, DEFAULT_INTERVAL
+from price_store import RESULT_JSON, load_strategy_prices
+from result_format import load_result as read_result
+from vector_engine import INITIAL_CAPITAL, rsi_ema_matrix, resolve_positions, equity_fractional, \
+    extract_trades, batch_metrics
+
+CACHE_SIZE = 256
+GZIP_MIN_SIZE = 1024
+
+app = Flask(__name__)
+state = MonitorState()
+
+
+# ============ 响应缓存 ============
+
+class ResponseCache:
+    """LRU 响应缓存：key -> (body, gzip_body, etag, last_modified)"""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, build):
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                return self.items[key]
+        payload, mtime = build()
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        entry = (
+            body,
+            gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None,
+            '"' + hashlib.md5(body).hexdigest() + '"',
+            datetime.fromtimestamp(mtime, timezone.utc).replace(microsecond=0),
+        )
+        with self.lock:
+            self.items[key] = entry
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+        return entry
+
+
+cache = ResponseCache()
+
+
+def cached_response(key, build, max_age=0):
+    """按缓存结果返回 JSON，处理条件请求与 gzip"""
+    body, gzip_body, etag, last_modified = cache.get(key, build)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': last_modified.strftime('%a, %d %b %Y %H:%M:%S GMT'),
+        'Cache-Control': f'public, max-age={max_age}',
+        'Vary': 'Accept-Encoding',
+    }
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag.strip('"'))
+    else:
+        since = request.if_modified_since
+        not_modified = since is not None and last_modified <= since
+    if not_modified:
+        return Response(status=304, headers=headers)
+
+    if gzip_body is not None and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        body = gzip_body
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, mimetype='application/json', headers=headers)
+
+
+def error_response(message, status=400):
+    body = json.dumps({'error': message}, ensure_ascii=False)
+    return Response(body, status=status, mimetype='application/json')
+
+
+# ============ 数据加载 ============
+
+_result_lock = threading.Lock()
+_result = {'mtime': None, 'data': None, 'dates': {}}
+
+
+def load_result():
+    """读取 backtest_result.json（文件更新后才重新解析）
+
+    Returns:
+        (data, mtime)
+    """
+    mtime = os.path.getmtime(RESULT_JSON)
+    with _result_lock:
+        if _result['mtime'] != mtime:
+            _result['data'] = read_result(RESULT_JSON)
+            _result['dates'] = {}
+            _result['mtime'] = mtime
+        return _result['data'], mtime
+
+
+def series_dates(name, values):
+    """某条曲线的日期列表（用于二分查找，随结果文件一起缓存）"""
+    with _result_lock:
+        if name not in _result['dates']:
+            _result['dates'][name] = [d['date'] for d in values]
+        return _result['dates'][name]
+
+
+_prices_lock = threading.Lock()
+_prices = {'mtime': None, 'df': None}
+
+
+def load_prices():
+    """策略标的日线（内存映射价格文件，结果文件更新后重新加载）
+
+    Returns:
+        (DataFrame, mtime)
+    """
+    mtime = os.path.getmtime(RESULT_JSON)
+    with _prices_lock:
+        if _prices['mtime'] != mtime:
+            _prices['df'] = load_strategy_prices()
+            _prices['mtime'] = mtime
+        return _prices['df'], mtime
+
+
+# ============ 接口 ============
+
+@app.route('/signal')
+def signal():
+    if state.history is None:
+        state.refresh_history()
+    status = state.status()
+    if status is None:
+        return error_response('暂无行情数据', 503)
+
+    def build():
+        data = runner.build_status_data(status['rsi'], status['price'])
+        data['quote_time'] = status['time']
+        return data, datetime.now().timestamp()
+
+    return cached_response(('signal', status['time'], status['price']), build)
+
+
+@app.route('/equity')
+def equity():
+    strategy = request.args.get('strategy', 'strategy')
+    start = request.args.get('from')
+    end = request.args.get('to')
+    try:
+        data, mtime = load_result()
+    except FileNotFoundError:
+        return error_response('回测结果不存在，请先运行 generate_multi_strategy_data.py', 503)
+
+    series = data.get('daily_values', {})
+    if strategy not in series:
+        return error_response(f"未知策略: {strategy}，可选 {', '.join(series)}", 404)
+
+    def build():
+        values = series[strategy]
+        dates = series_dates(strategy, values)
+        lo = bisect.bisect_left(dates, start) if start else 0
+        hi = bisect.bisect_right(dates, end) if end else len(dates)
+        return {
+            'strategy': strategy,
+            'statistics': data.get('statistics', {}).get(strategy),
+            'daily_values': values[lo:hi],
+        }, mtime
+
+    return cached_response(('equity', strategy, start, end, mtime), build, max_age=300)
+
+
+@app.route('/backtest')
+def backtest():
+    # 参数格式错误时取默认值
+    period = request.args.get('period', runner.RSI_PERIOD, type=int)
+    buy = request.args.get('buy', runner.RSI_BUY_THRESHOLD, type=float)
+    sell = request.args.get('sell', runner.RSI_SELL_THRESHOLD, type=float)
+    if not (2 <= period <= 250 and 0 <= buy < sell <= 100):
+        return error_response('参数超出范围：period 2-250，0 <= buy < sell <= 100')
+    start = request.args.get('from')
+    try:
+        start_date = datetime.strptime(start, '%Y-%m-%d') if start else None
+    except ValueError:
+        return error_response(f"from 日期格式应为 YYYY-MM-DD: {start}")
+    try:
+        df, mtime = load_prices()
+    except FileNotFoundError as e:
+        return error_response(str(e), 503)
+
+    def build():
+        window = df[df['date'] >= start_date] if start_date else df
+        dates = window['date'].reset_index(drop=True)
+        close = window['close'].to_numpy()
+        if len(close) < 2:
+            raise ValueError('区间内数据不足')
+        rsi = rsi_ema_matrix(close, [period])
+        position = resolve_positions(rsi < buy, rsi > sell)
+        equity_curve = equity_fractional(close, position)
+        metrics = batch_metrics(dates, close, position, equity_curve)
+        return {
+            'params': {'period': period, 'buy': buy, 'sell': sell, 'from': start},
+            'statistics': {k: round(v[0].item(), 2) for k, v in metrics.items()},
+            'dates': dates.dt.strftime('%Y-%m-%d').tolist(),
+            'total_value': np.round(equity_curve[:, 0], 2).tolist(),
+            'trades': extract_trades(dates, close, position[:, 0], INITIAL_CAPITAL),
+        }, mtime
+
+    try:
+        return cached_response(('backtest', period, buy, sell, start, mtime), build, max_age=3600)
+    except ValueError as e:
+        return error_response(str(e))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="RSI 信号/回测 JSON 接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 5000)))
+    parser.add_argument("--monitor", action="store_true", help="同进程内轮询实时行情，/signal 返回盘中 RSI")
+    parser.add_argument("--interval", type=int, default=DEFAULT_INTERVAL)
+    parser.add_argument("--quote-source", default=os.environ.get("QUOTE_SOURCE", "eastmoney"),
+                        choices=["eastmoney", "stub"])
+    args = parser.parse_args()
+
+    state.refresh_history()
+    if args.monitor:
+        source = create_quote_source(args.quote_source, start_price=state.last_close or 1.0)
+        create_scheduler(state, source, args.interval, background=True).start()
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
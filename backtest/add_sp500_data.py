@@ -2,15 +2,13 @@
 添加标普500ETF数据到回测结果
 """
 import pandas as pd
-import json
 import os
-import time
 
-try:
-    import akshare as ak
-except ImportError:
-    print("请先安装 akshare: pip install akshare")
-    exit(1)
+from market_data import get_etf_history
+from trading_calendar import date_labels
+from result_format import load_result
+from result_export import export_result
+from build_cache import code_hash, content_hash, data_hash
 
 INITIAL_CAPITAL = 100000
 SP500_CODE = "513500"
@@ -20,25 +18,15 @@ def get_sp500_data():
     """获取标普500ETF数据"""
     print(f"正在获取 {SP500_NAME} ({SP500_CODE}) 数据...")
     
-    import requests
-    requests.adapters.DEFAULT_RETRIES = 5
-    
-    for retry in range(5):
-        try:
-            df = ak.fund_etf_hist_em(symbol=SP500_CODE, period="daily", adjust="qfq")
-            df['日期'] = pd.to_datetime(df['日期'])
-            df = df.rename(columns={
-                '日期': 'date',
-                '收盘': 'close'
-            })
-            df = df[['date', 'close']].sort_values('date').reset_index(drop=True)
-            print(f"获取到 {len(df)} 条数据，从 {df['date'].min()} 到 {df['date'].max()}")
-            return df
-        except Exception as e:
-            print(f"尝试 {retry + 1}/5 失败: {e}")
-            time.sleep(3)
-    
-    return None
+    try:
+        # 重试与退避由 fetch_retry.call_with_retry 统一处理
+        df = get_etf_history(SP500_CODE, period="daily", adjust="qfq")
+        df = df[['date', 'close']]
+        print(f"获取到 {len(df)} 条数据，从 {df['date'].min()} 到 {df['date'].max()}")
+        return df
+    except Exception as e:
+        print(f"获取数据失败: {e}")
+        return None
 
 def calculate_daily_values(df, start_date, end_date):
     """计算每日收益率"""
@@ -54,8 +42,7 @@ def calculate_daily_values(df, start_date, end_date):
     remaining_cash = INITIAL_CAPITAL - shares * start_price
     
     daily_values = []
-    for _, row in df.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
+    for (_, row), date_str in zip(df.iterrows(), date_labels(df['date'])):
         price = row['close']
         
         total_value = remaining_cash + shares * price
@@ -72,8 +59,7 @@ def main():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     json_file = os.path.join(script_dir, "backtest_result.json")
     
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_result(json_file)
     
     start_date = pd.to_datetime(data['meta']['start_date'])
     end_date = pd.to_datetime(data['meta']['end_date'])
@@ -87,6 +73,13 @@ def main():
         print("无法获取标普500数据")
         return
     
+    # 行情、计算代码、回测日期范围都与上次相同时无需重写结果文件
+    build_key = content_hash(data_hash(sp500_df), code_hash(calculate_daily_values),
+                             data['meta']['start_date'], data['meta']['end_date'])
+    if data['meta'].get('build', {}).get('sp500') == build_key:
+        print("标普500数据未变化，结果文件无需更新")
+        return
+    
     # 计算收益
     sp500_values = calculate_daily_values(sp500_df, start_date, end_date)
     
@@ -105,18 +98,14 @@ def main():
     
     # 更新数据
     data['daily_values']['sp500'] = sp500_values
+    data['meta'].setdefault('build', {})['sp500'] = build_key
     data['statistics']['sp500_return'] = round(total_return, 2)
     data['statistics']['sp500_annual'] = round(annual_return, 2)
     
-    # 保存更新后的数据
-    with open(json_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"\n数据已更新至: {json_file}")
-    
-    # 同时更新 docs 目录
+    # 保存更新后的数据，同时更新 docs 目录
     docs_file = os.path.join(os.path.dirname(script_dir), "docs", "backtest_result.json")
-    with open(docs_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False)
+    export_result(data, json_file, docs_file)
+    print(f"\n数据已更新至: {json_file}")
     print(f"网页数据已更新至: {docs_file}")
 
 if __name__ == "__main__":
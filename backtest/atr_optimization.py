@@ -0,0 +1,155 @@
+"""
+MA + ATR 止损策略参数优化 - 红利低波ETF (512890)
+
+策略逻辑（与 generate_multi_strategy_data.run_backtest_atr_trailing 一致）：
+  买入信号：收盘价站上长期均线 MA(ma_window)
+  卖出信号：收盘价跌破止损线
+    - 'ma' 模式：MA - atr_mult × ATR(atr_window)（现有策略口径）
+    - 'trailing' 模式：入场以来最高收盘价 - atr_mult × ATR（吊灯式移动止损）
+  交易方式：场内ETF整手（100份）
+
+计算方式：
+  vector_engine 批量计算均线/ATR 矩阵，(ma_window × atr_window × atr_mult)
+  网格一次求解持仓；移动止损使用分段累计最大值 + 向量化查找离场日
+
+数据源：
+  本地 backtest_prices.npy（price_store.load_strategy_prices 内存映射读取，
+  不存在或比 backtest_result.json 旧时自动重建），避免网络问题
+"""
+
+import os
+import json
+from datetime import datetime
+import pandas as pd
+import numpy as np
+
+from price_store import load_strategy_prices
+from vector_engine import (
+    sma_matrix, atr_matrix, trailing_stop_positions,
+    equity_lots, batch_metrics, metrics_table, extract_trades,
+)
+
+INITIAL_CAPITAL = 100000
+ETF_CODE = "512890"
+
+# 优化范围
+MA_WINDOW_RANGE = range(20, 161, 10)                   # 均线窗口：20-160 日，步长 10
+ATR_WINDOW_RANGE = range(7, 29, 7)                     # ATR 窗口：7/14/21/28 日
+ATR_MULT_RANGE = np.round(np.arange(0.5, 4.01, 0.5), 2)  # ATR 倍数：0.5-4.0，步长 0.5
+STOP_MODES = ['ma', 'trailing']
+
+
+def fetch_etf_local():
+    """从本地价格文件（backtest_prices.npy）读取 ETF 数据"""
+    return load_strategy_prices()
+
+
+def atr_positions(close, ma_windows, atr_windows, atr_mults, stop_mode='ma'):
+    """批量求解持仓矩阵
+
+    Returns:
+        (position, params)：position 形状为 (交易日, 组合)，
+        params 为每列对应的 ma_window / atr_window / atr_mult
+    """
+    close = np.asarray(close, dtype=np.float64)
+    ma_windows = np.asarray(list(ma_windows))
+    atr_windows = np.asarray(list(atr_windows))
+    atr_mults = np.asarray(list(atr_mults), dtype=np.float64)
+    n_days = len(close)
+
+    ma = sma_matrix(close, ma_windows)
+    atr = atr_matrix(close, atr_windows)
+
+    # (交易日, 均线, ATR窗口, 倍数) 广播后展平为 (交易日, 组合)
+    shape = (n_days, len(ma_windows), len(atr_windows), len(atr_mults))
+    ma_grid = np.broadcast_to(ma[:, :, None, None], shape).reshape(n_days, -1)
+    offset = (atr[:, None, :, None] * atr_mults[None, None, None, :])
+    offset = np.broadcast_to(offset, shape).reshape(n_days, -1)
+
+    with np.errstate(invalid='ignore'):
+        buy = close[:, None] > ma_grid
+    floor = ma_grid if stop_mode == 'ma' else None
+    position = trailing_stop_positions(close, buy, offset, floor=floor)
+
+    mesh = np.meshgrid(ma_windows, atr_windows, atr_mults, indexing='ij')
+    params = {
+        'ma_window': mesh[0].ravel(),
+        'atr_window': mesh[1].ravel(),
+        'atr_mult': mesh[2].ravel(),
+    }
+    return position, params
+
+
+def sweep_atr(df, ma_windows=MA_WINDOW_RANGE, atr_windows=ATR_WINDOW_RANGE,
+              atr_mults=ATR_MULT_RANGE, stop_mode='ma'):
+    """向量化网格扫描：返回 参数组合 × 指标 表格"""
+    close = df['close'].to_numpy(dtype=np.float64)
+    position, params = atr_positions(close, ma_windows, atr_windows, atr_mults, stop_mode)
+    equity = equity_lots(close, position, INITIAL_CAPITAL)
+    metrics = batch_metrics(df['date'], close, position, equity, INITIAL_CAPITAL)
+    table = metrics_table(params, metrics)
+    table.insert(0, 'stop_mode', stop_mode)
+    return table
+
+
+def atr_trades(df, ma_window=60, atr_window=14, atr_mult=2, stop_mode='ma'):
+    """单组参数的交易记录（默认 60/14/2 与现有策略交易记录一致）"""
+    close = df['close'].to_numpy(dtype=np.float64)
+    position, _ = atr_positions(close, [ma_window], [atr_window], [atr_mult], stop_mode)
+    return extract_trades(df['date'], close, position[:, 0], INITIAL_CAPITAL,
+                          lot_size=100, signals=('MA+ATR 入场', '跌破ATR止损'))
+
+
+def main():
+    print("=" * 80)
+    print("MA + ATR 止损策略参数优化 - 红利低波ETF (512890)")
+    print("=" * 80)
+
+    df = fetch_etf_local()
+    print(f"数据范围: {df['date'].min().date()} 至 {df['date'].max().date()} 共 {len(df)} 条")
+
+    table = pd.concat([sweep_atr(df, stop_mode=mode) for mode in STOP_MODES], ignore_index=True)
+    print(f"测试了 {len(table)} 组参数组合")
+
+    table['sharpe_like'] = table['annual_return'] / (table['max_drawdown'] + 1)
+    by_total = table.sort_values('total_return', ascending=False, kind='stable')
+    by_sharpe = table.sort_values('sharpe_like', ascending=False, kind='stable')
+
+    print("\nTop 10 参数组合 (按总收益):")
+    print(f"{'排名':<4} {'模式':<10} {'均线':<6} {'ATR':<6} {'倍数':<6} {'总收益':<10} {'年化':<8} {'回撤':<8} {'交易次数':<8}")
+    print("-" * 80)
+    for i, (_, r) in enumerate(by_total.head(10).iterrows(), 1):
+        print(f"{i:<4} {r['stop_mode']:<10} {int(r['ma_window']):<6} {int(r['atr_window']):<6} {r['atr_mult']:<6.1f} "
+              f"{r['total_return']:<10.2f}% {r['annual_return']:<8.2f}% {r['max_drawdown']:<8.2f}% "
+              f"{int(r['trade_count']):<8}")
+
+    best = by_total.iloc[0]
+    best_trades = atr_trades(df, int(best['ma_window']), int(best['atr_window']),
+                             float(best['atr_mult']), best['stop_mode'])
+
+    # 保存结果
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    output = {
+        'meta': {
+            'etf_code': ETF_CODE,
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'ma_window_range': list(MA_WINDOW_RANGE),
+            'atr_window_range': list(ATR_WINDOW_RANGE),
+            'atr_mult_range': list(map(float, ATR_MULT_RANGE)),
+            'stop_modes': STOP_MODES,
+            'total_combinations': len(table),
+            'strategy': '站上均线买入, 跌破 ATR 止损线卖出（场内整手）',
+        },
+        'best_by_total_return': by_total.iloc[0].to_dict(),
+        'best_by_sharpe': by_sharpe.iloc[0].to_dict(),
+        'best_trades': best_trades,
+        'top_30': by_total.head(30).to_dict(orient='records'),
+    }
+    out_file = os.path.join(script_dir, 'atr_optimization_results.json')
+    with open(out_file, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2, default=float)
+    print(f"\n结果已保存: {out_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+回测统计指标 - 向量化计算，单条曲线与 策略 × 交易日 矩阵通用
+
+替代各脚本中重复的 calculate_statistics（逐日循环找峰值、按序号配对买卖、strptime 解析日期）：
+  - 总收益 / 年化收益：年化按自然日天数，日期转 datetime64[D] 整数相减
+  - 最大回撤与最长水下天数：np.maximum.accumulate
+  - 胜率：第 i 次卖出对第 i 次买入，数组比较
+  - Sharpe / Sortino：日收益率，无风险利率取 0，按 √252 年化；Calmar = 年化收益 / 最大回撤
+  - 持仓占比 exposure：由交易日期 searchsorted 得到每日是否持仓（%）
+
+矩阵输入时最后一维为交易日，各行共用同一日期轴。
+
+滚动窗口指标（rolling_metrics）同样作用于 策略 × 交易日 矩阵，窗口按交易日数计：
+  - 滚动收益：错位相除
+  - 滚动波动率：日收益及其平方的累计和相减得到窗口内的和
+  - 滚动最大回撤：滑动窗口视图上 np.maximum.accumulate 得到窗口内峰值，按块处理控制内存
+窗口未满的位置为 NaN。
+engine_state 的终态累计同样的矩（日收益之和 / 平方和 / 下行平方和），续算时由 risk_ratios 得到相同指标。
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from vector_engine import INITIAL_CAPITAL
+
+TRADING_DAYS = 252
+# 滚动最大回撤每块处理的元素数上限（策略数 × 窗口数 × 窗口长度）
+ROLLING_CHUNK = 4_000_000
+
+
+def day_numbers(dates):
+    """日期序列（'YYYY-MM-DD' 字符串 / datetime / datetime64）-> int64 天数"""
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+
+def annualized_return(total_return, calendar_days):
+    """总收益率（%）按自然日天数复利年化（%），天数为 0 时为 0"""
+    total_return = np.asarray(total_return, dtype=np.float64)
+    calendar_days = np.asarray(calendar_days)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annual = ((1 + total_return / 100) ** (365 / calendar_days) - 1) * 100
+    return np.where(calendar_days > 0, annual, 0.0)
+
+
+def drawdown_stats(equity):
+    """最大回撤（%，峰值从首日净值起算）与最长水下持续（交易日数），沿最后一维"""
+    equity = np.asarray(equity, dtype=np.float64)
+    peak = np.maximum.accumulate(equity, axis=-1)
+    max_drawdown = ((peak - equity) / peak * 100).max(axis=-1)
+    idx = np.arange(equity.shape[-1])
+    last_peak = np.maximum.accumulate(np.where(equity >= peak, idx, 0), axis=-1)
+    return max_drawdown, (idx - last_peak).max(axis=-1)
+
+
+def return_moments(equity):
+    """日收益率的个数、和、平方和、下行平方和（沿最后一维）"""
+    equity = np.asarray(equity, dtype=np.float64)
+    r = equity[..., 1:] / equity[..., :-1] - 1
+    return r.shape[-1], r.sum(axis=-1), (r * r).sum(axis=-1), (np.minimum(r, 0) ** 2).sum(axis=-1)
+
+
+def risk_ratios(n, sum_r, sum_r2, sum_down2, annual_return, max_drawdown):
+    """由日收益率的矩得到 Sharpe / Sortino / Calmar（可广播；分母为 0 时记 0）"""
+    n = np.asarray(n, dtype=np.float64)
+    annual_return = np.asarray(annual_return, dtype=np.float64)
+    max_drawdown = np.asarray(max_drawdown, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = sum_r / n
+        std = np.sqrt(np.maximum(sum_r2 - sum_r * mean, 0) / (n - 1))
+        downside = np.sqrt(sum_down2 / n)
+        sharpe = np.where((n > 1) & (std > 0), mean / std * np.sqrt(TRADING_DAYS), 0.0)
+        sortino = np.where((n > 0) & (downside > 0), mean / downside * np.sqrt(TRADING_DAYS), 0.0)
+        calmar = np.where(max_drawdown > 0, annual_return / max_drawdown, 0.0)
+    return sharpe, sortino, calmar
+
+
+def trade_arrays(trades):
+    """交易记录 -> (买入日, 买入价, 卖出日, 卖出价) 数组"""
+    buys = [t for t in trades if t['action'] == '买入']
+    sells = [t for t in trades if t['action'] == '卖出']
+    return (day_numbers([t['date'] for t in buys]), np.array([t['price'] for t in buys], dtype=np.float64),
+            day_numbers([t['date'] for t in sells]), np.array([t['price'] for t in sells], dtype=np.float64))
+
+
+def win_rate(buy_prices, sell_prices):
+    """胜率（%）：第 i 次卖出价高于第 i 次买入价记为盈利"""
+    k = min(len(buy_prices), len(sell_prices))
+    if not len(sell_prices):
+        return 0.0
+    return np.count_nonzero(sell_prices[:k] > buy_prices[:k]) / len(sell_prices) * 100
+
+
+def held_mask(days, buy_days, sell_days):
+    """每日收盘后是否持仓（交易严格交替：已发生买入次数多于卖出次数）"""
+    return (np.searchsorted(np.sort(buy_days), days, side='right')
+            > np.searchsorted(np.sort(sell_days), days, side='right'))
+
+
+def batch_statistics(equity, dates, trades=None, initial_capital=INITIAL_CAPITAL):
+    """策略 × 交易日 净值矩阵（或单条曲线）的统计指标
+
+    Args:
+        equity: (策略数, 交易日数) 或 (交易日数,) 净值
+        dates: 共用日期轴
+        trades: 每条策略的交易记录列表（可省略，省略时不计胜率 / 持仓占比）
+
+    Returns:
+        dict，每项为长度等于策略数的数组（单条曲线时为标量）
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    days = day_numbers(dates)
+    calendar_days = int(days[-1] - days[0]) if len(days) else 0
+
+    total_return = (equity[..., -1] / initial_capital - 1) * 100
+    annual_return = annualized_return(total_return, calendar_days)
+    max_drawdown, max_drawdown_days = drawdown_stats(equity)
+    sharpe, sortino, calmar = risk_ratios(*return_moments(equity), annual_return, max_drawdown)
+    stats = {
+        'total_return': total_return,
+        'annual_return': annual_return,
+        'max_drawdown': max_drawdown,
+        'max_drawdown_days': max_drawdown_days,
+        'sharpe': sharpe,
+        'sortino': sortino,
+        'calmar': calmar,
+    }
+    if trades is not None:
+        rows = [trades] if equity.ndim == 1 else trades
+        counts, rates, exposure = [], [], []
+        for row_trades in rows:
+            buy_days, buy_prices, sell_days, sell_prices = trade_arrays(row_trades)
+            counts.append(len(buy_prices))
+            rates.append(win_rate(buy_prices, sell_prices))
+            exposure.append(held_mask(days, buy_days, sell_days).mean() * 100 if len(days) else 0.0)
+        unpack = (lambda v: v[0]) if equity.ndim == 1 else np.asarray
+        stats.update(trade_count=unpack(counts), win_rate=unpack(rates), exposure=unpack(exposure))
+    return stats
+
+
+def calculate_statistics(daily_values, trades, position=None, initial_capital=INITIAL_CAPITAL):
+    """计算单条策略的统计指标
+
+    Args:
+        daily_values: 每日净值列表（date / total_value / return）
+        trades: 交易记录列表（action / date / price）
+        position: 持仓占比的口径，默认由交易记录推出；买入持有等无交易曲线可传 1 表示始终持仓
+
+    Returns:
+        dict：total_return / annual_return / max_drawdown / max_drawdown_days / trade_count /
+              win_rate / sharpe / sortino / calmar / exposure / start_date / end_date / days / calendar_days
+    """
+    if not daily_values:
+        return {}
+
+    days = day_numbers([d['date'] for d in daily_values])
+    equity = np.array([d['total_value'] for d in daily_values], dtype=np.float64)
+    calendar_days = int(days[-1] - days[0])
+    total_return = daily_values[-1]['return']
+    annual_return = float(annualized_return(total_return, calendar_days))
+    max_drawdown, max_drawdown_days = drawdown_stats(equity)
+    sharpe, sortino, calmar = risk_ratios(*return_moments(equity), annual_return, max_drawdown)
+
+    buy_days, buy_prices, sell_days, sell_prices = trade_arrays(trades)
+    if position is None:
+        exposure = held_mask(days, buy_days, sell_days).mean() * 100
+    else:
+        exposure = np.mean(np.broadcast_to(np.asarray(position) > 0, days.shape)) * 100
+
+    return {
+        'total_return': round(total_return, 2),
+        'annual_return': round(annual_return, 2),
+        'max_drawdown': round(float(max_drawdown), 2),
+        'max_drawdown_days': int(max_drawdown_days),
+        'trade_count': len(buy_prices),
+        'win_rate': round(float(win_rate(buy_prices, sell_prices)), 2),
+        'sharpe': round(float(sharpe), 2),
+        'sortino': round(float(sortino), 2),
+        'calmar': round(float(calmar), 2),
+        'exposure': round(float(exposure), 2),
+        'start_date': daily_values[0]['date'],
+        'end_date': daily_values[-1]['date'],
+        'days': len(daily_values),
+        'calendar_days': calendar_days
+    }
+
+
+def _window_sums(x, window):
+    """沿最后一维的滑动窗口和（累计和相减），长度 n - window + 1"""
+    c = np.cumsum(x, axis=-1)
+    c = np.concatenate([np.zeros(c.shape[:-1] + (1,)), c], axis=-1)
+    return c[..., window:] - c[..., :-window]
+
+
+def _rolling_frame(equity):
+    equity = np.asarray(equity, dtype=np.float64)
+    return equity, np.full(equity.shape, np.nan)
+
+
+def rolling_return(equity, window=TRADING_DAYS):
+    """滚动收益率（%）：第 t 日净值相对 window 个交易日前"""
+    equity, out = _rolling_frame(equity)
+    if equity.shape[-1] > window:
+        out[..., window:] = (equity[..., window:] / equity[..., :-window] - 1) * 100
+    return out
+
+
+def rolling_volatility(equity, window=TRADING_DAYS):
+    """滚动年化波动率（%）：截至第 t 日的 window 个日收益率的样本标准差 × √252"""
+    equity, out = _rolling_frame(equity)
+    if equity.shape[-1] > window > 1:
+        r = equity[..., 1:] / equity[..., :-1] - 1
+        # 先减去整体均值，降低累计和相减的舍入误差（方差不变）
+        r = r - r.mean(axis=-1, keepdims=True)
+        s1 = _window_sums(r, window)
+        s2 = _window_sums(r * r, window)
+        var = np.maximum(s2 - s1 * s1 / window, 0) / (window - 1)
+        out[..., window:] = np.sqrt(var * TRADING_DAYS) * 100
+    return out
+
+
+def rolling_max_drawdown(equity, window=TRADING_DAYS, chunk=ROLLING_CHUNK):
+    """滚动最大回撤（%）：第 t - window 至 t 日窗口内的最大回撤（峰值从窗口首日起算）"""
+    equity, out = _rolling_frame(equity)
+    if equity.shape[-1] > window:
+        views = sliding_window_view(equity, window + 1, axis=-1)
+        count = views.shape[-2]
+        rows = int(np.prod(equity.shape[:-1], dtype=np.int64))
+        step = max(1, chunk // (rows * (window + 1)))
+        for a in range(0, count, step):
+            block = views[..., a:a + step, :]
+            peak = np.maximum.accumulate(block, axis=-1)
+            out[..., window + a:window + a + block.shape[-2]] = ((peak - block) / peak).max(axis=-1) * 100
+    return out
+
+
+def rolling_metrics(equity, window=TRADING_DAYS):
+    """策略 × 交易日 净值矩阵（或单条曲线）的滚动收益 / 波动率 / 最大回撤，形状与输入相同"""
+    return {
+        'return': rolling_return(equity, window),
+        'volatility': rolling_volatility(equity, window),
+        'max_drawdown': rolling_max_drawdown(equity, window),
+    }
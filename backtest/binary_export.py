@@ -0,0 +1,162 @@
+"""
+二进制列式导出 - 价格与净值曲线写成小端 typed array，NumPy / 浏览器零拷贝读取
+
+JSON 中每个数都要按文本解析；同样的曲线写成定长二进制后，
+Python 端内存映射即可使用，网页端直接在 ArrayBuffer 上建 Float32Array 视图。
+
+backtest_result.bin 布局（小端）：
+  0     4 字节   魔数 b'RSIB'
+  4     uint32   版本（BINARY_VERSION）
+  8     uint32   头部长度 H（UTF-8 JSON，末尾空格补齐，使数据区起点 8 字节对齐）
+  12    H 字节   头部 JSON
+  12+H  数据区：各缓冲区依次排列，起点均 8 字节对齐
+
+头部：
+  {
+    "version": 1,
+    "meta": {...},                                        # 与结果文件的 meta 相同
+    "dates": {"offset": 0, "dtype": "<i4", "length": N},  # 共用日期轴：距 1970-01-01 的天数
+    "series": {
+      "strategy": {"start": 0, "length": N,              # 在日期轴上连续时记起点和长度
+                   "columns": {"close": {"offset": ..., "dtype": "<f8", "length": N}, ...}},
+      "nasdaq": {"index": {"offset": ..., "dtype": "<i4", "length": M}, "columns": {...}}
+    }
+  }
+offset 相对数据区起点。数值按与 JSON 相同的小数位舍入（null 记为 NaN），
+close 与金额 / 份额列（total_value / cash / shares，量级达 1e5，float32 误差会超过舍入精度）存为 float64，
+与 JSON 数值相同；其余列（收益率、RSI、回撤等）存为 float32，与 JSON 的差异在 float32 精度（约 7 位有效数字）以内。
+统计数据、交易记录等非数组字段仍在 JSON / 分片清单中。
+
+读取：Python 用 load_binary()，网页用 docs/result_format.js 的 loadBinaryResult()
+"""
+
+import os
+import json
+import struct
+
+import numpy as np
+
+from result_format import DEFAULT_PRECISION, PRECISION, dumps, series_columns, series_dates, write_atomic
+
+MAGIC = b'RSIB'
+BINARY_VERSION = 1
+PREAMBLE = struct.Struct('<4sII')
+ALIGNMENT = 8
+
+# 各字段的存储类型，未列出的数值列为 DEFAULT_DTYPE
+COLUMN_DTYPES = {
+    'close': '<f8',
+    'total_value': '<f8',
+    'cash': '<f8',
+    'shares': '<f8',
+}
+DEFAULT_DTYPE = '<f4'
+
+
+def binary_path(path):
+    """backtest_result.json -> backtest_result.bin"""
+    root, _ = os.path.splitext(path)
+    return f"{root}.bin"
+
+
+def _numeric(values):
+    """数值列转 float64（None -> NaN），含非数值时返回 None（不导出）"""
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'iuf':
+        return values.astype(np.float64)
+    try:
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+
+
+class _BufferWriter:
+    """按 8 字节对齐依次追加缓冲区，记录偏移"""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def add(self, arr):
+        body = np.ascontiguousarray(arr).tobytes()
+        desc = {'offset': self.offset, 'dtype': arr.dtype.str, 'length': len(arr)}
+        pad = -len(body) % ALIGNMENT
+        self.chunks.append(body + b'\0' * pad)
+        self.offset += len(body) + pad
+        return desc
+
+
+def build_binary(export_data):
+    """生成头部和数据区缓冲区
+
+    Returns:
+        (header dict, bytes 列表)
+    """
+    daily_values = export_data.get('daily_values', {})
+    axis = sorted({d for series in daily_values.values() for d in series_dates(series)})
+    position = {d: i for i, d in enumerate(axis)}
+
+    writer = _BufferWriter()
+    header = {
+        'version': BINARY_VERSION,
+        'meta': export_data.get('meta', {}),
+        'dates': writer.add(np.array(axis, dtype='datetime64[D]').astype('<i4')),
+        'series': {},
+    }
+    for name, series in daily_values.items():
+        idx = np.array([position[d] for d in series_dates(series)], dtype='<i4')
+        if len(idx) == 0 or (np.diff(idx) == 1).all():
+            entry = {'start': int(idx[0]) if len(idx) else 0, 'length': len(idx)}
+        else:
+            entry = {'index': writer.add(idx)}
+        entry['columns'] = {}
+        for key, values in series_columns(series).items():
+            values = _numeric(values)
+            if values is not None:
+                # 与 JSON 相同的小数位；float64 列与 JSON 数值相同，float32 列在其精度内一致
+                values = np.round(values, PRECISION.get(key, DEFAULT_PRECISION))
+                entry['columns'][key] = writer.add(values.astype(COLUMN_DTYPES.get(key, DEFAULT_DTYPE)))
+        header['series'][name] = entry
+    return header, writer.chunks
+
+
+def write_binary(export_data, paths):
+    """写出二进制结果文件（字符串或路径列表，多个目标共用同一份字节）"""
+    header, chunks = build_binary(export_data)
+    body = dumps(header)
+    body += b' ' * (-(PREAMBLE.size + len(body)) % ALIGNMENT)
+    write_atomic(paths, [PREAMBLE.pack(MAGIC, BINARY_VERSION, len(body)), body, *chunks])
+
+
+def load_binary(path):
+    """内存映射读取二进制结果文件，数组均为只读视图（不复制）
+
+    Returns:
+        {
+          'meta': dict,
+          'dates': int32 天数数组（.astype('datetime64[D]') 可转日期）,
+          'series': {曲线名: {'date': int32 天数, 列名: 数组, ...}}
+        }
+        不连续曲线的 date 为按序号取出的副本，其余均为视图
+    """
+    mm = np.memmap(path, dtype=np.uint8, mode='r')
+    magic, version, header_length = PREAMBLE.unpack(bytes(mm[:PREAMBLE.size]))
+    if magic != MAGIC:
+        raise ValueError(f"{path} 不是二进制回测结果文件")
+    if version != BINARY_VERSION:
+        raise ValueError(f"{path} 版本 {version} 不受支持（当前 {BINARY_VERSION}）")
+    header = json.loads(bytes(mm[PREAMBLE.size:PREAMBLE.size + header_length]))
+    base = PREAMBLE.size + header_length
+
+    def view(desc):
+        return np.frombuffer(mm, dtype=desc['dtype'], count=desc['length'], offset=base + desc['offset'])
+
+    dates = view(header['dates'])
+    series = {}
+    for name, entry in header['series'].items():
+        if 'index' in entry:
+            columns = {'date': dates[view(entry['index'])]}
+        else:
+            columns = {'date': dates[entry['start']:entry['start'] + entry['length']]}
+        columns.update({key: view(desc) for key, desc in entry['columns'].items()})
+        series[name] = columns
+    return {'meta': header.get('meta', {}), 'dates': dates, 'series': series}
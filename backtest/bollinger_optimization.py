@@ -0,0 +1,118 @@
+"""
+布林带参数优化 - 红利低波ETF (512890)
+
+策略逻辑（与 generate_multi_strategy_data.run_backtest_bollinger 一致）：
+  买入信号：收盘价突破上轨（中轨 + k 倍标准差）
+  卖出信号：收盘价跌破下轨（中轨 - k 倍标准差）
+  交易方式：场内ETF整手（100份）
+
+计算方式：
+  vector_engine 由一次累积矩计算全部窗口的滚动均值/标准差，
+  倍数维度直接广播，(窗口 × 倍数) 网格一次批量回测
+
+数据源：
+  本地 backtest_prices.npy（price_store.load_strategy_prices 内存映射读取，
+  不存在或比 backtest_result.json 旧时自动重建），避免网络问题
+"""
+
+import os
+import json
+from datetime import datetime
+import numpy as np
+
+from price_store import load_strategy_prices
+from vector_engine import (
+    rolling_mean_std, resolve_positions,
+    equity_lots, batch_metrics, metrics_table,
+)
+
+INITIAL_CAPITAL = 100000
+ETF_CODE = "512890"
+
+# 优化范围
+WINDOW_RANGE = range(10, 121, 2)                 # 布林带窗口：10-120 日，步长 2
+NUM_STD_RANGE = np.round(np.arange(1.0, 3.01, 0.1), 2)  # 标准差倍数：1.0-3.0，步长 0.1
+
+
+def fetch_etf_local():
+    """从本地价格文件（backtest_prices.npy）读取 ETF 数据"""
+    return load_strategy_prices()
+
+
+def sweep_bollinger(df, window_range=WINDOW_RANGE, num_std_range=NUM_STD_RANGE):
+    """向量化网格扫描：返回 参数组合 × 指标 表格"""
+    close = df['close'].to_numpy(dtype=np.float64)
+    windows = np.asarray(list(window_range))
+    num_stds = np.asarray(list(num_std_range), dtype=np.float64)
+
+    mid, std = rolling_mean_std(close, windows)
+    n_days = len(close)
+
+    # (交易日, 窗口, 倍数) 广播后展平为 (交易日, 组合)
+    band = std[:, :, None] * num_stds[None, None, :]
+    upper = (mid[:, :, None] + band).reshape(n_days, -1)
+    lower = (mid[:, :, None] - band).reshape(n_days, -1)
+    price = close[:, None]
+
+    position = resolve_positions(price > upper, price < lower)
+    equity = equity_lots(close, position, INITIAL_CAPITAL)
+    metrics = batch_metrics(df['date'], close, position, equity, INITIAL_CAPITAL)
+
+    params = {
+        'window': np.repeat(windows, len(num_stds)),
+        'num_std': np.tile(num_stds, len(windows)),
+    }
+    return metrics_table(params, metrics)
+
+
+def main():
+    print("=" * 80)
+    print("布林带参数优化 - 红利低波ETF (512890)")
+    print("=" * 80)
+
+    df = fetch_etf_local()
+    print(f"数据范围: {df['date'].min().date()} 至 {df['date'].max().date()} 共 {len(df)} 条")
+
+    table = sweep_bollinger(df)
+    print(f"测试了 {len(table)} 组参数组合")
+
+    table['sharpe_like'] = table['annual_return'] / (table['max_drawdown'] + 1)
+    by_total = table.sort_values('total_return', ascending=False, kind='stable')
+    by_sharpe = table.sort_values('sharpe_like', ascending=False, kind='stable')
+
+    default = table[(table['window'] == 20) & np.isclose(table['num_std'], 2.0)]
+    if len(default):
+        d = default.iloc[0]
+        print(f"\n默认参数 布林带 20±2: 总收益 {d['total_return']:.2f}% | 年化 {d['annual_return']:.2f}% | 回撤 {d['max_drawdown']:.2f}%")
+
+    print("\nTop 10 参数组合 (按总收益):")
+    print(f"{'排名':<4} {'窗口':<6} {'倍数':<6} {'总收益':<10} {'年化':<8} {'回撤':<8} {'交易次数':<8} {'胜率':<8}")
+    print("-" * 80)
+    for i, (_, r) in enumerate(by_total.head(10).iterrows(), 1):
+        print(f"{i:<4} {int(r['window']):<6} {r['num_std']:<6.1f} "
+              f"{r['total_return']:<10.2f}% {r['annual_return']:<8.2f}% {r['max_drawdown']:<8.2f}% "
+              f"{int(r['trade_count']):<8} {r['win_rate']:<8.2f}%")
+
+    # 保存结果
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    output = {
+        'meta': {
+            'etf_code': ETF_CODE,
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'window_range': list(WINDOW_RANGE),
+            'num_std_range': list(map(float, NUM_STD_RANGE)),
+            'total_combinations': len(table),
+            'strategy': '布林带突破上轨买入, 跌破下轨卖出（场内整手）',
+        },
+        'best_by_total_return': by_total.iloc[0].to_dict(),
+        'best_by_sharpe': by_sharpe.iloc[0].to_dict(),
+        'top_30': by_total.head(30).to_dict(orient='records'),
+    }
+    out_file = os.path.join(script_dir, 'bollinger_optimization_results.json')
+    with open(out_file, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2, default=float)
+    print(f"\n结果已保存: {out_file}")
+
+
+if __name__ == "__main__":
+    main()
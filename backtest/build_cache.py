@@ -0,0 +1,202 @@
+"""
+增量构建缓存 - 按内容哈希跳过未变化的策略回测
+
+每个策略输出是构建图中的一个节点，键为以下内容的哈希：
+  - 价格数据（日期 + 用到的价格列）
+  - 策略代码版本：回测函数及其调用的本目录函数的源码、引用的模块常量（自动收集）
+  - 参数
+键不变则直接读取 build_cache/<节点名>.<配方键>.json，否则重新计算并写入（同名旧缓存删除）；
+只追加了新 K 线时，支持终态的引擎从上次终态续算（见 engine_state），不必重跑全部历史；
+续算只跳过逐日账户循环的已算部分，指标仍在完整数据上计算，结果与全量重建逐位相同。
+
+加一个新策略或改一个策略的参数 / 代码，只重算这一个节点；其余曲线从缓存拼接。
+所有节点键再合成一个总键记入 meta.build，与上次导出相同时连结果文件都不必重写；
+add_nasdaq_data / add_sp500_data 同样按（基准行情, 代码, 日期范围）的键跳过未变化的更新。
+"""
+
+import os
+import json
+import types
+import hashlib
+import inspect
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from result_format import dumps, write_atomic
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "build_cache")
+# 缓存文件结构变化时递增，使旧缓存全部失效
+CODE_VERSION = 2
+HASH_LENGTH = 16
+
+
+def content_hash(*parts):
+    """任意可 JSON 序列化内容的哈希"""
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else dumps(part))
+        h.update(b'\0')
+    return h.hexdigest()[:HASH_LENGTH]
+
+
+def data_hash(df, columns=None):
+    """价格数据的哈希（日期 + 指定列，默认全部列）"""
+    columns = list(df.columns) if columns is None else [c for c in columns if c in df.columns]
+    parts = []
+    for col in columns:
+        values = df[col]
+        if values.dtype.kind == 'M':
+            values = values.dt.strftime('%Y-%m-%d')
+        elif values.dtype.kind == 'O':
+            values = values.astype(str)
+        parts.append([col, values.tolist()])
+    return content_hash(parts)
+
+
+def _local_function(obj, base_dir):
+    if not isinstance(obj, types.FunctionType):
+        return False
+    path = getattr(obj.__code__, 'co_filename', '')
+    return os.path.dirname(os.path.abspath(path)) == base_dir
+
+
+def _code_names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _code_names(const)
+    return names
+
+
+def code_hash(func):
+    """函数的代码版本：自身及其（递归）调用的本目录函数的源码，加上引用到的模块常量"""
+    base_dir = os.path.dirname(os.path.abspath(func.__code__.co_filename))
+    seen = {}
+    constants = {}
+    stack = [func]
+    while stack:
+        f = stack.pop()
+        key = f"{f.__module__}.{f.__qualname__}"
+        if key in seen:
+            continue
+        seen[key] = inspect.getsource(f)
+        for name in sorted(_code_names(f.__code__)):
+            value = f.__globals__.get(name)
+            if _local_function(value, base_dir):
+                stack.append(value)
+            elif name.isupper() and isinstance(value, (int, float, str, tuple, list, dict)):
+                constants[f"{f.__module__}.{name}"] = value
+    return content_hash(CODE_VERSION, sorted(seen.items()), sorted(constants.items()))
+
+
+def _loads(body):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+class BuildCache:
+    """以某份价格数据为输入的节点缓存
+
+    缓存文件按"配方"（节点名 + 代码版本 + 参数）命名，记录输入数据的哈希与行数：
+      - 数据哈希相同：直接返回缓存结果
+      - 引擎支持 state 参数，且缓存的输入是当前数据的前缀（只追加了新 K 线）：
+        以缓存中的终态续算新 K 线并拼接（见 engine_state）
+      - 否则全量重算
+
+    用法:
+        cache = BuildCache(df)
+        trades, daily_values = cache.run('strategy_macd', run_backtest_macd, 12, 26, 9)
+        stats = state_statistics(cache.states['strategy_macd'])
+    """
+
+    def __init__(self, df, columns=None, cache_dir=CACHE_DIR):
+        self.df = df
+        self.columns = columns
+        self.data_key = data_hash(df, columns)
+        self.cache_dir = cache_dir
+        self.keys = {}
+        self.states = {}
+        self.hits = []
+        self.extended = []
+        self.misses = []
+        self._prefix_keys = {len(df): self.data_key}
+
+    def recipe_key(self, name, func, args):
+        return content_hash(name, code_hash(func), list(args))
+
+    def _path(self, name, recipe):
+        return os.path.join(self.cache_dir, f"{name}.{recipe}.json")
+
+    def _prefix_key(self, rows):
+        if rows not in self._prefix_keys:
+            self._prefix_keys[rows] = data_hash(self.df.iloc[:rows], self.columns)
+        return self._prefix_keys[rows]
+
+    def _load(self, path):
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return _loads(f.read())
+
+    def _store(self, name, path, entry):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        write_atomic(path, [dumps(entry)])
+        # 同一节点其他配方的缓存不再有用
+        prefix = f"{name}."
+        for filename in os.listdir(self.cache_dir):
+            if filename.startswith(prefix) and filename != os.path.basename(path) \
+                    and filename[len(prefix):].count('.') == 1:
+                os.remove(os.path.join(self.cache_dir, filename))
+
+    def run(self, name, func, *args):
+        """计算（或从缓存读取 / 续算）节点 func(df, *args) 的结果
+
+        支持续算的引擎签名为 func(df, *args, state=None) -> (trades, daily_values, state)，
+        返回 (trades, daily_values)，终态记入 self.states[name]。
+        结果须可 JSON 序列化；元组会以列表形式返回（解包用法不受影响）
+        """
+        recipe = self.recipe_key(name, func, args)
+        self.keys[name] = content_hash(recipe, self.data_key)
+        path = self._path(name, recipe)
+        entry = self._load(path)
+        resumable = 'state' in inspect.signature(func).parameters
+
+        if entry is not None and entry['data_key'] == self.data_key:
+            self.hits.append(name)
+            if resumable:
+                self.states[name] = entry['state']
+            return entry['result']
+
+        if resumable and entry is not None and entry['rows'] < len(self.df) \
+                and self._prefix_key(entry['rows']) == entry['data_key']:
+            trades, daily_values, state = func(self.df, *args, state=entry['state'])
+            old_trades, old_values = entry['result']
+            result = [old_trades + trades, old_values + daily_values]
+            self.extended.append(name)
+        elif resumable:
+            trades, daily_values, state = func(self.df, *args)
+            result = [trades, daily_values]
+            self.misses.append(name)
+        else:
+            result, state = func(self.df, *args), None
+            self.misses.append(name)
+
+        entry = {'data_key': self.data_key, 'rows': len(self.df), 'result': result}
+        if resumable:
+            entry['state'] = state
+            self.states[name] = state
+        self._store(name, path, entry)
+        return result
+
+    def build_key(self, *extra):
+        """所有节点键（及额外输入）合成的总键"""
+        return content_hash(sorted(self.keys.items()), list(extra))
+
+    def summary(self):
+        text = f"缓存命中 {len(self.hits)} 个节点"
+        if self.extended:
+            text += f"，续算新K线 {len(self.extended)} 个: {', '.join(self.extended)}"
+        text += f"，重新计算 {len(self.misses)} 个"
+        return text + (f": {', '.join(self.misses)}" if self.misses else "")
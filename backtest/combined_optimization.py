@@ -1,31 +1,29 @@
 import pandas as pd
 import numpy as np
 import json
-import os
-import random
-from datetime import datetime
+
+from price_store import load_strategy_prices
+from vector_engine import (
+    rsi_ema_matrix, volatility_matrix, dynamic_threshold_positions,
+    equity_fractional, batch_metrics, metrics_table,
+)
 
 # ============ Configuration ============
 ETF_CODE = "512890"
 INITIAL_CAPITAL = 100000
-ITERATIONS = 3000  # Increased iterations
+WARMUP_DAYS = 50  # No trades during the first 50 bars (same as run_combined_backtest)
+
+# Exhaustive grid (replaces the former 3000-sample random search)
+RSI_PERIODS = [15]
+RSI_BUY_BASES = range(25, 46)                          # 25-45
+RSI_SELL_BASES = range(65, 86)                         # 65-85
+VOL_WINDOWS = range(10, 61)                            # 10-60
+K_VOLS = np.round(np.arange(-0.5, 1.0001, 0.05), 2)    # -0.5 ~ 1.0 (can be positive or negative)
+MEMORY_BUDGET_MB = 256                                 # Per-chunk memory bound
 
 def load_data():
-    """Load data from JSON (Price Only)"""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    json_path = os.path.join(script_dir, 'backtest_result.json')
-    
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    # Convert to DataFrame
-    daily = data['daily_values']['strategy']
-    df = pd.DataFrame([{
-        'date': pd.to_datetime(d['date']), 
-        'close': d['close']
-    } for d in daily])
-    df = df.sort_values('date').reset_index(drop=True)
-    return df
+    """Load prices from the memory-mapped price store (Price Only)"""
+    return load_strategy_prices()
 
 # ============ Indicator Functions ============
 
@@ -103,22 +101,45 @@ def run_combined_backtest(df, params):
     ret = (final_value - start_val) / start_val * 100
     return ret
 
-def generate_random_params():
-    return {
-        'rsi_period': 15,
-        'rsi_buy_base': random.randint(25, 45),
-        'rsi_sell_base': random.randint(65, 85),
-        'vol_window': random.randint(10, 60),
-        'k_vol': random.uniform(-0.5, 1.0) # Can be positive or negative
-    }
+# ============ Vectorized Sweep ============
+
+def sweep_combined(df, rsi_periods=RSI_PERIODS, buy_bases=RSI_BUY_BASES,
+                   sell_bases=RSI_SELL_BASES, vol_windows=VOL_WINDOWS, k_vols=K_VOLS,
+                   warmup=WARMUP_DAYS, memory_budget_mb=MEMORY_BUDGET_MB):
+    """Evaluate every (rsi_period, buy_base, sell_base, vol_window, k_vol) combination.
+
+    RSI and volatility are computed once per period/window; thresholds are
+    broadcast into clipped tensors chunk by chunk within the memory budget.
+    Returns a params x metrics DataFrame.
+    """
+    close = df['close'].to_numpy(dtype=np.float64)
+    rsi_periods = list(rsi_periods)
+    vol_windows = np.asarray(list(vol_windows))
+    rsi = rsi_ema_matrix(close, rsi_periods)
+    vol = volatility_matrix(close, vol_windows)
+
+    tables = []
+    for r, period in enumerate(rsi_periods):
+        chunks = dynamic_threshold_positions(
+            rsi[:, r], vol, buy_bases, sell_bases, k_vols,
+            warmup=warmup, memory_budget_mb=memory_budget_mb)
+        for params, position in chunks:
+            equity = equity_fractional(close, position, INITIAL_CAPITAL)
+            metrics = batch_metrics(df['date'], close, position, equity, INITIAL_CAPITAL)
+            table_params = {
+                'rsi_period': np.full(position.shape[1], period),
+                'rsi_buy_base': params['buy_base'].astype(int),
+                'rsi_sell_base': params['sell_base'].astype(int),
+                'vol_window': vol_windows[params['vol_idx']],
+                'k_vol': params['k_vol'],
+            }
+            tables.append(metrics_table(table_params, metrics))
+    return pd.concat(tables, ignore_index=True)
+
 
 def main():
-    print(f"Loading data (Price Only) and optimizing RSI + Volatility ({ITERATIONS} iterations)...")
     df = load_data()
     
-    best_return = -999
-    best_params = None
-    
     # Baseline
     base_params = {
         'rsi_period': 15, 'rsi_buy_base': 32, 'rsi_sell_base': 77,
@@ -127,18 +148,24 @@ def main():
     base_return = run_combined_backtest(df, base_params)
     print(f"Baseline RSI(15) 32/77 Return: {base_return:.2f}%")
     
-    for i in range(ITERATIONS):
-        params = generate_random_params()
-        
-        ret = run_combined_backtest(df, params)
-        
-        if ret > best_return:
-            best_return = ret
-            best_params = params
-            print(f"New Best [{i}]: {ret:.2f}% | Params: {json.dumps(params)}")
+    total = (len(RSI_PERIODS) * len(RSI_BUY_BASES) * len(RSI_SELL_BASES)
+             * len(VOL_WINDOWS) * len(K_VOLS))
+    print(f"Loading data (Price Only) and optimizing RSI + Volatility ({total} combinations)...")
+    table = sweep_combined(df)
+    
+    best = table.sort_values('total_return', ascending=False, kind='stable').iloc[0]
+    best_return = best['total_return']
+    best_params = {
+        'rsi_period': int(best['rsi_period']),
+        'rsi_buy_base': int(best['rsi_buy_base']),
+        'rsi_sell_base': int(best['rsi_sell_base']),
+        'vol_window': int(best['vol_window']),
+        'k_vol': float(best['k_vol']),
+    }
             
     print("\nOptimization Complete.")
     print(f"Top Return: {best_return:.2f}% (Baseline: {base_return:.2f}%)")
+    print(f"Annual: {best['annual_return']:.2f}% | Max Drawdown: {best['max_drawdown']:.2f}% | Trades: {int(best['trade_count'])}")
     print("Best Parameters:")
     print(json.dumps(best_params, indent=2))
     
@@ -0,0 +1,147 @@
+"""
+数据源 - 在线 / 录制 / 回放
+
+所有 akshare 调用统一走 fetch()，由环境变量 DATA_SOURCE 选择模式：
+  - live   （默认）直接请求接口，带重试/退避/对冲（见 fetch_retry）
+  - record  请求接口，同时把返回结果保存到样本目录
+  - replay  不联网，直接从样本目录读取，速度取决于磁盘
+
+样本目录默认为 backtest/fixtures/，可用环境变量 DATA_FIXTURE_DIR 覆盖
+
+样本按 接口名 + 参数 存为 pickle 文件，参数中的 start_date / end_date 不参与命名：
+  录制时同一标的多次请求的日期区间会合并到同一个样本；
+  回放时按请求的日期区间从样本中截取，增量刷新等带日期区间的调用也能命中
+
+离线跑性能测试时，建议同时把 MARKET_DATA_DIR 指向临时目录，避免本地行情仓库已有数据影响结果：
+  DATA_SOURCE=record python backtest/rsi_backtest.py      # 联网录制一次
+  DATA_SOURCE=replay MARKET_DATA_DIR=/tmp/store python backtest/rsi_backtest.py
+"""
+
+import os
+import re
+import hashlib
+
+import pandas as pd
+
+from fetch_retry import call_with_retry
+
+MODES = ('live', 'record', 'replay')
+MODE = os.environ.get('DATA_SOURCE', 'live')
+FIXTURE_DIR = os.environ.get(
+    'DATA_FIXTURE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+)
+
+RANGE_KEYS = ('start_date', 'end_date')
+DATE_COLUMNS = ('日期', '时间', 'date')
+
+
+def set_mode(mode, fixture_dir=None):
+    """切换数据源模式（脚本内调用，效果同设置环境变量）"""
+    global MODE, FIXTURE_DIR
+    if mode not in MODES:
+        raise ValueError(f"未知数据源模式: {mode}，可选 {', '.join(MODES)}")
+    MODE = mode
+    if fixture_dir:
+        FIXTURE_DIR = fixture_dir
+
+
+def fixture_path(name, kwargs, fixture_dir=None):
+    """样本文件路径：接口名 + 除日期区间外的参数"""
+    params = sorted((k, v) for k, v in kwargs.items() if k not in RANGE_KEYS)
+    label = '_'.join(f"{k}-{v}" for k, v in params)
+    label = re.sub(r'[^0-9A-Za-z_.\-]', '', label)
+    digest = hashlib.md5(repr(params).encode('utf-8')).hexdigest()[:8]
+    filename = f"{name}__{label}__{digest}.pkl" if label else f"{name}__{digest}.pkl"
+    return os.path.join(fixture_dir or FIXTURE_DIR, filename)
+
+
+def _date_column(df):
+    if not isinstance(df, pd.DataFrame):
+        return None
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            return col
+    return None
+
+
+def _slice_range(df, start_date=None, end_date=None):
+    """按 YYYYMMDD 日期区间截取样本"""
+    col = _date_column(df)
+    if col is None or (start_date is None and end_date is None):
+        return df
+    dates = pd.to_datetime(df[col])
+    mask = pd.Series(True, index=df.index)
+    if start_date is not None:
+        mask &= dates >= pd.to_datetime(str(start_date))
+    if end_date is not None:
+        mask &= dates <= pd.to_datetime(str(end_date))
+    return df[mask].reset_index(drop=True)
+
+
+def _merge_fixture(path, result):
+    """录制时与已有样本合并（按日期去重，保留新数据）"""
+    col = _date_column(result)
+    if col is None or not os.path.exists(path):
+        return result
+    previous = pd.read_pickle(path)
+    if _date_column(previous) != col:
+        return result
+    merged = pd.concat([previous, result], ignore_index=True)
+    merged['_sort_key'] = pd.to_datetime(merged[col])
+    merged = merged.sort_values('_sort_key').drop_duplicates('_sort_key', keep='last')
+    return merged.drop(columns='_sort_key').reset_index(drop=True)
+
+
+def fetch(func, name=None, deadline=None, **kwargs):
+    """按当前模式调用数据接口
+
+    Args:
+        func: akshare 接口函数（回放模式下不会被调用）
+        name: 接口名，默认取函数名
+        deadline: 总截止时间（秒，含重试），默认 fetch_retry.DEADLINE
+        **kwargs: 接口参数
+
+    Returns:
+        接口返回值（通常为 DataFrame）
+    """
+    name = name or getattr(func, '__name__', 'call')
+    path = fixture_path(name, kwargs)
+
+    if MODE == 'replay':
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"回放样本不存在: {path}（请先用 DATA_SOURCE=record 录制）")
+        return _slice_range(pd.read_pickle(path), kwargs.get('start_date'), kwargs.get('end_date'))
+
+    if deadline is not None:
+        result = call_with_retry(func, name=name, deadline=deadline, **kwargs)
+    else:
+        result = call_with_retry(func, name=name, **kwargs)
+
+    if MODE == 'record':
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        pd.to_pickle(_merge_fixture(path, result), tmp_path)
+        os.replace(tmp_path, path)
+    return result
+
+
+class _ReplayStub:
+    """回放模式下代替 akshare 模块：只提供接口名，不发请求"""
+
+    def __getattr__(self, name):
+        def stub(**kwargs):
+            raise RuntimeError(f"回放模式不应直接调用 {name}")
+        stub.__name__ = name
+        return stub
+
+
+def akshare_module():
+    """返回 akshare 模块；回放模式下无需安装 akshare"""
+    if MODE == 'replay':
+        return _ReplayStub()
+    try:
+        import akshare as ak
+    except ImportError:
+        raise ImportError("请先安装 akshare: pip install akshare")
+    return ak
@@ -0,0 +1,139 @@
+"""
+导出阶段预计算的衍生序列 - 网页直接绘制，不再在浏览器里逐条曲线重算
+
+写入回测结果的内容：
+  - 每条 daily_values 曲线增加 drawdown 字段（相对历史最高净值的回撤，负百分比）
+  - derived.yearly: {曲线名: {年份: 当年收益率%}}，口径与网页原 calcYearlyReturns 一致
+  - derived.rolling: 各策略与基准的滚动 1 年收益 / 波动率 / 最大回撤的分布摘要（判断不同行情下是否稳定）；
+    日期轴相同的曲线拼成一个矩阵，一次 backtest_stats.rolling_metrics 算完
+  - strategy_dynamic 曲线增加 vol / buy_threshold / sell_threshold 字段：
+    回测实际使用的波动率与动态阈值（rsi 字段为回测实际使用的 RSI）
+
+全部为 NumPy 向量运算；v2 列式格式下每个新字段只是多一列数组
+"""
+
+import numpy as np
+
+from vector_engine import INITIAL_CAPITAL, rsi_ema_matrix, volatility_matrix
+from backtest_stats import TRADING_DAYS, rolling_metrics
+
+
+def _values(records, initial_capital=INITIAL_CAPITAL):
+    """每日净值：优先取 total_value，缺失时由 return 换算"""
+    total = np.array([r.get('total_value') or np.nan for r in records], dtype=np.float64)
+    missing = np.isnan(total)
+    if missing.any():
+        returns = np.array([r.get('return') or 0.0 for r in records], dtype=np.float64)
+        total[missing] = initial_capital * (1 + returns[missing] / 100)
+    return total
+
+
+def drawdown_series(values):
+    """回撤序列（负百分比），峰值从首日净值起算"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return values
+    peak = np.maximum.accumulate(values)
+    return (values - peak) / peak * 100
+
+
+def yearly_returns(dates, returns, initial_capital=INITIAL_CAPITAL):
+    """按自然年统计收益率：上一年末净值 -> 当年末净值（首年以初始资金为起点）
+
+    Args:
+        dates: 'YYYY-MM-DD' 字符串序列
+        returns: 累计收益率（%）序列
+
+    Returns:
+        {年份字符串: 收益率%}
+    """
+    if len(dates) == 0:
+        return {}
+    years = np.array([d[:4] for d in dates])
+    returns = np.asarray(returns, dtype=np.float64)
+    # 每年最后一个交易日的位置
+    last = np.flatnonzero(np.append(years[1:] != years[:-1], True))
+    end_value = initial_capital * (1 + returns[last] / 100)
+    start_value = np.concatenate(([float(initial_capital)], end_value[:-1]))
+    pct = (end_value / start_value - 1) * 100
+    return {str(y): round(float(p), 2) for y, p in zip(years[last], pct)}
+
+
+def dynamic_threshold_series(close, params, vol_center=15, buy_clip=(20, 50), sell_clip=(60, 90)):
+    """动态调优策略实际使用的 RSI / 波动率 / 买卖阈值（预热期为 NaN）"""
+    rsi = rsi_ema_matrix(close, [params['rsi_period']])[:, 0]
+    vol = volatility_matrix(close, [params['vol_window']])[:, 0]
+    shift = params['k_vol'] * (vol - vol_center)
+    buy = np.clip(params['rsi_buy_base'] - shift, *buy_clip)
+    sell = np.clip(params['rsi_sell_base'] + shift, *sell_clip)
+    invalid = np.isnan(rsi) | np.isnan(vol)
+    buy[invalid] = np.nan
+    sell[invalid] = np.nan
+    return rsi, vol, buy, sell
+
+
+def rolling_summary(daily_values, window=TRADING_DAYS, initial_capital=INITIAL_CAPITAL):
+    """滚动指标摘要
+
+    Returns:
+        {曲线名: {return_min / return_median / return_max / return_positive（滚动收益为正的窗口占比%）/
+                  volatility_median / volatility_max / max_drawdown_median / max_drawdown_max}}
+        长度不足一个窗口的曲线不计
+    """
+    groups = {}
+    for name, records in daily_values.items():
+        if len(records) > window:
+            groups.setdefault(tuple(r['date'] for r in records), []).append(name)
+
+    summary = {}
+    for names in groups.values():
+        equity = np.vstack([_values(daily_values[name], initial_capital) for name in names])
+        metrics = {k: v[:, window:] for k, v in rolling_metrics(equity, window).items()}
+        stats = {
+            'return_min': metrics['return'].min(axis=1),
+            'return_median': np.median(metrics['return'], axis=1),
+            'return_max': metrics['return'].max(axis=1),
+            'return_positive': (metrics['return'] > 0).mean(axis=1) * 100,
+            'volatility_median': np.median(metrics['volatility'], axis=1),
+            'volatility_max': metrics['volatility'].max(axis=1),
+            'max_drawdown_median': np.median(metrics['max_drawdown'], axis=1),
+            'max_drawdown_max': metrics['max_drawdown'].max(axis=1),
+        }
+        for i, name in enumerate(names):
+            summary[name] = {k: round(float(v[i]), 2) for k, v in stats.items()}
+    return summary
+
+
+def _set_column(records, key, values):
+    for r, v in zip(records, values.tolist()):
+        r[key] = None if v != v else v
+
+
+def add_derived_series(export_data, dynamic_params=None, initial_capital=INITIAL_CAPITAL):
+    """为导出数据补充回撤 / 年度收益 / 滚动指标摘要 / 动态阈值序列（原地修改并返回）"""
+    daily_values = export_data.get('daily_values', {})
+    yearly = {}
+    for name, records in daily_values.items():
+        if not records:
+            continue
+        _set_column(records, 'drawdown', drawdown_series(_values(records, initial_capital)))
+        if all('return' in r for r in records):
+            yearly[name] = yearly_returns([r['date'] for r in records],
+                                          [r['return'] for r in records], initial_capital)
+
+    dynamic = daily_values.get('strategy_dynamic')
+    if dynamic and dynamic_params:
+        close = np.array([r['close'] for r in dynamic], dtype=np.float64)
+        rsi, vol, buy, sell = dynamic_threshold_series(close, dynamic_params)
+        _set_column(dynamic, 'rsi', rsi)
+        _set_column(dynamic, 'vol', vol)
+        _set_column(dynamic, 'buy_threshold', buy)
+        _set_column(dynamic, 'sell_threshold', sell)
+
+    derived = export_data.setdefault('derived', {})
+    derived['yearly'] = yearly
+    derived['rolling'] = {
+        'window': TRADING_DAYS,
+        'series': rolling_summary(daily_values, initial_capital=initial_capital),
+    }
+    return export_data
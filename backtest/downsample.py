@@ -0,0 +1,133 @@
+"""
+净值曲线多级降采样（LTTB） - 图表先加载粗粒度数据，再替换为完整数据
+
+画布只有几百像素宽，十几条曲线每条几千个点大多被重叠绘制。导出时额外生成：
+  backtest_result.lod1000.json   每条曲线约 1000 个点
+  backtest_result.lod300.json    每条曲线约 300 个点
+结构与完整文件相同（同样走 save_result，v2 列式），meta.lod 记录点数。
+
+降采样用 Largest-Triangle-Three-Buckets：
+  - 网页图表按序号对齐多条曲线（共用 labels），所以所有共用日期轴的曲线取同一组点：
+    每个桶内选使"各曲线归一化后三角形面积之和"最大的点（多序列 LTTB）
+  - 首尾点、所有交易记录的日期强制保留，买卖标记不会丢失
+  - 日期轴与主曲线不同的基准曲线按日期筛选
+"""
+
+import os
+
+import numpy as np
+
+from result_format import save_result
+
+LOD_LEVELS = (1000, 300)
+VALUE_KEYS = ('total_value', 'return', 'close')
+
+
+def lttb_indices(y, n_out, x=None):
+    """LTTB 降采样，返回保留点的序号（升序）
+
+    Args:
+        y: 一维数组，或 (点数, 曲线数) 矩阵（多条曲线共用同一组点，面积按列求和）
+        n_out: 目标点数（含首尾）
+        x: 横坐标，默认为序号
+
+    Returns:
+        int64 序号数组
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if y.ndim == 1:
+        y = y[:, None]
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # 各曲线按振幅归一化，避免净值量级大的曲线主导选点；NaN 视为 0
+    span = np.nanmax(y, axis=0) - np.nanmin(y, axis=0)
+    span[~(span > 0)] = 1.0
+    y = np.nan_to_num((y - np.nanmin(y, axis=0)) / span)
+
+    # 中间 n-2 个点均分为 n_out-2 个桶
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # 下一个桶的平均点（最后一个桶取终点）
+        nlo, nhi = (hi, edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean(axis=0)
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi, None]) * (cy - y[a])).sum(axis=1)
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def _trade_dates(export_data):
+    """所有交易记录（trades / trades_xxx）的日期"""
+    dates = set()
+    for key, value in export_data.items():
+        if key.startswith('trades') and isinstance(value, list):
+            dates.update(t['date'] for t in value if isinstance(t, dict) and 'date' in t)
+    return dates
+
+
+def _series_values(records):
+    for key in VALUE_KEYS:
+        if all(r.get(key) is not None for r in records):
+            return np.array([r[key] for r in records], dtype=np.float64)
+    return None
+
+
+def lod_dates(export_data, n_out, reference='strategy'):
+    """某一级别保留的日期集合
+
+    与主曲线日期完全一致的曲线共同参与多序列 LTTB，再并入交易日期
+    """
+    daily_values = export_data['daily_values']
+    ref = daily_values[reference]
+    ref_dates = [r['date'] for r in ref]
+
+    columns = []
+    for records in daily_values.values():
+        if len(records) != len(ref) or not records or records[0]['date'] != ref_dates[0] \
+                or records[-1]['date'] != ref_dates[-1]:
+            continue
+        values = _series_values(records)
+        if values is not None:
+            columns.append(values)
+    idx = lttb_indices(np.column_stack(columns), n_out)
+    return {ref_dates[i] for i in idx} | _trade_dates(export_data)
+
+
+def downsample_records(records, keep, n_out):
+    """按保留日期筛选一条曲线（点数不超过 n_out 的曲线原样返回，首尾点始终保留）"""
+    if len(records) <= n_out:
+        return records
+    last = len(records) - 1
+    return [r for i, r in enumerate(records) if r['date'] in keep or i == 0 or i == last]
+
+
+def downsample_result(export_data, n_out, reference='strategy'):
+    """生成某一级别的降采样结果（不修改传入的 dict）"""
+    keep = lod_dates(export_data, n_out, reference)
+    result = dict(export_data)
+    result['meta'] = dict(export_data.get('meta', {}), lod=n_out,
+                          full_points=len(export_data['daily_values'][reference]))
+    result['daily_values'] = {
+        name: downsample_records(records, keep, n_out)
+        for name, records in export_data['daily_values'].items()
+    }
+    return result
+
+
+def lod_path(path, n_out):
+    """backtest_result.json -> backtest_result.lod300.json"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.lod{n_out}{ext}"
+
+
+def save_lod_results(export_data, path, levels=LOD_LEVELS):
+    """在完整结果文件旁写出各级降采样文件"""
+    for n_out in levels:
+        save_result(downsample_result(export_data, n_out), lod_path(path, n_out))
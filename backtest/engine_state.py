@@ -0,0 +1,139 @@
+"""
+回测引擎的可序列化终态 - 新增 K 线只需在上次终态上续算
+
+终态（JSON 可序列化 dict）：
+  rows            已处理的输入 K 线数
+  cash / shares / position   账户与持仓
+  bars            已输出的每日净值条数
+  first_date / last_date / last_return
+  peak / max_drawdown        回撤统计（峰值从首日净值起算）
+  peak_bar / max_drawdown_bars   最近峰值所在的序号、最长水下天数
+  last_value / sum_r / sum_r2 / sum_down2   日收益率的累计矩（Sharpe / Sortino 用，见 backtest_stats）
+  held_bars       收盘后持仓的天数（持仓占比用）
+  buys / sells / wins / last_buy_price   交易计数（胜率口径与 calculate_statistics 一致：第 i 次卖出对第 i 次买入）
+
+续算时指标仍在完整数据上计算（向量化，开销小），只有逐日的账户循环从第 rows 根 K 线接着跑，
+因此续算结果与全量重建逐位相同。
+"""
+
+from vector_engine import INITIAL_CAPITAL
+from backtest_stats import annualized_return, day_numbers, risk_ratios
+
+
+def initial_state(initial_capital=INITIAL_CAPITAL):
+    return {
+        'rows': 0,
+        'cash': initial_capital,
+        'shares': 0,
+        'position': 0,
+        'initial_capital': initial_capital,
+        'bars': 0,
+        'first_date': None,
+        'last_date': None,
+        'last_return': None,
+        'peak': None,
+        'max_drawdown': 0,
+        'peak_bar': 0,
+        'max_drawdown_bars': 0,
+        'last_value': None,
+        'sum_r': 0.0,
+        'sum_r2': 0.0,
+        'sum_down2': 0.0,
+        'held_bars': 0,
+        'buys': 0,
+        'sells': 0,
+        'wins': 0,
+        'last_buy_price': None,
+    }
+
+
+def resume_frame(df, state=None, initial_capital=INITIAL_CAPITAL):
+    """准备续算的输入
+
+    Args:
+        df: 完整价格数据（前 state['rows'] 行须与上次相同）
+        state: 上次的终态，None 表示从头计算
+
+    Returns:
+        (frame, start, state): frame 为重建索引后的完整数据（指标在其上计算），start 为第一根新 K 线的位置，
+        state 为终态副本（无终态时为初始状态），rows 已更新为 len(df)
+    """
+    if state is None:
+        return df.reset_index(drop=True), 0, dict(initial_state(initial_capital), rows=len(df))
+    return df.reset_index(drop=True), state['rows'], dict(state, rows=len(df))
+
+
+def advance_state(state, cash, shares, position, trades, daily_values):
+    """用本次新增的交易与每日净值推进终态（原地修改并返回）"""
+    held = state['position']
+    state.update(cash=cash, shares=shares, position=position)
+    actions = {}
+    for t in trades:
+        actions[t['date']] = t['action']
+        if t['action'] == '买入':
+            state['buys'] += 1
+            state['last_buy_price'] = t['price']
+        elif t['action'] == '卖出':
+            if state['sells'] < state['buys'] and t['price'] > state['last_buy_price']:
+                state['wins'] += 1
+            state['sells'] += 1
+
+    peak, max_drawdown = state['peak'], state['max_drawdown']
+    peak_bar, max_drawdown_bars = state['peak_bar'], state['max_drawdown_bars']
+    last_value, sum_r, sum_r2, sum_down2 = state['last_value'], state['sum_r'], state['sum_r2'], state['sum_down2']
+    held_bars = state['held_bars']
+    for i, d in enumerate(daily_values, state['bars']):
+        v = d['total_value']
+        if peak is None or v >= peak:
+            peak, peak_bar = v, i
+        max_drawdown = max(max_drawdown, (peak - v) / peak * 100)
+        max_drawdown_bars = max(max_drawdown_bars, i - peak_bar)
+        if last_value is not None:
+            r = v / last_value - 1
+            sum_r += r
+            sum_r2 += r * r
+            sum_down2 += min(r, 0) ** 2
+        last_value = v
+        action = actions.get(d['date'])
+        if action is not None:
+            held = 1 if action == '买入' else 0
+        held_bars += held
+    state.update(peak=peak, max_drawdown=max_drawdown, peak_bar=peak_bar, max_drawdown_bars=max_drawdown_bars,
+                 last_value=last_value, sum_r=sum_r, sum_r2=sum_r2, sum_down2=sum_down2, held_bars=held_bars)
+
+    if daily_values:
+        if state['first_date'] is None:
+            state['first_date'] = daily_values[0]['date']
+        state['last_date'] = daily_values[-1]['date']
+        state['last_return'] = daily_values[-1]['return']
+        state['bars'] += len(daily_values)
+    return state
+
+
+def state_statistics(state):
+    """由终态得到统计指标（字段与 backtest_stats.calculate_statistics 相同），无需遍历历史净值"""
+    if not state['bars']:
+        return {}
+    first_day, last_day = day_numbers([state['first_date'], state['last_date']])
+    calendar_days = int(last_day - first_day)
+    total_return = state['last_return']
+    annual_return = float(annualized_return(total_return, calendar_days))
+    sharpe, sortino, calmar = risk_ratios(state['bars'] - 1, state['sum_r'], state['sum_r2'], state['sum_down2'],
+                                          annual_return, state['max_drawdown'])
+    win_rate = (state['wins'] / state['sells'] * 100) if state['sells'] else 0
+    return {
+        'total_return': round(total_return, 2),
+        'annual_return': round(annual_return, 2),
+        'max_drawdown': round(state['max_drawdown'], 2),
+        'max_drawdown_days': state['max_drawdown_bars'],
+        'trade_count': state['buys'],
+        'win_rate': round(win_rate, 2),
+        'sharpe': round(float(sharpe), 2),
+        'sortino': round(float(sortino), 2),
+        'calmar': round(float(calmar), 2),
+        'exposure': round(state['held_bars'] / state['bars'] * 100, 2),
+        'start_date': state['first_date'],
+        'end_date': state['last_date'],
+        'days': state['bars'],
+        'calendar_days': calendar_days
+    }
@@ -26,10 +26,10 @@ from datetime import datetime
 import pandas as pd
 import numpy as np
 
-try:
-    import akshare as ak
-except ImportError:
-    raise SystemExit("请先安装 akshare: pip install akshare")
+from price_store import load_strategy_prices
+
+from data_source import fetch, akshare_module
+from market_data import get_etf_history
 
 INITIAL_CAPITAL = 100000
 ETF_CODE = "512890"
@@ -46,33 +46,20 @@ SELL_THRESHOLDS = np.arange(-0.2, 1.1, 0.1) # ERP 低于此值卖出（更激进
 
 def fetch_etf():
     if USE_LOCAL_BACKTEST_JSON:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        json_path = os.path.join(script_dir, 'backtest_result.json')
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        daily = data['daily_values']['strategy']
-        df = pd.DataFrame([{'date': pd.to_datetime(d['date']), 'close': d['close']} for d in daily])
-        return df.sort_values('date').reset_index(drop=True)
+        return load_strategy_prices()
     if ETF_CSV and os.path.exists(ETF_CSV):
         df = pd.read_csv(ETF_CSV, parse_dates=['date'])
         df = df.rename(columns={'收盘': 'close', 'close': 'close'})
         return df[['date', 'close']].sort_values('date').reset_index(drop=True)
 
-    df = ak.fund_etf_hist_em(symbol=ETF_CODE, period="daily", adjust="qfq")
-    df['日期'] = pd.to_datetime(df['日期'])
-    df = df.rename(columns={'日期': 'date', '收盘': 'close'})
-    return df[['date', 'close']].sort_values('date').reset_index(drop=True)
+    df = get_etf_history(ETF_CODE, period="daily", adjust="qfq")
+    return df[['date', 'close']]
 
 
 def fetch_dividend_yield():
     if USE_LOCAL_BACKTEST_JSON:
         # 红利低波类资产典型股息率 2.5%-4.5%，构造模拟序列（根据历史均值 ~3.5% 上下波动）
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        json_path = os.path.join(script_dir, 'backtest_result.json')
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        daily = data['daily_values']['strategy']
-        dates = [pd.to_datetime(d['date']) for d in daily]
+        dates = list(load_strategy_prices()['date'])
         # 股息率：基础趋势 3.2%→4.0% + 周期性波动（模拟市场周期）
         dy_start, dy_end = 3.2, 4.0
         n = len(dates)
@@ -87,7 +74,7 @@ def fetch_dividend_yield():
         df = df.rename(columns={'dividend_yield': 'dy', '股息率': 'dy'})
         return df[['date', 'dy']].sort_values('date').reset_index(drop=True)
 
-    df = ak.index_value_hist_funddb(symbol=INDEX_DIVIDEND_ID)
+    df = fetch(akshare_module().index_value_hist_funddb, symbol=INDEX_DIVIDEND_ID)
     if '日期' not in df.columns:
         raise RuntimeError('股息率数据缺少 日期 列')
     # 尝试常见股息率列名
@@ -106,12 +93,7 @@ def fetch_dividend_yield():
 def fetch_cgb10y():
     if USE_LOCAL_BACKTEST_JSON:
         # 中国10年期国债收益率 2019-2025 区间约 2.5%-3.5%，构造简化序列（从 3.2% 降至 2.3%）
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        json_path = os.path.join(script_dir, 'backtest_result.json')
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        daily = data['daily_values']['strategy']
-        dates = [pd.to_datetime(d['date']) for d in daily]
+        dates = list(load_strategy_prices()['date'])
         # 10Y国债收益率：基础趋势 3.2%→2.3% + 反向周期波动（与股息率错相）
         cgb_start, cgb_end = 3.2, 2.3
         n = len(dates)
@@ -126,7 +108,7 @@ def fetch_cgb10y():
         df = df.rename(columns={'yield': 'cgb10y', '收益率': 'cgb10y'})
         return df[['date', 'cgb10y']].sort_values('date').reset_index(drop=True)
 
-    df = ak.bond_china_yield()
+    df = fetch(akshare_module().bond_china_yield)
     if '日期' not in df.columns:
         raise RuntimeError('国债收益率数据缺少 日期 列')
     yield_col = None
@@ -0,0 +1,202 @@
+"""
+数据接口调用层 - 重试 / 指数退避 / 对冲请求
+
+所有 akshare 调用统一走 call_with_retry()：
+  - 失败后按指数退避重试，退避时间带随机抖动，避免多个请求同时重试
+  - 整体有总截止时间（deadline），超时后不再重试，直接抛出 TimeoutError
+  - 超时落实到 HTTP 请求本身：调用期间 requests 的默认超时取 min(HTTP_TIMEOUT, 剩余时间)，
+    akshare 不暴露 timeout 参数，挂起的连接也会在截止时间内抛错结束，不会留下卡住的线程
+  - 对冲请求：单次调用耗时超过历史延迟的 P95 时，再并行发起一次相同请求，
+    取先返回的结果，避免一次慢请求拖住整个任务
+    历史样本不足时使用 DEFAULT_HEDGE_DELAY 作为对冲等待时间
+"""
+
+import time
+import random
+import functools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+# ============ 默认参数 ============
+RETRIES = 5              # 最多尝试次数（不含对冲请求）
+BASE_DELAY = 1.0         # 首次退避秒数
+MAX_DELAY = 16.0         # 单次退避上限
+DEADLINE = 120.0         # 总截止时间（秒）
+HEDGE_PERCENTILE = 95    # 对冲触发的延迟分位数
+DEFAULT_HEDGE_DELAY = 10.0
+HTTP_TIMEOUT = 30.0      # 单次 HTTP 请求的连接 / 读取超时（秒）
+MIN_LATENCY_SAMPLES = 5
+HEDGE_WORKERS = 16
+
+_executor = None
+_executor_lock = threading.Lock()
+# 当前线程内 requests 请求的默认超时（由 _attempt 在工作线程中设置）
+_http = threading.local()
+
+
+def _install_http_timeout():
+    """让未显式指定 timeout 的 requests 请求使用当前线程的默认超时（只安装一次）"""
+    try:
+        import requests
+    except ImportError:
+        return
+    original = requests.Session.request
+    if getattr(original, '_thread_timeout', False):
+        return
+
+    @functools.wraps(original)
+    def request(self, method, url, *args, **kwargs):
+        timeout = getattr(_http, 'timeout', None)
+        # 位置参数第 7 个为 timeout，调用方显式传入时不覆盖
+        if timeout is not None and kwargs.get('timeout') is None and len(args) < 7:
+            kwargs['timeout'] = timeout
+        return original(self, method, url, *args, **kwargs)
+
+    request._thread_timeout = True
+    requests.Session.request = request
+
+
+_install_http_timeout()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="fetch")
+        return _executor
+
+
+class LatencyTracker:
+    """记录各接口最近的成功调用耗时，用于计算对冲触发时间"""
+
+    def __init__(self, maxlen=100):
+        self._samples = {}
+        self._maxlen = maxlen
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self._maxlen)).append(seconds)
+
+    def percentile(self, name, q=HEDGE_PERCENTILE, default=DEFAULT_HEDGE_DELAY):
+        with self._lock:
+            samples = list(self._samples.get(name, ()))
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return default
+        return float(np.percentile(samples, q))
+
+
+latency_tracker = LatencyTracker()
+
+
+def backoff_delay(attempt, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    """第 attempt 次失败后的等待时间（指数退避 + 抖动，取上限的 50%~100%）"""
+    cap = min(max_delay, base_delay * (2 ** attempt))
+    return cap * random.uniform(0.5, 1.0)
+
+
+def _attempt(func, args, kwargs, name, hedge_after, remaining, tracker, http_timeout=HTTP_TIMEOUT):
+    """执行一次调用；超过 hedge_after 秒未返回时再发起一次对冲请求
+
+    延迟样本只记录先返回的那次调用，从它自己的提交时刻算起；被放弃的慢请求不计入，
+    否则对冲成功时样本会偏大，P95 随之上升，对冲越来越晚触发
+    """
+    executor = _get_executor()
+    start = time.monotonic()
+
+    def submit():
+        submitted = time.monotonic()
+
+        def timed_call():
+            _http.timeout = max(0.1, min(http_timeout, end - time.monotonic()))
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                _http.timeout = None
+            return result, time.monotonic() - submitted
+
+        return executor.submit(timed_call)
+
+    end = start + remaining
+    futures = {submit()}
+    hedged = hedge_after is None
+    last_error = None
+
+    while futures:
+        now = time.monotonic()
+        if now >= end:
+            break
+        timeout = end - now
+        if not hedged:
+            timeout = min(timeout, max(0.0, start + hedge_after - now))
+        done, futures = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            try:
+                result, elapsed = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            tracker.record(name, elapsed)
+            return result
+
+        if not futures and last_error is not None:
+            raise last_error
+        if not hedged and time.monotonic() - start >= hedge_after:
+            # 首个请求迟迟未返回，发起对冲请求
+            hedged = True
+            futures.add(submit())
+            print(f"[数据接口] {name} 超过 {hedge_after:.1f} 秒未返回，发起对冲请求")
+
+    for future in futures:
+        future.cancel()
+    if last_error is not None:
+        raise last_error
+    raise TimeoutError(f"{name} 调用超时")
+
+
+def call_with_retry(func, *args, name=None, retries=RETRIES, base_delay=BASE_DELAY,
+                    max_delay=MAX_DELAY, deadline=DEADLINE, hedge=True,
+                    hedge_percentile=HEDGE_PERCENTILE, tracker=None, http_timeout=HTTP_TIMEOUT, **kwargs):
+    """带重试、退避、总截止时间和对冲请求的函数调用
+
+    Args:
+        func: 被调用的函数（如 ak.fund_etf_hist_em）
+        name: 接口名称，用于日志和延迟统计，默认取函数名
+        retries: 最多尝试次数
+        deadline: 总截止时间（秒），包含所有重试与退避等待
+        hedge: 是否启用对冲请求
+        hedge_percentile: 对冲触发的延迟分位数
+        http_timeout: 单次 HTTP 请求的超时（秒），不超过剩余的截止时间
+
+    Returns:
+        func 的返回值；全部失败时抛出最后一次异常，超过截止时间抛出 TimeoutError
+    """
+    name = name or getattr(func, '__name__', 'call')
+    tracker = tracker or latency_tracker
+    end = time.monotonic() + deadline
+    last_error = None
+
+    for attempt in range(retries):
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            break
+        hedge_after = tracker.percentile(name, hedge_percentile) if hedge else None
+        try:
+            return _attempt(func, args, kwargs, name, hedge_after, remaining, tracker, http_timeout)
+        except Exception as e:
+            last_error = e
+            print(f"[数据接口] {name} 尝试 {attempt + 1}/{retries} 失败: {e}")
+
+        if attempt + 1 < retries:
+            delay = min(backoff_delay(attempt, base_delay, max_delay), end - time.monotonic())
+            if delay > 0:
+                time.sleep(delay)
+
+    if last_error is None or time.monotonic() >= end:
+        raise TimeoutError(f"{name} 超过总截止时间 {deadline:.1f} 秒") from last_error
+    raise last_error
@@ -5,10 +5,15 @@
 
 import pandas as pd
 import numpy as np
-import json
 import os
 from datetime import datetime
 
+from price_store import write_prices_from_daily_values, PRICES_FILE
+from trading_calendar import date_labels
+from result_format import load_result
+from result_export import export_result
+from backtest_stats import calculate_statistics
+
 # ============ 配置参数 ============
 ETF_CODE = "512890"
 ETF_NAME = "红利低波ETF"
@@ -55,8 +60,7 @@ def get_data_from_json():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     json_path = os.path.join(script_dir, "backtest_result.json")
     
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_result(json_path)
     
     # 提取每日价格数据
     strategy_values = data['daily_values']['strategy']
@@ -91,11 +95,9 @@ def run_backtest(df, buy_threshold, sell_threshold):
     
     dividend_dict = {d['date']: d['dividend'] for d in DIVIDEND_DATA}
     
-    for i, row in df.iterrows():
-        date = row['date']
+    for (i, row), date_str in zip(df.iterrows(), date_labels(df['date'])):
         price = row['close']
         rsi = row['rsi']
-        date_str = date.strftime('%Y-%m-%d')
         
         # 处理分红
         if date_str in dividend_dict and shares > 0:
@@ -170,52 +172,6 @@ def run_backtest(df, buy_threshold, sell_threshold):
     return trades, daily_values
 
 
-def calculate_statistics(daily_values, trades):
-    """计算统计指标"""
-    if not daily_values:
-        return {}
-    
-    returns = [d['return'] for d in daily_values]
-    values = [d['total_value'] for d in daily_values]
-    
-    # 计算最大回撤
-    peak = values[0]
-    max_drawdown = 0
-    for v in values:
-        if v > peak:
-            peak = v
-        drawdown = (peak - v) / peak * 100
-        if drawdown > max_drawdown:
-            max_drawdown = drawdown
-    
-    # 计算年化收益
-    days = len(daily_values)
-    total_return = returns[-1]
-    annual_return = ((1 + total_return / 100) ** (365 / days) - 1) * 100 if days > 0 else 0
-    
-    # 交易统计
-    buy_trades = [t for t in trades if t['action'] == '买入']
-    sell_trades = [t for t in trades if t['action'] == '卖出']
-    
-    wins = 0
-    for i, sell in enumerate(sell_trades):
-        if i < len(buy_trades):
-            if sell['price'] > buy_trades[i]['price']:
-                wins += 1
-    win_rate = (wins / len(sell_trades) * 100) if sell_trades else 0
-    
-    return {
-        'total_return': round(total_return, 2),
-        'annual_return': round(annual_return, 2),
-        'max_drawdown': round(max_drawdown, 2),
-        'trade_count': len(buy_trades),
-        'win_rate': round(win_rate, 2),
-        'start_date': daily_values[0]['date'],
-        'end_date': daily_values[-1]['date'],
-        'days': days
-    }
-
-
 def main():
     print("=" * 60)
     print(f"生成 RSI({RSI_BUY_THRESHOLD}/{RSI_SELL_THRESHOLD}) 回测数据")
@@ -288,16 +244,15 @@ def main():
     # 6. 保存文件
     script_dir = os.path.dirname(os.path.abspath(__file__))
     
-    # 保存到backtest目录
+    # 保存到backtest目录和docs目录
     output_file = os.path.join(script_dir, "backtest_result.json")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(export_data, f, ensure_ascii=False, indent=2)
+    docs_output = os.path.join(os.path.dirname(script_dir), "docs", "backtest_result.json")
+    export_result(export_data, output_file, docs_output)
     print(f"\n回测结果已保存至: {output_file}")
     
-    # 保存到docs目录
-    docs_output = os.path.join(os.path.dirname(script_dir), "docs", "backtest_result.json")
-    with open(docs_output, 'w', encoding='utf-8') as f:
-        json.dump(export_data, f, ensure_ascii=False)
+    # 同时写出二进制价格文件，供优化脚本内存映射读取
+    write_prices_from_daily_values(export_data['daily_values']['strategy'])
+    print(f"价格文件已保存至: {PRICES_FILE}")
     print(f"网页数据已保存至: {docs_output}")
     
     print("\n" + "=" * 60)
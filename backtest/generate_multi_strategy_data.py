@@ -7,10 +7,17 @@
 
 import pandas as pd
 import numpy as np
-import json
 import os
 from datetime import datetime
 
+from price_store import write_prices_from_daily_values, PRICES_FILE
+from trading_calendar import date_labels
+from result_format import load_result
+from result_export import export_result
+from build_cache import BuildCache, code_hash
+from engine_state import resume_frame, advance_state, state_statistics
+from backtest_stats import calculate_statistics
+
 # ============ 配置参数 ============
 ETF_CODE = "512890"
 ETF_NAME = "红利低波ETF"
@@ -139,23 +146,19 @@ def add_kdj(df, n=9, k_smooth=3, d_smooth=3):
     return kdj_df
 
 
-def run_backtest_ideal(df, rsi_period, buy_threshold, sell_threshold):
+def run_backtest_ideal(df, rsi_period, buy_threshold, sell_threshold, state=None):
     """执行理想化RSI策略回测（允许小数份额，EMA平滑）"""
-    df = df.copy()
+    df, start, state = resume_frame(df, state)
     df['rsi'] = calculate_rsi_ema(df['close'], rsi_period)
     
-    cash = float(INITIAL_CAPITAL)
-    shares = 0.0
-    position = 0
+    cash, shares, position = float(state['cash']), float(state['shares']), state['position']
     
     trades = []
     daily_values = []
     
-    for i, row in df.iterrows():
-        date = row['date']
+    for (i, row), date_str in zip(df.iloc[start:].iterrows(), date_labels(df['date'].iloc[start:])):
         price = row['close']
         rsi = row['rsi']
-        date_str = date.strftime('%Y-%m-%d')
         
         if pd.notna(rsi):
             if rsi < buy_threshold and position == 0:
@@ -204,7 +207,7 @@ def run_backtest_ideal(df, rsi_period, buy_threshold, sell_threshold):
             'return': (total_value / INITIAL_CAPITAL - 1) * 100
         })
     
-    return trades, daily_values
+    return trades, daily_values, advance_state(state, cash, shares, position, trades, daily_values)
 
 
 def get_data_from_json():
@@ -212,8 +215,7 @@ def get_data_from_json():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     json_path = os.path.join(script_dir, "backtest_result.json")
     
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_result(json_path)
     
     # 提取每日价格数据
     strategy_values = data['daily_values']['strategy']
@@ -234,26 +236,22 @@ def get_data_from_json():
     return df, benchmarks, data
 
 
-def run_backtest(df, buy_threshold, sell_threshold):
+def run_backtest(df, buy_threshold, sell_threshold, state=None):
     """执行RSI策略回测
     
     注意：512890是累积型ETF，分红已体现在价格中，无需处理分红
     """
-    df = df.copy()
+    df, start, state = resume_frame(df, state)
     df['rsi'] = calculate_rsi(df['close'], RSI_PERIOD)
     
-    cash = INITIAL_CAPITAL
-    shares = 0
-    position = 0
+    cash, shares, position = state['cash'], state['shares'], state['position']
     
     trades = []
     daily_values = []
     
-    for i, row in df.iterrows():
-        date = row['date']
+    for (i, row), date_str in zip(df.iloc[start:].iterrows(), date_labels(df['date'].iloc[start:])):
         price = row['close']
         rsi = row['rsi']
-        date_str = date.strftime('%Y-%m-%d')
         
         # RSI信号判断
         if pd.notna(rsi):
@@ -308,20 +306,18 @@ def run_backtest(df, buy_threshold, sell_threshold):
             'return': (total_value / INITIAL_CAPITAL - 1) * 100
         })
     
-    return trades, daily_values
+    return trades, daily_values, advance_state(state, cash, shares, position, trades, daily_values)
 
 
-def run_backtest_ma_cross(df, short_window=20, long_window=60):
+def run_backtest_ma_cross(df, short_window=20, long_window=60, state=None):
     """均线金叉/死叉策略（场内整手）"""
+    df, start, state = resume_frame(df, state)
     ma_df = add_moving_averages(df, short_window, long_window)
-    cash = INITIAL_CAPITAL
-    shares = 0
-    position = 0
+    cash, shares, position = state['cash'], state['shares'], state['position']
     trades = []
     daily_values = []
 
-    for i, row in ma_df.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
+    for (i, row), date_str in zip(ma_df.iloc[start:].iterrows(), date_labels(ma_df['date'].iloc[start:])):
         price = row['close']
         ma_s, ma_l = row['ma_short'], row['ma_long']
         prev = ma_df.iloc[i-1] if i > 0 else None
@@ -376,20 +372,18 @@ def run_backtest_ma_cross(df, short_window=20, long_window=60):
             'return': (total_value / INITIAL_CAPITAL - 1) * 100
         })
 
-    return trades, daily_values
+    return trades, daily_values, advance_state(state, cash, shares, position, trades, daily_values)
 
 
-def run_backtest_macd(df, fast=12, slow=26, signal=9):
+def run_backtest_macd(df, fast=12, slow=26, signal=9, state=None):
     """MACD 金叉/死叉策略（场内整手）"""
+    df, start, state = resume_frame(df, state)
     macd_df = add_macd(df, fast, slow, signal)
-    cash = INITIAL_CAPITAL
-    shares = 0
-    position = 0
+    cash, shares, position = state['cash'], state['shares'], state['position']
     trades = []
     daily_values = []
 
-    for i, row in macd_df.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
+    for (i, row), date_str in zip(macd_df.iloc[start:].iterrows(), date_labels(macd_df['date'].iloc[start:])):
         price = row['close']
         macd_val = row['macd']
         sig_val = row['macd_signal']
@@ -445,21 +439,19 @@ def run_backtest_macd(df, fast=12, slow=26, signal=9):
             'return': (total_value / INITIAL_CAPITAL - 1) * 100
         })
 
-    return trades, daily_values
+    return trades, daily_values, advance_state(state, cash, shares, position, trades, daily_values)
 
 
-def run_backtest_rsi_ma_filter(df, rsi_buy=34, rsi_sell=78, ma_window=60):
+def run_backtest_rsi_ma_filter(df, rsi_buy=34, rsi_sell=78, ma_window=60, state=None):
     """RSI + 均线过滤策略：低位买，高位或跌破均线卖（场内整手）"""
+    df, start, state = resume_frame(df, state)
     ma_df = add_moving_averages(df, ma_window // 3, ma_window)  # 提供一个中期均线
     ma_df['rsi'] = calculate_rsi(ma_df['close'], RSI_PERIOD)
-    cash = INITIAL_CAPITAL
-    shares = 0
-    position = 0
+    cash, shares, position = state['cash'], state['shares'], state['position']
     trades = []
     daily_values = []
 
-    for i, row in ma_df.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
+    for (i, row), date_str in zip(ma_df.iloc[start:].iterrows(), date_labels(ma_df['date'].iloc[start:])):
         price = row['close']
         rsi_val = row['rsi']
         ma_l = row['ma_long']
@@ -515,20 +507,18 @@ def run_backtest_rsi_ma_filter(df, rsi_buy=34, rsi_sell=78, ma_window=60):
             'return': (total_value / INITIAL_CAPITAL - 1) * 100
         })
 
-    return trades, daily_values
+    return trades, daily_values, advance_state(state, cash, shares, position, trades, daily_values)
 
 
-def run_backtest_bollinger(df, window=20, num_std=2):
+def run_backtest_bollinger(df, window=20, num_std=2, state=None):
     """布林带突破/回落策略（场内整手）"""
+    df, start, state = resume_frame(df, state)
     b_df = add_bollinger(df, window, num_std)
-    cash = INITIAL_CAPITAL
-    shares = 0
-    position = 0
+    cash, shares, position = state['cash'], state['shares'], state['position']
     trades = []
     daily_values = []
 
-    for _, row in b_df.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
+    for (_, row), date_str in zip(b_df.iloc[start:].iterrows(), date_labels(b_df['date'].iloc[start:])):
         price = row['close']
         upper, lower = row['bb_upper'], row['bb_lower']
 
@@ -581,20 +571,18 @@ def run_backtest_bollinger(df, window=20, num_std=2):
             'return': (total_value / INITIAL_CAPITAL - 1) * 100
         })
 
-    return trades, daily_values
+    return trades, daily_values, advance_state(state, cash, shares, position, trades, daily_values)
 
 
-def run_backtest_donchian(df, window=20):
+def run_backtest_donchian(df, window=20, state=None):
     """唐奇安通道突破/回落策略（场内整手）"""
+    df, start, state = resume_frame(df, state)
     d_df = add_donchian(df, window)
-    cash = INITIAL_CAPITAL
-    shares = 0
-    position = 0
+    cash, shares, position = state['cash'], state['shares'], state['position']
     trades = []
     daily_values = []
 
-    for _, row in d_df.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
+    for (_, row), date_str in zip(d_df.iloc[start:].iterrows(), date_labels(d_df['date'].iloc[start:])):
         price = row['close']
         high, low = row['don_high'], row['don_low']
 
@@ -647,21 +635,19 @@ def run_backtest_donchian(df, window=20):
             'return': (total_value / INITIAL_CAPITAL - 1) * 100
         })
 
-    return trades, daily_values
+    return trades, daily_values, advance_state(state, cash, shares, position, trades, daily_values)
 
 
-def run_backtest_atr_trailing(df, ma_window=60, atr_window=14, atr_mult=2):
+def run_backtest_atr_trailing(df, ma_window=60, atr_window=14, atr_mult=2, state=None):
     """价格站上均线买入，跌破 MA - k*ATR 卖出（场内整手）"""
+    df, start, state = resume_frame(df, state)
     a_df = add_atr(df, atr_window)
     a_df = add_moving_averages(a_df, ma_window // 3, ma_window)
-    cash = INITIAL_CAPITAL
-    shares = 0
-    position = 0
+    cash, shares, position = state['cash'], state['shares'], state['position']
     trades = []
     daily_values = []
 
-    for _, row in a_df.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
+    for (_, row), date_str in zip(a_df.iloc[start:].iterrows(), date_labels(a_df['date'].iloc[start:])):
         price = row['close']
         ma_l = row['ma_long']
         atr = row['atr']
@@ -716,7 +702,7 @@ def run_backtest_atr_trailing(df, ma_window=60, atr_window=14, atr_mult=2):
             'return': (total_value / INITIAL_CAPITAL - 1) * 100
         })
 
-    return trades, daily_values
+    return trades, daily_values, advance_state(state, cash, shares, position, trades, daily_values)
 
 
 def calculate_historical_volatility(prices, window=20):
@@ -726,19 +712,16 @@ def calculate_historical_volatility(prices, window=20):
     return hv
 
 
-def run_backtest_volatility(df, buy_thr, sell_thr):
+def run_backtest_volatility(df, buy_thr, sell_thr, state=None):
     """执行波动率策略回测"""
-    df = df.copy()
+    df, start, state = resume_frame(df, state)
     df['hv'] = calculate_historical_volatility(df['close'], 20)
     
-    cash = INITIAL_CAPITAL
-    shares = 0
-    position = 0
+    cash, shares, position = state['cash'], state['shares'], state['position']
     trades = []
     daily_values = []
     
-    for _, row in df.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
+    for (_, row), date_str in zip(df.iloc[start:].iterrows(), date_labels(df['date'].iloc[start:])):
         price = row['close']
         hv = row['hv']
         
@@ -772,7 +755,7 @@ def run_backtest_volatility(df, buy_thr, sell_thr):
             'return': (total_value / INITIAL_CAPITAL - 1) * 100
         })
         
-    return trades, daily_values
+    return trades, daily_values, advance_state(state, cash, shares, position, trades, daily_values)
 
 
 def run_backtest_volume(df, buy_mult, sell_mult):
@@ -799,8 +782,7 @@ def run_backtest_volume(df, buy_mult, sell_mult):
     trades = []
     daily_values = []
     
-    for _, row in df.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
+    for (_, row), date_str in zip(df.iterrows(), date_labels(df['date'])):
         price = row['close']
         vol = row['volume']
         vol_ma = row['vol_ma250']
@@ -837,22 +819,21 @@ def run_backtest_volume(df, buy_mult, sell_mult):
     return trades, daily_values
 
 
-def run_backtest_ma_reverse(df, short_window, long_window):
+def run_backtest_ma_reverse(df, short_window, long_window, state=None):
     """执行反向均线策略回测 (死叉买入，金叉卖出)"""
-    df = df.copy()
+    df, start, state = resume_frame(df, state)
     df['ma_short'] = df['close'].rolling(window=short_window).mean()
     df['ma_long'] = df['close'].rolling(window=long_window).mean()
     
-    cash = INITIAL_CAPITAL
-    shares = 0
-    position = 0
+    cash, shares, position = state['cash'], state['shares'], state['position']
     trades = []
     daily_values = []
     
-    for i in range(1, len(df)):
+    labels = date_labels(df['date'])
+    for i in range(max(start, 1), len(df)):
         row = df.iloc[i]
         prev_row = df.iloc[i-1]
-        date_str = row['date'].strftime('%Y-%m-%d')
+        date_str = labels[i]
         price = row['close']
         
         # 死叉买入 (MA8 下穿 MA72)
@@ -889,20 +870,18 @@ def run_backtest_ma_reverse(df, short_window, long_window):
             'return': (total_value / INITIAL_CAPITAL - 1) * 100
         })
         
-    return trades, daily_values
+    return trades, daily_values, advance_state(state, cash, shares, position, trades, daily_values)
 
 
-def run_backtest_kdj(df, n=9, k_smooth=3, d_smooth=3):
+def run_backtest_kdj(df, n=9, k_smooth=3, d_smooth=3, state=None):
     """KDJ 金叉/死叉策略（场内整手）"""
+    df, start, state = resume_frame(df, state)
     k_df = add_kdj(df, n, k_smooth, d_smooth)
-    cash = INITIAL_CAPITAL
-    shares = 0
-    position = 0
+    cash, shares, position = state['cash'], state['shares'], state['position']
     trades = []
     daily_values = []
 
-    for i, row in k_df.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
+    for (i, row), date_str in zip(k_df.iloc[start:].iterrows(), date_labels(k_df['date'].iloc[start:])):
         price = row['close']
         k_val, d_val = row['K'], row['D']
         prev = k_df.iloc[i-1] if i > 0 else None
@@ -957,12 +936,12 @@ def run_backtest_kdj(df, n=9, k_smooth=3, d_smooth=3):
             'return': (total_value / INITIAL_CAPITAL - 1) * 100
         })
 
-    return trades, daily_values
+    return trades, daily_values, advance_state(state, cash, shares, position, trades, daily_values)
 
 
-def run_backtest_dynamic_rsi(df, params):
+def run_backtest_dynamic_rsi(df, params, state=None):
     """执行 动态RSI策略 (基于波动率调整阈值)"""
-    df = df.copy()
+    df, start, state = resume_frame(df, state)
     
     # 1. 计算指标
     df['rsi'] = calculate_rsi_ema(df['close'], params['rsi_period'])
@@ -971,9 +950,7 @@ def run_backtest_dynamic_rsi(df, params):
     df['log_ret'] = np.log(df['close'] / df['close'].shift(1))
     df['volatility'] = df['log_ret'].rolling(window=params['vol_window']).std() * np.sqrt(252) * 100
     
-    cash = INITIAL_CAPITAL
-    shares = 0
-    position = 0
+    cash, shares, position = state['cash'], state['shares'], state['position']
     trades = []
     daily_values = []
     
@@ -982,8 +959,7 @@ def run_backtest_dynamic_rsi(df, params):
     base_sell = params['rsi_sell_base']
     k_vol = params['k_vol']
     
-    for i, row in df.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
+    for (i, row), date_str in zip(df.iloc[start:].iterrows(), date_labels(df['date'].iloc[start:])):
         price = row['close']
         rsi = row['rsi']
         vol = row['volatility']
@@ -1041,58 +1017,7 @@ def run_backtest_dynamic_rsi(df, params):
             'return': (total_value / INITIAL_CAPITAL - 1) * 100
         })
         
-    return trades, daily_values
-
-
-def calculate_statistics(daily_values, trades):
-    """计算统计指标"""
-    if not daily_values:
-        return {}
-    
-    returns = [d['return'] for d in daily_values]
-    values = [d['total_value'] for d in daily_values]
-    
-    # 计算最大回撤
-    peak = values[0]
-    max_drawdown = 0
-    for v in values:
-        if v > peak:
-            peak = v
-        drawdown = (peak - v) / peak * 100
-        if drawdown > max_drawdown:
-            max_drawdown = drawdown
-    
-    # 计算年化收益（使用自然日天数，而非交易日数）
-    trading_days = len(daily_values)
-    total_return = returns[-1]
-    # 计算起止日期的自然天数
-    start_date = datetime.strptime(daily_values[0]['date'], '%Y-%m-%d')
-    end_date = datetime.strptime(daily_values[-1]['date'], '%Y-%m-%d')
-    calendar_days = (end_date - start_date).days
-    annual_return = ((1 + total_return / 100) ** (365 / calendar_days) - 1) * 100 if calendar_days > 0 else 0
-    
-    # 交易统计
-    buy_trades = [t for t in trades if t['action'] == '买入']
-    sell_trades = [t for t in trades if t['action'] == '卖出']
-    
-    wins = 0
-    for i, sell in enumerate(sell_trades):
-        if i < len(buy_trades):
-            if sell['price'] > buy_trades[i]['price']:
-                wins += 1
-    win_rate = (wins / len(sell_trades) * 100) if sell_trades else 0
-    
-    return {
-        'total_return': round(total_return, 2),
-        'annual_return': round(annual_return, 2),
-        'max_drawdown': round(max_drawdown, 2),
-        'trade_count': len(buy_trades),
-        'win_rate': round(win_rate, 2),
-        'start_date': daily_values[0]['date'],
-        'end_date': daily_values[-1]['date'],
-        'days': trading_days,
-        'calendar_days': calendar_days
-    }
+    return trades, daily_values, advance_state(state, cash, shares, position, trades, daily_values)
 
 
 def calculate_buy_and_hold(df):
@@ -1105,8 +1030,7 @@ def calculate_buy_and_hold(df):
     remaining_cash = INITIAL_CAPITAL - shares * start_price
     
     daily_values = []
-    for _, row in df.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
+    for (_, row), date_str in zip(df.iterrows(), date_labels(df['date'])):
         price = row['close']
         
         total_value = remaining_cash + shares * price
@@ -1129,6 +1053,9 @@ def main():
     print(f"从本地JSON获取到 {len(df)} 条数据")
     print(f"数据范围: {df['date'].min()} 至 {df['date'].max()}")
     
+    # 价格 / 代码 / 参数均未变化的策略直接从 build_cache/ 读取
+    cache = BuildCache(df)
+    
     # 2. 执行所有策略回测
     all_results = {}
     primary_strategy = None  # 主策略 (66/81)
@@ -1141,8 +1068,8 @@ def main():
         label = strategy['label']
         
         print(f"\n执行 {label} 策略...")
-        trades, daily_values = run_backtest(df, buy, sell)
-        stats = calculate_statistics(daily_values, trades)
+        trades, daily_values = cache.run(name, run_backtest, buy, sell)
+        stats = state_statistics(cache.states[name])
         
         all_results[name] = {
             'trades': trades,
@@ -1165,13 +1092,13 @@ def main():
     
     # 3. 执行理想化策略 RSI(15) EMA 32/77
     print(f"\n执行 {IDEAL_STRATEGY['label']} 策略...")
-    ideal_trades, ideal_daily_values = run_backtest_ideal(
-        df, 
+    ideal_trades, ideal_daily_values = cache.run(
+        IDEAL_STRATEGY['name'], run_backtest_ideal,
         IDEAL_STRATEGY['rsi_period'], 
         IDEAL_STRATEGY['buy'], 
         IDEAL_STRATEGY['sell']
     )
-    ideal_stats = calculate_statistics(ideal_daily_values, ideal_trades)
+    ideal_stats = state_statistics(cache.states[IDEAL_STRATEGY['name']])
     
     all_results[IDEAL_STRATEGY['name']] = {
         'trades': ideal_trades,
@@ -1190,8 +1117,8 @@ def main():
 
     # 3.5 执行新增多因子策略
     print("\n执行均线金叉策略 (MA20/MA60)...")
-    ma_trades, ma_daily_values = run_backtest_ma_cross(df, 20, 60)
-    ma_stats = calculate_statistics(ma_daily_values, ma_trades)
+    ma_trades, ma_daily_values = cache.run('strategy_ma_20_60', run_backtest_ma_cross, 20, 60)
+    ma_stats = state_statistics(cache.states['strategy_ma_20_60'])
     all_results['strategy_ma_20_60'] = {
         'trades': ma_trades,
         'daily_values': ma_daily_values,
@@ -1203,8 +1130,8 @@ def main():
     print(f"  总收益率: {ma_stats['total_return']:.2f}% | 年化: {ma_stats['annual_return']:.2f}% | 回撤: {ma_stats['max_drawdown']:.2f}%")
 
     print("执行 MACD 金叉策略 (12/26/9)...")
-    macd_trades, macd_daily_values = run_backtest_macd(df, 12, 26, 9)
-    macd_stats = calculate_statistics(macd_daily_values, macd_trades)
+    macd_trades, macd_daily_values = cache.run('strategy_macd', run_backtest_macd, 12, 26, 9)
+    macd_stats = state_statistics(cache.states['strategy_macd'])
     all_results['strategy_macd'] = {
         'trades': macd_trades,
         'daily_values': macd_daily_values,
@@ -1217,8 +1144,8 @@ def main():
     print(f"  总收益率: {macd_stats['total_return']:.2f}% | 年化: {macd_stats['annual_return']:.2f}% | 回撤: {macd_stats['max_drawdown']:.2f}%")
 
     print("执行 RSI+MA 过滤策略 (RSI 34/78 + MA60)...")
-    rsi_ma_trades, rsi_ma_daily_values = run_backtest_rsi_ma_filter(df, 34, 78, 60)
-    rsi_ma_stats = calculate_statistics(rsi_ma_daily_values, rsi_ma_trades)
+    rsi_ma_trades, rsi_ma_daily_values = cache.run('strategy_rsi_ma', run_backtest_rsi_ma_filter, 34, 78, 60)
+    rsi_ma_stats = state_statistics(cache.states['strategy_rsi_ma'])
     all_results['strategy_rsi_ma'] = {
         'trades': rsi_ma_trades,
         'daily_values': rsi_ma_daily_values,
@@ -1228,8 +1155,8 @@ def main():
     print(f"  总收益率: {rsi_ma_stats['total_return']:.2f}% | 年化: {rsi_ma_stats['annual_return']:.2f}% | 回撤: {rsi_ma_stats['max_drawdown']:.2f}%")
 
     print("执行 布林带突破策略 (20日, 2倍标准差)...")
-    bb_trades, bb_daily_values = run_backtest_bollinger(df, 20, 2)
-    bb_stats = calculate_statistics(bb_daily_values, bb_trades)
+    bb_trades, bb_daily_values = cache.run('strategy_bb_20_2', run_backtest_bollinger, 20, 2)
+    bb_stats = state_statistics(cache.states['strategy_bb_20_2'])
     all_results['strategy_bb_20_2'] = {
         'trades': bb_trades,
         'daily_values': bb_daily_values,
@@ -1239,8 +1166,8 @@ def main():
     print(f"  总收益率: {bb_stats['total_return']:.2f}% | 年化: {bb_stats['annual_return']:.2f}% | 回撤: {bb_stats['max_drawdown']:.2f}%")
 
     print("执行 唐奇安通道策略 (20日高低点)...")
-    don_trades, don_daily_values = run_backtest_donchian(df, 20)
-    don_stats = calculate_statistics(don_daily_values, don_trades)
+    don_trades, don_daily_values = cache.run('strategy_don_20', run_backtest_donchian, 20)
+    don_stats = state_statistics(cache.states['strategy_don_20'])
     all_results['strategy_don_20'] = {
         'trades': don_trades,
         'daily_values': don_daily_values,
@@ -1250,8 +1177,8 @@ def main():
     print(f"  总收益率: {don_stats['total_return']:.2f}% | 年化: {don_stats['annual_return']:.2f}% | 回撤: {don_stats['max_drawdown']:.2f}%")
 
     print("执行 MA+ATR 移动止损策略 (MA60, ATR14*2)...")
-    atr_trades, atr_daily_values = run_backtest_atr_trailing(df, 60, 14, 2)
-    atr_stats = calculate_statistics(atr_daily_values, atr_trades)
+    atr_trades, atr_daily_values = cache.run('strategy_atr_trailing', run_backtest_atr_trailing, 60, 14, 2)
+    atr_stats = state_statistics(cache.states['strategy_atr_trailing'])
     all_results['strategy_atr_trailing'] = {
         'trades': atr_trades,
         'daily_values': atr_daily_values,
@@ -1261,8 +1188,8 @@ def main():
     print(f"  总收益率: {atr_stats['total_return']:.2f}% | 年化: {atr_stats['annual_return']:.2f}% | 回撤: {atr_stats['max_drawdown']:.2f}%")
 
     print("执行 KDJ 金叉/死叉策略 (9,3,3)...")
-    kdj_trades, kdj_daily_values = run_backtest_kdj(df, 9, 3, 3)
-    kdj_stats = calculate_statistics(kdj_daily_values, kdj_trades)
+    kdj_trades, kdj_daily_values = cache.run('strategy_kdj', run_backtest_kdj, 9, 3, 3)
+    kdj_stats = state_statistics(cache.states['strategy_kdj'])
     all_results['strategy_kdj'] = {
         'trades': kdj_trades,
         'daily_values': kdj_daily_values,
@@ -1272,8 +1199,8 @@ def main():
     print(f"  总收益率: {kdj_stats['total_return']:.2f}% | 年化: {kdj_stats['annual_return']:.2f}% | 回撤: {kdj_stats['max_drawdown']:.2f}%")
 
     print("执行 波动率策略 (HV16/7)...")
-    vol_trades, vol_daily_values = run_backtest_volatility(df, 16, 7)
-    vol_stats = calculate_statistics(vol_daily_values, vol_trades)
+    vol_trades, vol_daily_values = cache.run('strategy_volatility', run_backtest_volatility, 16, 7)
+    vol_stats = state_statistics(cache.states['strategy_volatility'])
     all_results['strategy_volatility'] = {
         'trades': vol_trades,
         'daily_values': vol_daily_values,
@@ -1294,8 +1221,8 @@ def main():
     # print(f"  总收益率: {volume_stats['total_return']:.2f}% | 年化: {volume_stats['annual_return']:.2f}% | 回撤: {volume_stats['max_drawdown']:.2f}%")
 
     print("执行 反向均线策略 (MA8/72)...")
-    ma_rev_trades, ma_rev_daily_values = run_backtest_ma_reverse(df, 8, 72)
-    ma_rev_stats = calculate_statistics(ma_rev_daily_values, ma_rev_trades)
+    ma_rev_trades, ma_rev_daily_values = cache.run('strategy_ma_reverse', run_backtest_ma_reverse, 8, 72)
+    ma_rev_stats = state_statistics(cache.states['strategy_ma_reverse'])
     all_results['strategy_ma_reverse'] = {
         'trades': ma_rev_trades,
         'daily_values': ma_rev_daily_values,
@@ -1313,8 +1240,8 @@ def main():
         "vol_window": 47,
         "k_vol": -0.43
     }
-    dynamic_trades, dynamic_daily_values = run_backtest_dynamic_rsi(df, dynamic_params)
-    dynamic_stats = calculate_statistics(dynamic_daily_values, dynamic_trades)
+    dynamic_trades, dynamic_daily_values = cache.run('strategy_dynamic', run_backtest_dynamic_rsi, dynamic_params)
+    dynamic_stats = state_statistics(cache.states['strategy_dynamic'])
     all_results['strategy_dynamic'] = {
         'trades': dynamic_trades,
         'daily_values': dynamic_daily_values,
@@ -1325,14 +1252,27 @@ def main():
     
     # 4. 计算买入持有收益（无需分红处理）
     print("\n计算买入持有收益...")
-    buyhold_values = calculate_buy_and_hold(df)
-    buyhold_stats = calculate_statistics(buyhold_values, [])
+    buyhold_values = cache.run('buyhold', calculate_buy_and_hold)
+    buyhold_stats = calculate_statistics(buyhold_values, [], position=1)
     print(f"  总收益率: {buyhold_stats['total_return']:.2f}%")
     print(f"  年化收益: {buyhold_stats['annual_return']:.2f}%")
     
     # 5. 保留原有基准数据的统计
     old_stats = old_data['statistics']
     backtest_days = primary_strategy['stats']['days']
+    print(f"\n{cache.summary()}")
+    
+    # 策略节点、基准数据、导出代码都未变化时，结果文件与上次完全相同，不必重写
+    old_build = old_data['meta'].get('build', {})
+    benchmark_stats = {k: old_stats.get(k) for k in (
+        'hs300_return', 'hs300_annual', 'gold_return', 'gold_annual',
+        'nasdaq_return', 'nasdaq_annual', 'sp500_return', 'sp500_annual')}
+    build_key = cache.build_key(code_hash(main), benchmarks, benchmark_stats)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    docs_output = os.path.join(os.path.dirname(script_dir), "docs", "backtest_result.json")
+    if old_build.get('strategies') == build_key and os.path.exists(docs_output):
+        print("输入与代码均未变化，结果文件无需更新")
+        return
     
     # 5. 准备导出数据
     export_data = {
@@ -1344,7 +1284,8 @@ def main():
             'initial_capital': INITIAL_CAPITAL,
             'start_date': primary_strategy['stats']['start_date'],
             'end_date': primary_strategy['stats']['end_date'],
-            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'build': dict(old_build, strategies=build_key),
         },
         'statistics': {
             'strategy': primary_strategy['stats'],
@@ -1403,19 +1344,14 @@ def main():
         }
     }
     
-    # 6. 保存文件
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    # 保存到backtest目录
+    # 6. 保存到backtest目录和docs目录
     output_file = os.path.join(script_dir, "backtest_result.json")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(export_data, f, ensure_ascii=False, indent=2)
+    export_result(export_data, output_file, docs_output, dynamic_params)
     print(f"\n回测结果已保存至: {output_file}")
     
-    # 保存到docs目录
-    docs_output = os.path.join(os.path.dirname(script_dir), "docs", "backtest_result.json")
-    with open(docs_output, 'w', encoding='utf-8') as f:
-        json.dump(export_data, f, ensure_ascii=False)
+    # 同时写出二进制价格文件，供优化脚本内存映射读取
+    write_prices_from_daily_values(export_data['daily_values']['strategy'])
+    print(f"价格文件已保存至: {PRICES_FILE}")
     print(f"网页数据已保存至: {docs_output}")
     
     print("\n" + "=" * 60)
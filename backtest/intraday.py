@@ -0,0 +1,339 @@
+"""
+分钟线数据 - 追加写入存储 + 流式RSI + 分钟级回测
+
+存储：
+  - 每个 (代码, 分钟周期) 一个二进制文件 minute/<代码>_<周期>m.bin，只追加不改写
+  - 每条记录为定长结构（ts 为距 1970-01-01 的分钟数，北京时间；open/close/high/low/volume 为 float64）
+  - 读取用内存映射，按时间范围 searchsorted 定位；大文件用 iter_chunks() 按整天分块处理
+  - 盘中最后一根分钟线可能尚未走完，只作为临时价格返回，不写入存储（15:00 收盘K线除外）
+
+计算：
+  - StreamingRSI：逐价格更新的 RSI（EMA 平滑），口径与 calculate_rsi_ema / vector_engine.rsi_ema_matrix 一致
+  - provisional_daily_rsi()：用历史日线 + 最新分钟价，得到盘中"临时日线 RSI"
+  - resample_close()：分钟线按交易分钟数聚合为 N 分钟K线（向量化，不逐行构建 DataFrame）
+  - sweep_intraday_rsi()：多年分钟数据上的 RSI 参数批量回测，复用 vector_engine 的矩阵内核
+
+东方财富分钟线接口只提供最近几个交易日的 1 分钟数据，长历史需要每日运行 update_minute_bars() 持续累积，
+或用 append_bars() 导入其他来源的分钟数据
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from market_data import DEFAULT_STORE_DIR
+from data_source import fetch, akshare_module
+from vector_engine import (
+    INITIAL_CAPITAL, rsi_ema_matrix, resolve_positions, equity_fractional, batch_metrics, metrics_table,
+)
+
+MINUTE_DIR = "minute"
+MINUTE_DTYPE = np.dtype([
+    ('ts', '<i8'),
+    ('open', '<f8'),
+    ('close', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('volume', '<f8'),
+])
+SESSION_CLOSE_MINUTE = 15 * 60  # 15:00 收盘
+CHUNK_ROWS = 1_000_000
+
+# akshare 分钟线列名 -> 存储列名
+MINUTE_COLUMN_MAP = {
+    '时间': 'time',
+    '开盘': 'open',
+    '收盘': 'close',
+    '最高': 'high',
+    '最低': 'low',
+    '成交量': 'volume',
+}
+
+
+# ============ 时间换算 ============
+
+def to_minutes(times):
+    """时间序列转 int64 分钟数"""
+    return pd.to_datetime(pd.Series(times)).to_numpy().astype('datetime64[m]').astype(np.int64)
+
+
+def minutes_to_datetime(ts):
+    """int64 分钟数转 datetime64"""
+    return np.asarray(ts).astype('datetime64[m]').astype('datetime64[ns]')
+
+
+# ============ 存储 ============
+
+def _bar_path(symbol, period, root):
+    return os.path.join(root, MINUTE_DIR, f"{symbol}_{period}m.bin")
+
+
+def read_bars(symbol, period='1', root=DEFAULT_STORE_DIR, start=None, end=None):
+    """读取分钟线（内存映射，只读），返回结构化数组视图"""
+    path = _bar_path(symbol, period, root)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.empty(0, dtype=MINUTE_DTYPE)
+    bars = np.memmap(path, dtype=MINUTE_DTYPE, mode='r')
+    lo = 0 if start is None else int(np.searchsorted(bars['ts'], to_minutes([start])[0], side='left'))
+    hi = len(bars) if end is None else int(np.searchsorted(bars['ts'], to_minutes([end])[0], side='right'))
+    return bars[lo:hi]
+
+
+def last_bar_time(symbol, period='1', root=DEFAULT_STORE_DIR):
+    """存储中最后一根K线的分钟数，没有数据时返回 None"""
+    bars = read_bars(symbol, period, root)
+    return int(bars['ts'][-1]) if len(bars) else None
+
+
+def append_bars(symbol, df, period='1', root=DEFAULT_STORE_DIR):
+    """追加分钟线（只写入比已存最后一根更晚的K线）
+
+    Args:
+        df: 包含 time/open/close/high/low/volume 列的 DataFrame
+
+    Returns:
+        追加的条数
+    """
+    if df is None or len(df) == 0:
+        return 0
+    ts = to_minutes(df['time'])
+    order = np.argsort(ts, kind='stable')
+    ts = ts[order]
+    keep = np.r_[ts[1:] != ts[:-1], True]  # 同一分钟重复时保留最后一条
+
+    last = last_bar_time(symbol, period, root)
+    if last is not None:
+        keep &= ts > last
+    if not keep.any():
+        return 0
+
+    records = np.empty(int(keep.sum()), dtype=MINUTE_DTYPE)
+    records['ts'] = ts[keep]
+    for col in ('open', 'close', 'high', 'low', 'volume'):
+        records[col] = df[col].to_numpy(dtype=np.float64)[order][keep]
+
+    path = _bar_path(symbol, period, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as f:
+        f.write(records.tobytes())
+    return len(records)
+
+
+def iter_chunks(symbol, period='1', root=DEFAULT_STORE_DIR, chunk_rows=CHUNK_ROWS):
+    """按整天分块遍历分钟线，每块约 chunk_rows 条，不会把一天拆到两块"""
+    bars = read_bars(symbol, period, root)
+    n = len(bars)
+    start = 0
+    while start < n:
+        stop = min(start + chunk_rows, n)
+        if stop < n:
+            # 退回到当天第一根K线，保证块边界落在日期切换处
+            day = bars['ts'][stop] // 1440
+            stop = start + int(np.searchsorted(bars['ts'][start:stop] // 1440, day, side='left'))
+            if stop == start:
+                stop = min(start + chunk_rows, n)
+        yield bars[start:stop]
+        start = stop
+
+
+# ============ 数据获取 ============
+
+def fetch_minute_bars(symbol, period='1', start_date=None, end_date=None):
+    """从 akshare 获取ETF分钟线，返回 time/open/close/high/low/volume 列"""
+    ak = akshare_module()
+    kwargs = {'symbol': symbol, 'period': period, 'adjust': ''}
+    if start_date:
+        kwargs['start_date'] = start_date
+    if end_date:
+        kwargs['end_date'] = end_date
+    df = fetch(ak.fund_etf_hist_min_em, **kwargs)
+    if df is None or len(df) == 0:
+        return pd.DataFrame(columns=list(MINUTE_COLUMN_MAP.values()))
+    df = df.rename(columns=MINUTE_COLUMN_MAP)
+    df['time'] = pd.to_datetime(df['time'])
+    return df[list(MINUTE_COLUMN_MAP.values())].sort_values('time').reset_index(drop=True)
+
+
+def update_minute_bars(symbol, period='1', root=DEFAULT_STORE_DIR):
+    """增量获取分钟线并追加到存储
+
+    Returns:
+        (追加条数, 最新一根K线 dict 或 None)
+        最新一根K线可能是未走完的临时K线，仅用于盘中估算
+    """
+    last = last_bar_time(symbol, period, root)
+    start_date = None
+    if last is not None:
+        start_date = pd.Timestamp(minutes_to_datetime([last])[0]).strftime('%Y-%m-%d %H:%M:%S')
+    df = fetch_minute_bars(symbol, period, start_date=start_date)
+    if len(df) == 0:
+        return 0, None
+
+    latest = df.iloc[-1]
+    latest_bar = {'time': latest['time'], 'close': float(latest['close'])}
+    closed = df
+    minute_of_day = latest['time'].hour * 60 + latest['time'].minute
+    if minute_of_day < SESSION_CLOSE_MINUTE:
+        # 盘中最后一根K线尚未走完，不写入
+        closed = df.iloc[:-1]
+    appended = append_bars(symbol, closed, period, root)
+    print(f"[分钟线] {symbol} {period}m 追加 {appended} 条，最新 {latest['time']} 价格 {latest['close']}")
+    return appended, latest_bar
+
+
+# ============ 流式 RSI ============
+
+class StreamingRSI:
+    """逐价格更新的 RSI（EMA 平滑，alpha = 1/period）
+
+    与 calculate_rsi_ema 口径一致：第一个价格的涨跌记为 0，累计 period 个价格后才输出有效值
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 1.0 / period
+        self.prev_close = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.count = 0
+
+    def _next_state(self, price):
+        if self.prev_close is None:
+            gain = loss = 0.0
+        else:
+            delta = price - self.prev_close
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        if self.count == 0:
+            return gain, loss
+        a = self.alpha
+        return self.avg_gain * (1 - a) + gain * a, self.avg_loss * (1 - a) + loss * a
+
+    @staticmethod
+    def _rsi(avg_gain, avg_loss):
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else float('nan')
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+    def update(self, price):
+        """推进一个价格（如一根已收盘K线），返回更新后的 RSI"""
+        self.avg_gain, self.avg_loss = self._next_state(price)
+        self.prev_close = price
+        self.count += 1
+        return self.value
+
+    def warmup(self, prices):
+        """用历史价格初始化状态"""
+        for price in np.asarray(prices, dtype=np.float64):
+            self.update(float(price))
+        return self
+
+    def peek(self, price):
+        """以 price 作为下一根K线收盘价时的 RSI，不改变状态（用于盘中临时值）"""
+        if self.count + 1 < self.period:
+            return float('nan')
+        return self._rsi(*self._next_state(price))
+
+    @property
+    def value(self):
+        if self.count < self.period:
+            return float('nan')
+        return self._rsi(self.avg_gain, self.avg_loss)
+
+
+def provisional_daily_rsi(daily_df, latest_price, latest_time, period):
+    """盘中临时日线 RSI：用今天之前的日线收盘价初始化，再以最新分钟价作为今日收盘价
+
+    Args:
+        daily_df: 日线 DataFrame（date/close 列），可以包含今天的临时日K
+        latest_price: 最新分钟价
+        latest_time: 最新分钟时间
+    """
+    today = pd.Timestamp(latest_time).normalize()
+    history = daily_df.loc[daily_df['date'] < today, 'close']
+    return StreamingRSI(period).warmup(history).peek(float(latest_price))
+
+
+# ============ 聚合与回测 ============
+
+def resample_close(ts, close, minutes):
+    """把 1 分钟收盘价聚合为 N 分钟K线收盘价
+
+    按当日第几根分钟线分桶（午间休市不计入），每桶取最后一根的收盘价和时间
+
+    Returns:
+        (ts, close)：每根 N 分钟K线的结束时间（分钟数）与收盘价
+    """
+    ts = np.asarray(ts)
+    close = np.asarray(close, dtype=np.float64)
+    if minutes <= 1 or len(ts) == 0:
+        return ts.copy(), close.copy()
+    day = ts // 1440
+    day_start = np.r_[0, np.flatnonzero(np.diff(day)) + 1]
+    first_of_day = np.repeat(day_start, np.diff(np.r_[day_start, len(ts)]))
+    bucket = (np.arange(len(ts)) - first_of_day) // minutes
+    key_change = (np.diff(day) != 0) | (np.diff(bucket) != 0)
+    last = np.r_[np.flatnonzero(key_change), len(ts) - 1]
+    return ts[last], close[last]
+
+
+def load_close(symbol, minutes=1, period='1', root=DEFAULT_STORE_DIR, chunk_rows=CHUNK_ROWS):
+    """分块读取分钟线并聚合为 N 分钟收盘价序列"""
+    ts_parts, close_parts = [], []
+    for chunk in iter_chunks(symbol, period, root, chunk_rows):
+        ts, close = resample_close(chunk['ts'], chunk['close'], minutes)
+        ts_parts.append(ts)
+        close_parts.append(close)
+    if not ts_parts:
+        return np.empty(0, np.int64), np.empty(0)
+    return np.concatenate(ts_parts), np.concatenate(close_parts)
+
+
+def sweep_intraday_rsi(ts, close, periods, buy_thresholds, sell_thresholds,
+                       initial_capital=INITIAL_CAPITAL):
+    """分钟级 RSI 参数批量回测（联接基金模式，全仓进出）
+
+    每个 RSI 周期计算一次 RSI，买卖阈值组合广播成 (K线, 组合) 矩阵
+
+    Returns:
+        DataFrame，每行一个参数组合及其统计指标
+    """
+    close = np.asarray(close, dtype=np.float64)
+    dates = minutes_to_datetime(ts)
+    rsi = rsi_ema_matrix(close, periods)
+    buy_grid, sell_grid = np.meshgrid(np.asarray(buy_thresholds, dtype=np.float64),
+                                      np.asarray(sell_thresholds, dtype=np.float64), indexing='ij')
+    buy_grid, sell_grid = buy_grid.ravel(), sell_grid.ravel()
+
+    tables = []
+    for j, period in enumerate(periods):
+        r = rsi[:, j:j + 1]
+        valid = ~np.isnan(r)
+        position = resolve_positions(valid & (r < buy_grid[None, :]), valid & (r > sell_grid[None, :]))
+        equity = equity_fractional(close, position, initial_capital)
+        metrics = batch_metrics(dates, close, position, equity, initial_capital)
+        params = {
+            'rsi_period': np.full(len(buy_grid), period),
+            'buy_threshold': buy_grid,
+            'sell_threshold': sell_grid,
+        }
+        tables.append(metrics_table(params, metrics))
+    return pd.concat(tables, ignore_index=True)
+
+
+def main():
+    symbol = "512890"
+    appended, latest = update_minute_bars(symbol)
+    ts, close = load_close(symbol, minutes=30)
+    print(f"已存 {len(read_bars(symbol))} 根 1 分钟K线，聚合为 {len(close)} 根 30 分钟K线")
+    if len(close) < 100:
+        print("分钟数据不足，暂不回测（需持续运行 update_minute_bars 累积数据）")
+        return
+
+    table = sweep_intraday_rsi(ts, close, periods=[6, 14, 24],
+                               buy_thresholds=range(20, 45, 5), sell_thresholds=range(60, 85, 5))
+    print(table.sort_values('total_return', ascending=False).head(10).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
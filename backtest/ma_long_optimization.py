@@ -10,7 +10,12 @@
   反向操作：死叉=短期回调=买入机会，金叉=过度追高=卖出时机
 
 数据源：
-  使用本地 backtest_result.json 避免网络问题
+  本地 backtest_prices.npy（price_store.load_strategy_prices 内存映射读取，
+  不存在或比 backtest_result.json 旧时自动重建），避免网络问题
+
+计算方式：
+  网格扫描由 vector_engine 向量化完成（均线矩阵 + 数组比较检测交叉），
+  仅对入选的最优组合回放逐日明细
 """
 
 import os
@@ -19,6 +24,12 @@ from datetime import datetime
 import pandas as pd
 import numpy as np
 
+from price_store import load_strategy_prices
+from vector_engine import (
+    sma_matrix, cross_signals, resolve_positions,
+    equity_fractional, batch_metrics, metrics_table,
+)
+
 INITIAL_CAPITAL = 100000
 ETF_CODE = "512890"
 
@@ -29,17 +40,8 @@ LONG_MA_RANGE = range(70, 181, 2)     # 长期均线：70-180 日，步长 2（
 
 
 def fetch_etf_local():
-    """从本地 backtest_result.json 读取 ETF 数据"""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    json_path = os.path.join(script_dir, 'backtest_result.json')
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    daily = data['daily_values']['strategy']
-    df = pd.DataFrame([{
-        'date': pd.to_datetime(d['date']), 
-        'close': d['close']
-    } for d in daily])
-    return df.sort_values('date').reset_index(drop=True)
+    """从本地价格文件（backtest_prices.npy）读取 ETF 数据"""
+    return load_strategy_prices()
 
 
 def add_ma(df, short_window, long_window):
@@ -171,37 +173,62 @@ def backtest_ma_system(df, short_ma, long_ma):
     }
 
 
+def sweep_ma_pairs(df, short_range=SHORT_MA_RANGE, long_range=LONG_MA_RANGE):
+    """
+    向量化网格扫描：返回 参数组合 × 指标 表格
+    所有窗口的均线由一次累积和计算，死叉/金叉对全部组合一次性检测
+    """
+    close = df['close'].to_numpy(dtype=np.float64)
+    windows = sorted(set(short_range) | set(long_range))
+    col = {w: i for i, w in enumerate(windows)}
+    sma = sma_matrix(close, windows)
+
+    pairs = [(s, l) for s in short_range for l in long_range if s < l]
+    short_idx = [col[s] for s, _ in pairs]
+    long_idx = [col[l] for _, l in pairs]
+
+    # 反向策略：死叉买入，金叉卖出
+    golden, dead = cross_signals(sma[:, short_idx], sma[:, long_idx])
+    position = resolve_positions(dead, golden)
+    equity = equity_fractional(close, position, INITIAL_CAPITAL)
+    metrics = batch_metrics(df['date'], close, position, equity, INITIAL_CAPITAL)
+
+    params = {
+        'short_ma': [s for s, _ in pairs],
+        'long_ma': [l for _, l in pairs],
+    }
+    return metrics_table(params, metrics)
+
+
 def optimize(df):
     """网格搜索最优均线参数"""
-    results = []
     total_combinations = len(SHORT_MA_RANGE) * len(LONG_MA_RANGE)
-    count = 0
-    
     print(f"开始网格搜索，共 {total_combinations} 种参数组合...")
-    
-    for short_ma in SHORT_MA_RANGE:
-        for long_ma in LONG_MA_RANGE:
-            if short_ma >= long_ma:
-                continue
-            count += 1
-            if count % 10 == 0:
-                print(f"  进度: {count}/{total_combinations}")
-            
-            res = backtest_ma_system(df, short_ma, long_ma)
-            results.append(res)
-    
+
+    table = sweep_ma_pairs(df)
+    table['sharpe_like'] = table['annual_return'] / (table['max_drawdown'] + 1)
+    print(f"  完成: {len(table)} 组有效参数")
+
+    def detail(row):
+        return backtest_ma_system(df, int(row['short_ma']), int(row['long_ma']))
+
     # 按总收益排序
-    results_sorted = sorted(results, key=lambda x: x['total_return'], reverse=True)
+    by_total = table.sort_values('total_return', ascending=False, kind='stable')
     # 按年化收益排序
-    results_by_annual = sorted(results, key=lambda x: x['annual_return'], reverse=True)
+    by_annual = table.sort_values('annual_return', ascending=False, kind='stable')
     # 按夏普比率排序（简化版：年化/回撤）
-    results_by_sharpe = sorted(results, key=lambda x: x['annual_return'] / (x['max_drawdown'] + 1), reverse=True)
-    
+    by_sharpe = table.sort_values('sharpe_like', ascending=False, kind='stable')
+
+    # 仅对入选组合回放逐日明细（交易记录与每日净值）
+    top_rows = [row for _, row in by_total.head(30).iterrows()]
+    top_results = [detail(row) for row in top_rows]
+
     return {
-        'by_total_return': results_sorted[0],
-        'by_annual_return': results_by_annual[0],
-        'by_sharpe': results_by_sharpe[0],
-        'all_results': results_sorted[:30]  # 保留前30
+        'by_total_return': top_results[0],
+        'by_annual_return': detail(by_annual.iloc[0]),
+        'by_sharpe': detail(by_sharpe.iloc[0]),
+        'all_results': top_results,  # 保留前30
+        'table': table,
     }
 
 
@@ -0,0 +1,116 @@
+"""
+MACD 参数优化 - 红利低波ETF (512890)
+
+策略逻辑（与 generate_multi_strategy_data.run_backtest_macd 一致）：
+  买入信号：MACD 上穿信号线（MACD 柱由负转正）
+  卖出信号：MACD 下穿信号线（MACD 柱由正转负）
+  交易方式：场内ETF整手（100份）
+
+计算方式：
+  vector_engine 批量计算全部跨度的 EMA 与 MACD 柱，
+  数百组 (fast, slow, signal) 组合的交叉信号一次性得到
+
+数据源：
+  本地 backtest_prices.npy（price_store.load_strategy_prices 内存映射读取，
+  不存在或比 backtest_result.json 旧时自动重建），避免网络问题
+"""
+
+import os
+import json
+from datetime import datetime
+import pandas as pd
+import numpy as np
+
+from price_store import load_strategy_prices
+from vector_engine import (
+    macd_histogram, cross_signals, resolve_positions,
+    equity_lots, batch_metrics, metrics_table,
+)
+
+INITIAL_CAPITAL = 100000
+ETF_CODE = "512890"
+
+# 优化范围
+FAST_RANGE = range(5, 21)        # 快线 EMA：5-20 日
+SLOW_RANGE = range(20, 61, 2)    # 慢线 EMA：20-60 日，步长 2
+SIGNAL_RANGE = range(5, 16)      # 信号线 EMA：5-15 日
+CHUNK_SIZE = 2000                # 每批计算的参数组合数（控制内存占用）
+
+
+def fetch_etf_local():
+    """从本地价格文件（backtest_prices.npy）读取 ETF 数据"""
+    return load_strategy_prices()
+
+
+def sweep_macd(df, fast_range=FAST_RANGE, slow_range=SLOW_RANGE,
+               signal_range=SIGNAL_RANGE, chunk_size=CHUNK_SIZE):
+    """向量化网格扫描：返回 参数组合 × 指标 表格"""
+    close = df['close'].to_numpy(dtype=np.float64)
+    combos = [(f, s, g) for f in fast_range for s in slow_range for g in signal_range if f < s]
+
+    tables = []
+    for start in range(0, len(combos), chunk_size):
+        chunk = np.array(combos[start:start + chunk_size])
+        hist = macd_histogram(close, chunk[:, 0], chunk[:, 1], chunk[:, 2])
+        golden, dead = cross_signals(hist, np.zeros_like(hist))
+        position = resolve_positions(golden, dead)
+        equity = equity_lots(close, position, INITIAL_CAPITAL)
+        metrics = batch_metrics(df['date'], close, position, equity, INITIAL_CAPITAL)
+        params = {'fast': chunk[:, 0], 'slow': chunk[:, 1], 'signal': chunk[:, 2]}
+        tables.append(metrics_table(params, metrics))
+
+    return pd.concat(tables, ignore_index=True)
+
+
+def main():
+    print("=" * 80)
+    print("MACD 参数优化 - 红利低波ETF (512890)")
+    print("=" * 80)
+
+    df = fetch_etf_local()
+    print(f"数据范围: {df['date'].min().date()} 至 {df['date'].max().date()} 共 {len(df)} 条")
+
+    table = sweep_macd(df)
+    print(f"测试了 {len(table)} 组参数组合")
+
+    table['sharpe_like'] = table['annual_return'] / (table['max_drawdown'] + 1)
+    by_total = table.sort_values('total_return', ascending=False, kind='stable')
+    by_sharpe = table.sort_values('sharpe_like', ascending=False, kind='stable')
+
+    default = table[(table['fast'] == 12) & (table['slow'] == 26) & (table['signal'] == 9)]
+    if len(default):
+        d = default.iloc[0]
+        print(f"\n默认参数 MACD(12,26,9): 总收益 {d['total_return']:.2f}% | 年化 {d['annual_return']:.2f}% | 回撤 {d['max_drawdown']:.2f}%")
+
+    print("\nTop 10 参数组合 (按总收益):")
+    print(f"{'排名':<4} {'快线':<6} {'慢线':<6} {'信号':<6} {'总收益':<10} {'年化':<8} {'回撤':<8} {'交易次数':<8} {'胜率':<8}")
+    print("-" * 80)
+    for i, (_, r) in enumerate(by_total.head(10).iterrows(), 1):
+        print(f"{i:<4} {int(r['fast']):<6} {int(r['slow']):<6} {int(r['signal']):<6} "
+              f"{r['total_return']:<10.2f}% {r['annual_return']:<8.2f}% {r['max_drawdown']:<8.2f}% "
+              f"{int(r['trade_count']):<8} {r['win_rate']:<8.2f}%")
+
+    # 保存结果
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    output = {
+        'meta': {
+            'etf_code': ETF_CODE,
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'fast_range': list(FAST_RANGE),
+            'slow_range': list(SLOW_RANGE),
+            'signal_range': list(SIGNAL_RANGE),
+            'total_combinations': len(table),
+            'strategy': 'MACD 金叉买入, 死叉卖出（场内整手）',
+        },
+        'best_by_total_return': by_total.iloc[0].to_dict(),
+        'best_by_sharpe': by_sharpe.iloc[0].to_dict(),
+        'top_30': by_total.head(30).to_dict(orient='records'),
+    }
+    out_file = os.path.join(script_dir, 'macd_optimization_results.json')
+    with open(out_file, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2, default=float)
+    print(f"\n结果已保存: {out_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+本地行情数据仓库 - 按标的存储 + 增量追加
+
+所有脚本通过 get_etf_history() 读取 ETF 行情：
+  - 每个 (代码, 周期, 复权方式) 存为一个 NPZ 文件（按列存储）
+  - manifest.json 记录每个文件的行数、起止日期与更新时间
+  - 刷新时只请求最后已存交易日之后的K线并追加，不再每次下载完整历史
+
+前复权说明：
+  分红除权后，前复权价格会整体改变。增量请求会与已存数据重叠两根K线，
+  用倒数第二根（已收盘确定的K线）校验价格，不一致时自动全量重新下载；
+  最后一根K线可能是盘中未收盘数据，始终以新数据覆盖
+
+批量获取：
+  get_etf_histories() 用有界线程池并发获取多个标的，每个请求独立超时，
+  总耗时取决于最慢的标的而不是各标的之和；align_closes() 把结果对齐成宽表。
+  超时作为截止时间传到请求本身（fetch_retry 的 deadline 与 HTTP 超时），
+  挂起的请求会在截止时间内抛错结束，工作线程随之退出
+
+存储目录默认为 backtest/market_store/，可用环境变量 MARKET_DATA_DIR 覆盖
+"""
+
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_source import fetch, akshare_module
+
+DEFAULT_STORE_DIR = os.environ.get(
+    "MARKET_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "market_store")
+)
+MANIFEST_FILE = "manifest.json"
+FULL_HISTORY_START = "19700101"
+
+# akshare 列名 -> 存储列名
+COLUMN_MAP = {
+    '日期': 'date',
+    '开盘': 'open',
+    '收盘': 'close',
+    '最高': 'high',
+    '最低': 'low',
+    '成交量': 'volume',
+}
+VALUE_COLUMNS = ['open', 'close', 'high', 'low', 'volume']
+
+# 批量获取默认并发数与单个请求超时（秒）
+MAX_WORKERS = 4
+REQUEST_TIMEOUT = 60
+
+# 并发写入时保护 manifest 的读-改-写
+_manifest_lock = threading.Lock()
+
+
+# ============ 数据源 ============
+
+def fetch_etf_hist(symbol, period="daily", adjust="qfq", start_date=FULL_HISTORY_START, end_date=None,
+                   deadline=None):
+    """从 akshare 获取ETF K线（带重试/退避/对冲请求，支持录制/回放），返回标准列名的 DataFrame
+
+    deadline 为总截止时间（秒），默认使用 fetch_retry.DEADLINE
+    """
+    ak = akshare_module()
+
+    end_date = end_date or datetime.now().strftime('%Y%m%d')
+    df = fetch(ak.fund_etf_hist_em, symbol=symbol, period=period,
+               start_date=start_date, end_date=end_date, adjust=adjust, deadline=deadline)
+    return normalize_hist(df)
+
+
+def normalize_hist(df):
+    """统一列名/类型并按日期排序"""
+    if df is None or len(df) == 0:
+        return pd.DataFrame(columns=['date'] + VALUE_COLUMNS)
+    df = df.rename(columns=COLUMN_MAP)
+    df['date'] = pd.to_datetime(df['date'])
+    for col in VALUE_COLUMNS:
+        if col not in df.columns:
+            df[col] = np.nan
+    df = df[['date'] + VALUE_COLUMNS]
+    return df.sort_values('date').drop_duplicates('date', keep='last').reset_index(drop=True)
+
+
+# ============ 本地存储 ============
+
+def _key(symbol, period, adjust):
+    return f"{symbol}_{period}_{adjust or 'none'}"
+
+
+def _manifest_path(root):
+    return os.path.join(root, MANIFEST_FILE)
+
+
+def load_manifest(root=DEFAULT_STORE_DIR):
+    """读取 manifest（不存在时返回空字典）"""
+    path = _manifest_path(root)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest, root):
+    path = _manifest_path(root)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_history(symbol, period="daily", adjust="qfq", root=DEFAULT_STORE_DIR):
+    """读取本地已存的K线，不存在时返回 None"""
+    path = os.path.join(root, _key(symbol, period, adjust) + '.npz')
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        df = pd.DataFrame({'date': data['date'].astype('datetime64[D]').astype('datetime64[ns]')})
+        for col in VALUE_COLUMNS:
+            df[col] = data[col]
+    return df
+
+
+def save_history(df, symbol, period="daily", adjust="qfq", root=DEFAULT_STORE_DIR):
+    """写入本地K线（日期存为 int32 天数，数值列为 float64）并更新 manifest"""
+    os.makedirs(root, exist_ok=True)
+    key = _key(symbol, period, adjust)
+    path = os.path.join(root, key + '.npz')
+
+    days = df['date'].to_numpy().astype('datetime64[D]').astype(np.int32)
+    columns = {col: df[col].to_numpy(dtype=np.float64) for col in VALUE_COLUMNS}
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, date=days, **columns)
+    os.replace(tmp_path, path)
+
+    with _manifest_lock:
+        _update_manifest(root, key, df, symbol, period, adjust)
+
+
+def _update_manifest(root, key, df, symbol, period, adjust):
+    manifest = load_manifest(root)
+    manifest[key] = {
+        'symbol': symbol,
+        'period': period,
+        'adjust': adjust,
+        'file': key + '.npz',
+        'rows': int(len(df)),
+        'first_date': df['date'].min().strftime('%Y-%m-%d') if len(df) else None,
+        'last_date': df['date'].max().strftime('%Y-%m-%d') if len(df) else None,
+        'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    _save_manifest(manifest, root)
+
+
+def update_history(symbol, period="daily", adjust="qfq", root=DEFAULT_STORE_DIR, fetcher=fetch_etf_hist,
+                   deadline=None):
+    """增量刷新本地K线并返回完整历史
+
+    Args:
+        fetcher: 数据获取函数，签名同 fetch_etf_hist
+        deadline: 本次刷新的总截止时间（秒），多次请求共用，剩余时间逐次传给 fetcher
+    """
+    end = None if deadline is None else time.monotonic() + deadline
+
+    def request(**kwargs):
+        if end is not None:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{symbol} 刷新超过截止时间 {deadline}秒")
+            kwargs['deadline'] = remaining
+        return fetcher(symbol, period=period, adjust=adjust, **kwargs)
+
+    stored = load_history(symbol, period, adjust, root)
+
+    if stored is None or len(stored) < 2:
+        full = request()
+        save_history(full, symbol, period, adjust, root)
+        print(f"[行情仓库] {symbol} {period} 全量下载 {len(full)} 条")
+        return full
+
+    # 与已存数据重叠两根K线：倒数第二根用于校验复权价格，最后一根可能为盘中数据
+    anchor = stored.iloc[-2]
+    start = anchor['date'].strftime('%Y%m%d')
+    fresh = request(start_date=start)
+
+    overlap = fresh[fresh['date'] == anchor['date']]
+    if len(overlap) == 0 or not np.isclose(overlap['close'].iloc[0], anchor['close'], rtol=1e-9, atol=0):
+        full = request()
+        save_history(full, symbol, period, adjust, root)
+        print(f"[行情仓库] {symbol} {period} 复权价格变化，全量重新下载 {len(full)} 条")
+        return full
+
+    merged = pd.concat([stored[stored['date'] < anchor['date']], fresh], ignore_index=True)
+    merged = merged.sort_values('date').drop_duplicates('date', keep='last').reset_index(drop=True)
+    save_history(merged, symbol, period, adjust, root)
+    new_rows = len(merged) - len(stored)
+    print(f"[行情仓库] {symbol} {period} 增量获取 {len(fresh)} 条，新增 {max(new_rows, 0)} 条")
+    return merged
+
+
+def get_etf_history(symbol, period="daily", adjust="qfq", root=DEFAULT_STORE_DIR, refresh=True, deadline=None):
+    """统一的ETF行情入口
+
+    Args:
+        refresh: True 时先增量刷新；False 时只读本地（本地没有则全量下载）
+        deadline: 网络请求的总截止时间（秒），默认使用 fetch_retry.DEADLINE
+
+    Returns:
+        DataFrame，列为 date/open/close/high/low/volume，按日期升序
+    """
+    if not refresh:
+        stored = load_history(symbol, period, adjust, root)
+        if stored is not None:
+            return stored
+    return update_history(symbol, period, adjust, root, deadline=deadline)
+
+
+# ============ 批量获取 ============
+
+def get_etf_histories(symbols, period="daily", adjust="qfq", root=DEFAULT_STORE_DIR, refresh=True,
+                      max_workers=MAX_WORKERS, timeout=REQUEST_TIMEOUT):
+    """并发获取多个ETF的行情
+
+    Args:
+        symbols: ETF代码列表
+        max_workers: 最大并发数
+        timeout: 单个标的的超时秒数（从该请求实际开始执行算起，排队时间不计），
+                 作为截止时间传给请求本身，超时的请求抛错结束
+
+    Returns:
+        {代码: DataFrame}，获取失败或超时的标的为 None
+    """
+    symbols = list(dict.fromkeys(symbols))
+    started = {}
+
+    def task(symbol):
+        started[symbol] = time.monotonic()
+        return get_etf_history(symbol, period, adjust, root, refresh, deadline=timeout)
+
+    results = {symbol: None for symbol in symbols}
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols) or 1)))
+    pending = {executor.submit(task, symbol): symbol for symbol in symbols}
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            for future in done:
+                symbol = pending.pop(future)
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    print(f"[行情仓库] {symbol} 获取失败: {e}")
+
+            now = time.monotonic()
+            for future, symbol in list(pending.items()):
+                if symbol in started and now - started[symbol] > timeout:
+                    # 请求自身也会在截止时间内抛错结束，这里不再等待它
+                    future.cancel()
+                    pending.pop(future)
+                    print(f"[行情仓库] {symbol} 获取超时（>{timeout}秒）")
+    finally:
+        executor.shutdown(wait=False)
+    return results
+
+
+def align_closes(histories, start_date=None, end_date=None, column='close'):
+    """把多个标的的行情对齐成宽表
+
+    Args:
+        histories: {名称: DataFrame}，值为 None 的标的会被跳过
+        start_date, end_date: 可选的日期范围
+
+    Returns:
+        DataFrame，index 为日期（各标的日期的并集），每列一个标的，缺失为 NaN
+    """
+    series = {}
+    for name, df in histories.items():
+        if df is None or len(df) == 0:
+            continue
+        s = df.set_index('date')[column]
+        if start_date is not None:
+            s = s[s.index >= pd.Timestamp(start_date)]
+        if end_date is not None:
+            s = s[s.index <= pd.Timestamp(end_date)]
+        series[name] = s
+    if not series:
+        return pd.DataFrame()
+    return pd.concat(series, axis=1).sort_index()
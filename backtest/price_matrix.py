@@ -0,0 +1,204 @@
+"""
+多标的对齐价格矩阵 - 内存映射，多进程共享
+
+把多个 ETF 的行情对齐到同一个交易日历上，存为 (标的 × 交易日) 的 float64 矩阵：
+  - universe_<字段>.npy    价格矩阵，每行一个标的（行内连续，取单个标的无需拷贝）
+  - universe_dates.npy     交易日历，int32（距 1970-01-01 的天数）
+  - universe_index.json    元数据：标的列表、字段、日历起止与内容哈希、各标的首个有效日期
+
+对齐规则：
+  - 交易日历默认取所有标的交易日的并集
+  - 停牌/休市缺失按前值填充（只填充首个有效价格之后的缺口，上市前保持 NaN）
+
+读取用 np.load(mmap_mode='r')，多个进程同时打开只占一份页缓存；
+按日期切片时用 TradingCalendar 查表（O(1)）得到列号，再做视图切片
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from market_data import DEFAULT_STORE_DIR, get_etf_histories
+from trading_calendar import TradingCalendar, to_days
+
+INDEX_FILE = "universe_index.json"
+DATES_FILE = "universe_dates.npy"
+
+# 默认标的池：红利低波 + 对比基准
+DEFAULT_UNIVERSE = {
+    '512890': '红利低波ETF',
+    '510300': '沪深300ETF',
+    '518880': '黄金ETF',
+    '159941': '纳指ETF',
+    '513500': '标普500ETF',
+}
+
+
+def ffill_matrix(values):
+    """按行前值填充 NaN（首个有效值之前保持 NaN）"""
+    valid = ~np.isnan(values)
+    idx = np.where(valid, np.arange(values.shape[1]), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    # 首个有效值之前 idx 为 0，取到的第 0 列本身就是 NaN
+    return values[np.arange(values.shape[0])[:, None], idx]
+
+
+def _save_array(path, arr):
+    """先写临时文件再替换，已映射旧文件的进程不受影响"""
+    tmp_path = path + '.tmp.npy'
+    np.save(tmp_path, arr)
+    os.replace(tmp_path, path)
+
+
+def align_frames(frames, field='close'):
+    """把 {标的: DataFrame} 对齐成 (标的 × 交易日) 矩阵
+
+    Returns:
+        (symbols, days, values)：days 为 int32 天数，values 形状 (标的数, 交易日数)
+    """
+    symbols = [s for s, df in frames.items() if df is not None and len(df) > 0]
+    day_lists = {s: to_days(frames[s]['date']) for s in symbols}
+    days = np.unique(np.concatenate([day_lists[s] for s in symbols])) if symbols else np.empty(0, np.int32)
+
+    values = np.full((len(symbols), len(days)), np.nan)
+    for row, s in enumerate(symbols):
+        cols = np.searchsorted(days, day_lists[s])
+        values[row, cols] = frames[s][field].to_numpy(dtype=np.float64)
+    return symbols, days.astype(np.int32), ffill_matrix(values)
+
+
+def build_price_matrix(symbols=None, field='close', root=DEFAULT_STORE_DIR, refresh=True):
+    """从本地行情仓库构建并写出对齐矩阵
+
+    Args:
+        symbols: 标的代码列表，默认 DEFAULT_UNIVERSE
+        field: 价格字段（close/open/high/low/volume）
+        refresh: 是否先增量刷新行情
+
+    Returns:
+        写出的 PriceMatrix
+    """
+    symbols = list(symbols or DEFAULT_UNIVERSE)
+    frames = get_etf_histories(symbols, root=root, refresh=refresh)
+    missing = [s for s in symbols if frames.get(s) is None]
+    if missing:
+        print(f"[价格矩阵] 以下标的获取失败，已跳过: {', '.join(missing)}")
+
+    names, days, values = align_frames(frames, field)
+    first_valid = np.argmax(~np.isnan(values), axis=1) if len(days) else np.zeros(len(names), int)
+
+    os.makedirs(root, exist_ok=True)
+    _save_array(os.path.join(root, f"universe_{field}.npy"), np.ascontiguousarray(values))
+    _save_array(os.path.join(root, DATES_FILE), days)
+
+    index_path = os.path.join(root, INDEX_FILE)
+    index = {}
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    days_hash = hashlib.sha1(np.ascontiguousarray(days, dtype='<i4').tobytes()).hexdigest()
+    if index.get('symbols') != names or index.get('days_hash') != days_hash:
+        # 标的或日历变了（日历按内容比较，天数相同但日期平移也算），其他字段的矩阵已不再对齐
+        index['fields'] = []
+    index.update({
+        'symbols': names,
+        'names': {s: DEFAULT_UNIVERSE.get(s, s) for s in names},
+        'first_date': str(days[0].astype('datetime64[D]')) if len(days) else None,
+        'last_date': str(days[-1].astype('datetime64[D]')) if len(days) else None,
+        'days': int(len(days)),
+        'days_hash': days_hash,
+        'first_valid': {s: str(days[i].astype('datetime64[D]')) for s, i in zip(names, first_valid)},
+        'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    index.setdefault('fields', [])
+    if field not in index['fields']:
+        index['fields'].append(field)
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+    print(f"[价格矩阵] {len(names)} 个标的 × {len(days)} 个交易日 已写出 ({field})")
+    return PriceMatrix(field, root)
+
+
+class PriceMatrix:
+    """内存映射的对齐价格矩阵
+
+    Attributes:
+        symbols: 标的代码列表（矩阵行顺序）
+        days: int32 交易日（距 1970-01-01 的天数），内存映射
+        values: (标的 × 交易日) float64 矩阵，内存映射（只读）
+    """
+
+    def __init__(self, field='close', root=DEFAULT_STORE_DIR):
+        with open(os.path.join(root, INDEX_FILE), 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+        self.field = field
+        self.symbols = self.index['symbols']
+        self._row = {s: i for i, s in enumerate(self.symbols)}
+        self.days = np.load(os.path.join(root, DATES_FILE), mmap_mode='r')
+        self.values = np.load(os.path.join(root, f"universe_{field}.npy"), mmap_mode='r')
+        # 其他字段重建时标的或日历变了，本字段的旧矩阵已不再对齐
+        if field not in self.index.get('fields', []) or self.values.shape != (len(self.symbols), len(self.days)):
+            raise ValueError(f"universe_{field}.npy 与当前标的 / 交易日历不对齐，请重新构建: "
+                             f"build_price_matrix(field='{field}')")
+        self.calendar = TradingCalendar(np.asarray(self.days))
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def dates(self):
+        """交易日（DatetimeIndex）"""
+        return self.calendar.dates
+
+    def col(self, date, side='left'):
+        """日期对应的列号（见 TradingCalendar.locate）"""
+        return self.calendar.locate(date, side)
+
+    def _bounds(self, start, end):
+        lo = 0 if start is None else self.col(start, 'left')
+        hi = len(self.days) if end is None else self.col(end, 'right') + 1
+        return lo, max(lo, hi)
+
+    def window(self, start=None, end=None):
+        """按日期范围切片，返回 (days, values) 视图（不拷贝）"""
+        lo, hi = self._bounds(start, end)
+        return self.days[lo:hi], self.values[:, lo:hi]
+
+    def series(self, symbol, start=None, end=None):
+        """单个标的的价格（Series，index 为日期）"""
+        lo, hi = self._bounds(start, end)
+        return pd.Series(np.asarray(self.values[self._row[symbol], lo:hi]),
+                         index=self.dates[lo:hi], name=symbol)
+
+    def frame(self, symbols=None, start=None, end=None):
+        """多个标的的价格宽表（DataFrame，index 为日期，每列一个标的）"""
+        symbols = list(symbols or self.symbols)
+        lo, hi = self._bounds(start, end)
+        rows = [self._row[s] for s in symbols]
+        return pd.DataFrame(np.asarray(self.values[rows, lo:hi]).T,
+                            index=self.dates[lo:hi], columns=symbols)
+
+
+def load_price_matrix(field='close', root=DEFAULT_STORE_DIR):
+    """打开已写出的对齐矩阵
+
+    矩阵不存在，或其他字段重建后本字段已与当前标的 / 日历不对齐时，按索引中的标的重新构建
+    """
+    index_path = os.path.join(root, INDEX_FILE)
+    index = None
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    if index is None or field not in index.get('fields', []) \
+            or not os.path.exists(os.path.join(root, f"universe_{field}.npy")):
+        return build_price_matrix(symbols=index and index['symbols'], field=field, root=root)
+    return PriceMatrix(field, root)
+
+if __name__ == "__main__":
+    matrix = build_price_matrix()
+    print(matrix.frame().tail())
@@ -0,0 +1,78 @@
+"""
+回测价格二进制存储 - 替代各优化脚本重复解析 backtest_result.json
+
+backtest_result.json 有数 MB，优化脚本只需要其中 daily_values.strategy 的日期和收盘价。
+生成 JSON 时同时写出 backtest_prices.npy：
+  - 结构化数组，字段 date（int32，距 1970-01-01 的天数）和 close（float64）
+  - 读取时用内存映射（mmap），无需解析，启动耗时接近零
+
+若 npy 不存在或比 JSON 旧（例如 JSON 被其他脚本更新过），
+首次读取时会从 JSON 重建一次，之后直接映射
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from result_format import load_result
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULT_JSON = os.path.join(SCRIPT_DIR, "backtest_result.json")
+PRICES_FILE = os.path.join(SCRIPT_DIR, "backtest_prices.npy")
+
+PRICE_DTYPE = np.dtype([('date', '<i4'), ('close', '<f8')], align=True)
+
+
+def write_prices(dates, closes, path=PRICES_FILE):
+    """写出价格文件
+
+    Args:
+        dates: 日期序列（字符串 / datetime / datetime64 均可）
+        closes: 收盘价序列
+    """
+    days = pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]').astype(np.int32)
+    arr = np.empty(len(days), dtype=PRICE_DTYPE)
+    arr['date'] = days
+    arr['close'] = np.asarray(closes, dtype=np.float64)
+    order = np.argsort(arr['date'], kind='stable')
+
+    tmp_path = path + '.tmp.npy'
+    np.save(tmp_path, arr[order])
+    os.replace(tmp_path, path)
+
+
+def write_prices_from_daily_values(daily_values, path=PRICES_FILE):
+    """从 daily_values 列表（含 date/close 字段）写出价格文件"""
+    write_prices([d['date'] for d in daily_values], [d['close'] for d in daily_values], path)
+
+
+def rebuild_from_json(json_path=RESULT_JSON, path=PRICES_FILE):
+    """从 backtest_result.json 重建价格文件"""
+    data = load_result(json_path)
+    write_prices_from_daily_values(data['daily_values']['strategy'], path)
+
+
+def load_price_array(path=PRICES_FILE, json_path=RESULT_JSON):
+    """以内存映射方式读取价格数组（字段 date / close）"""
+    stale = not os.path.exists(path) or (
+        os.path.exists(json_path) and os.path.getmtime(json_path) > os.path.getmtime(path)
+    )
+    if stale:
+        if not os.path.exists(json_path):
+            raise FileNotFoundError("请先运行 rsi_backtest.py 生成 backtest_result.json")
+        rebuild_from_json(json_path, path)
+    return np.load(path, mmap_mode='r')
+
+
+def load_strategy_prices(path=PRICES_FILE, json_path=RESULT_JSON):
+    """读取策略标的的日期和收盘价
+
+    Returns:
+        DataFrame，列为 date / close，按日期升序
+    """
+    arr = load_price_array(path, json_path)
+    return pd.DataFrame({
+        'date': arr['date'].astype('datetime64[D]').astype('datetime64[ns]'),
+        'close': np.asarray(arr['close']),
+    })
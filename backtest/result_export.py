@@ -0,0 +1,34 @@
+"""
+结果导出 - 各回测脚本共用的导出流程
+
+  1. 预计算衍生序列（回撤 / 年度收益 / 滚动指标 / 动态阈值），网页直接绘制
+  2. 完整结果文件：backtest/ 与 docs/ 两份，只序列化一次（result_format）
+  3. 二进制列式文件 .bin（binary_export）
+  4. docs/ 下各级降采样文件（downsample）
+  5. docs/ 下清单 + 分片（sharded_export）
+"""
+
+import os
+
+from result_format import save_result
+from derived_series import add_derived_series
+from downsample import save_lod_results
+from sharded_export import write_sharded
+from binary_export import write_binary, binary_path
+
+
+def export_result(data, json_path, docs_path, dynamic_params=None):
+    """写出一次回测结果的全部文件（原地补充衍生序列并返回 data）
+
+    Args:
+        data: v1 结构的结果 dict
+        json_path: backtest/ 下的结果文件路径
+        docs_path: docs/ 下的结果文件路径，降采样文件和分片写在同一目录
+        dynamic_params: 动态调优策略的参数（用于导出实际阈值序列）
+    """
+    add_derived_series(data, dynamic_params)
+    save_result(data, [json_path, docs_path])
+    write_binary(data, [binary_path(json_path), binary_path(docs_path)])
+    save_lod_results(data, docs_path)
+    write_sharded(data, os.path.dirname(docs_path))
+    return data
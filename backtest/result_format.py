@@ -0,0 +1,228 @@
+"""
+回测结果文件格式 - 列式 v2 布局与旧格式兼容
+
+旧格式（v1）的 daily_values 是逐日对象列表，每条曲线都重复日期字符串和字段名，
+16 条策略曲线 + 基准使文件达到数 MB，网页需整份下载解析后才能渲染。
+
+v2 布局：
+  {
+    "format": 2,
+    "meta": ..., "statistics": ..., "trades": ..., ...   # 其余字段与 v1 相同
+    "dates": ["2019-01-02", ...],                         # 所有曲线共用的日期轴（并集，升序）
+    "series": {
+      "strategy": {
+        "start": 0, "length": 1500,                       # 在日期轴上连续时只记起点和长度
+        "columns": {"close": [...], "total_value": [...], "return": [...], ...}
+      },
+      "nasdaq": {"index": [3, 4, 6, ...], "columns": {...}} # 不连续时记录每个点在日期轴上的序号
+    }
+  }
+数值按字段固定小数位（PRECISION）舍入，NaN 记为 null。
+
+兼容：
+  - Python 读取统一走 load_result()，v2 会展开为 v1 的 daily_values 结构
+  - 网页端见 docs/result_format.js 的 expandBacktestResult()
+  - 环境变量 RESULT_FORMAT=1 时仍按旧格式写出
+
+写出：
+  - 按曲线逐段序列化（安装了 orjson 时使用 orjson），backtest/ 与 docs/ 两份共用同一份字节流
+  - 先写临时文件，全部写完后再替换，读取方不会看到写了一半的文件
+"""
+
+import os
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FORMAT_VERSION = int(os.environ.get('RESULT_FORMAT', 2))
+
+# 各字段保留的小数位
+PRECISION = {
+    'close': 4,
+    'rsi': 2,
+    'cash': 2,
+    'shares': 4,
+    'total_value': 2,
+    'return': 4,
+    'drawdown': 2,
+    'vol': 2,
+    'buy_threshold': 2,
+    'sell_threshold': 2,
+}
+DEFAULT_PRECISION = 4
+
+
+def _round_values(values, key):
+    """一列数值按固定小数位舍入（整数列原样保留，NaN/None 记为 null）"""
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind in 'iub':
+            return values.tolist()
+        arr = np.round(values.astype(np.float64), PRECISION.get(key, DEFAULT_PRECISION))
+        return [None if v != v else v for v in arr.tolist()]
+    values = list(values)
+    present = [v for v in values if v is not None]
+    if all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in present):
+        return [None if v is None else int(v) for v in values]
+    if not all(isinstance(v, (int, float, np.number)) for v in present):
+        return values
+    arr = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return _round_values(arr, key)
+
+
+def series_dates(series):
+    """曲线的日期列表：逐日对象列表，或列式 dict（date 为一列）"""
+    if isinstance(series, dict):
+        return list(series['date'])
+    return [r['date'] for r in series]
+
+
+def series_columns(series):
+    """曲线的各字段列（不含日期），保持字段首次出现的顺序"""
+    if isinstance(series, dict):
+        return {k: v for k, v in series.items() if k != 'date'}
+    keys = []
+    for r in series:
+        for k in r:
+            if k != 'date' and k not in keys:
+                keys.append(k)
+    return {k: [r.get(k) for r in series] for k in keys}
+
+
+def _series_entry(series, position):
+    """单条曲线的 v2 列式表示：日期轴定位 + 舍入后的各列"""
+    idx = [position[d] for d in series_dates(series)]
+    entry = {}
+    if not idx or idx == list(range(idx[0], idx[0] + len(idx))):
+        entry['start'] = idx[0] if idx else 0
+        entry['length'] = len(idx)
+    else:
+        entry['index'] = idx
+    entry['columns'] = {k: _round_values(v, k) for k, v in series_columns(series).items()}
+    return entry
+
+
+def _date_axis(daily_values):
+    return sorted({d for series in daily_values.values() for d in series_dates(series)})
+
+
+def to_columnar(data, axis=None):
+    """v1 结果 dict 转为 v2 列式布局（不修改传入的 dict）
+
+    Args:
+        axis: 指定日期轴（须包含所有曲线的日期），默认取所有曲线日期的并集
+    """
+    daily_values = data.get('daily_values', {})
+    if axis is None:
+        axis = _date_axis(daily_values)
+    position = {d: i for i, d in enumerate(axis)}
+
+    result = {'format': 2}
+    result.update({k: v for k, v in data.items() if k != 'daily_values'})
+    result['dates'] = axis
+    result['series'] = {name: _series_entry(series, position) for name, series in daily_values.items()}
+    return result
+
+
+def expand_result(data):
+    """v2 列式布局展开为 v1 结构（v1 原样返回）"""
+    if data.get('format') != 2:
+        return data
+    axis = data['dates']
+    daily_values = {}
+    for name, entry in data['series'].items():
+        if 'index' in entry:
+            dates = [axis[i] for i in entry['index']]
+        else:
+            dates = axis[entry['start']:entry['start'] + entry['length']]
+        keys = list(entry['columns'])
+        columns = [entry['columns'][k] for k in keys]
+        daily_values[name] = [
+            dict(zip(['date'] + keys, row)) for row in zip(dates, *columns)
+        ]
+
+    result = {k: v for k, v in data.items() if k not in ('format', 'dates', 'series')}
+    result['daily_values'] = daily_values
+    return result
+
+
+def load_result(path):
+    """读取回测结果文件，统一返回 v1 结构"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return expand_result(json.load(f))
+
+
+def dumps(obj):
+    """序列化为 UTF-8 字节（有 orjson 时使用 orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def iter_result_chunks(data, version=None):
+    """逐段序列化结果文件
+
+    v2 按 头部字段 -> 日期轴 -> 逐条曲线 的顺序产出，同一时刻只持有一条曲线的列式数据和序列化结果
+
+    Yields:
+        bytes
+    """
+    version = version or FORMAT_VERSION
+    if version != 2:
+        yield dumps(data)
+        return
+
+    daily_values = data.get('daily_values', {})
+    axis = _date_axis(daily_values)
+    position = {d: i for i, d in enumerate(axis)}
+
+    yield b'{"format":2'
+    for key, value in data.items():
+        if key != 'daily_values':
+            yield b',' + dumps(key) + b':' + dumps(value)
+    yield b',"dates":' + dumps(axis)
+    yield b',"series":{'
+    for i, (name, series) in enumerate(daily_values.items()):
+        yield (b',' if i else b'') + dumps(name) + b':' + dumps(_series_entry(series, position))
+    yield b'}}'
+
+
+def write_atomic(paths, chunks):
+    """把同一份字节流同时写入多个文件：先写临时文件，全部成功后再逐个替换
+
+    Args:
+        paths: 目标路径（字符串或列表）
+        chunks: bytes 可迭代对象（只遍历一次）
+    """
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    tmp_paths = [p + '.tmp' for p in paths]
+    files = [open(p, 'wb') for p in tmp_paths]
+    try:
+        for chunk in chunks:
+            for f in files:
+                f.write(chunk)
+    except BaseException:
+        for f, p in zip(files, tmp_paths):
+            f.close()
+            os.remove(p)
+        raise
+    for f in files:
+        f.close()
+    for tmp_path, path in zip(tmp_paths, paths):
+        os.replace(tmp_path, path)
+
+
+def save_result(data, paths, version=None):
+    """写出回测结果文件（默认 v2 列式布局），只序列化一次，可同时写多个目标
+
+    Args:
+        data: v1 结构的结果 dict；daily_values 中的曲线可以是逐日对象列表，
+              也可以是列式 dict（{'date': [...], 'close': [...], ...}），后者无需构造逐日对象
+        paths: 目标路径（字符串或列表，如 backtest/ 与 docs/ 两份）
+        version: 1 或 2，默认取环境变量 RESULT_FORMAT（缺省为 2）
+    """
+    write_atomic(paths, iter_result_chunks(data, version))
@@ -7,11 +7,20 @@
 
 import pandas as pd
 import numpy as np
-import akshare as ak
 from datetime import datetime, timedelta
-import json
 import os
 
+from price_store import write_prices_from_daily_values, PRICES_FILE
+from market_data import get_etf_history, get_etf_histories
+from data_source import fetch, akshare_module
+from trading_calendar import TradingCalendar, date_labels
+from result_export import export_result
+from build_cache import BuildCache
+from engine_state import resume_frame, advance_state, state_statistics
+from backtest_stats import calculate_statistics
+
+ak = akshare_module()
+
 # ============ 配置参数 ============
 ETF_CODE = "512890"
 ETF_NAME = "红利低波ETF"
@@ -53,18 +62,8 @@ def get_etf_data(code):
     """获取ETF日线数据"""
     print(f"正在获取 {code} 历史数据...")
     try:
-        # 获取ETF日线数据
-        df = ak.fund_etf_hist_em(symbol=code, period="daily", adjust="qfq")
-        df['日期'] = pd.to_datetime(df['日期'])
-        df = df.rename(columns={
-            '日期': 'date',
-            '开盘': 'open',
-            '收盘': 'close',
-            '最高': 'high',
-            '最低': 'low',
-            '成交量': 'volume'
-        })
-        df = df.sort_values('date').reset_index(drop=True)
+        # 获取ETF日线数据（本地行情仓库增量刷新）
+        df = get_etf_history(code, period="daily", adjust="qfq")
         print(f"获取到 {len(df)} 条数据，从 {df['date'].min()} 到 {df['date'].max()}")
         return df
     except Exception as e:
@@ -78,10 +77,10 @@ def get_benchmark_data(code, name, index_type="index"):
     try:
         if index_type == "index":
             # 国内指数
-            df = ak.index_zh_a_hist(symbol=code, period="daily", start_date="20131201")
+            df = fetch(ak.index_zh_a_hist, symbol=code, period="daily", start_date="20131201")
         elif index_type == "us":
             # 美股指数 - 纳指100
-            df = ak.index_us_stock_sina(symbol=code)
+            df = fetch(ak.index_us_stock_sina, symbol=code)
             
         df['日期'] = pd.to_datetime(df['日期'])
         df = df.rename(columns={
@@ -97,29 +96,27 @@ def get_benchmark_data(code, name, index_type="index"):
 
 
 # ============ 回测引擎 ============
-def run_backtest(df, initial_capital=INITIAL_CAPITAL):
+def run_backtest(df, initial_capital=INITIAL_CAPITAL, state=None):
     """
     执行RSI策略回测
     
     注意：512890是累积型ETF，分红已自动再投资体现在前复权价格中
-    返回：交易记录、每日净值
+    传入上次的终态 state 时只回测其后新增的K线（见 engine_state）
+    返回：交易记录、每日净值、终态
     """
-    df = df.copy()
+    df, start, state = resume_frame(df, state, initial_capital)
     df['rsi'] = calculate_rsi(df['close'], RSI_PERIOD)
     
-    # 初始化
-    cash = initial_capital
-    shares = 0
-    position = 0  # 0: 空仓, 1: 持仓
+    # 初始化（或恢复上次终态）
+    cash, shares = state['cash'], state['shares']
+    position = state['position']  # 0: 空仓, 1: 持仓
     
     trades = []  # 交易记录
     daily_values = []  # 每日净值
     
-    for i, row in df.iterrows():
-        date = row['date']
+    for (i, row), date_str in zip(df.iloc[start:].iterrows(), date_labels(df['date'].iloc[start:])):
         price = row['close']
         rsi = row['rsi']
-        date_str = date.strftime('%Y-%m-%d')
         
         # RSI信号判断
         if pd.notna(rsi):
@@ -178,7 +175,7 @@ def run_backtest(df, initial_capital=INITIAL_CAPITAL):
             'return': (total_value / initial_capital - 1) * 100
         })
     
-    return trades, daily_values
+    return trades, daily_values, advance_state(state, cash, shares, position, trades, daily_values)
 
 
 def calculate_buy_and_hold(df, initial_capital=INITIAL_CAPITAL):
@@ -191,8 +188,7 @@ def calculate_buy_and_hold(df, initial_capital=INITIAL_CAPITAL):
     remaining_cash = initial_capital - shares * start_price
     
     daily_values = []
-    for _, row in df.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
+    for (_, row), date_str in zip(df.iterrows(), date_labels(df['date'])):
         price = row['close']
         
         total_value = remaining_cash + shares * price
@@ -216,105 +212,26 @@ def calculate_benchmark_return(df, initial_capital=INITIAL_CAPITAL, reference_da
     if df is None or len(df) == 0:
         return []
     
-    # 创建日期到价格的映射
-    date_price_map = {}
-    for _, row in df.iterrows():
-        date_str = row['date'].strftime('%Y-%m-%d')
-        date_price_map[date_str] = row['close']
-    
-    # 如果提供了参考日期，按参考日期对齐
+    # 如果提供了参考日期，按参考日期对齐（缺失日期向前填充，首个有效价格之前的日期不输出）
     if reference_dates:
-        start_price = None
-        daily_values = []
-        
-        for date_str in reference_dates:
-            if date_str in date_price_map:
-                price = date_price_map[date_str]
-                if start_price is None:
-                    start_price = price
-                total_value = initial_capital * (price / start_price)
-                daily_values.append({
-                    'date': date_str,
-                    'total_value': total_value,
-                    'return': (total_value / initial_capital - 1) * 100
-                })
-            # 如果日期不存在，使用前一个值（向前填充）
-            elif daily_values:
-                daily_values.append({
-                    'date': date_str,
-                    'total_value': daily_values[-1]['total_value'],
-                    'return': daily_values[-1]['return']
-                })
-        
-        return daily_values
-    
-    # 原始逻辑
-    start_price = df.iloc[0]['close']
-    daily_values = []
-    
-    for _, row in df.iterrows():
-        price = row['close']
-        total_value = initial_capital * (price / start_price)
-        daily_values.append({
-            'date': row['date'].strftime('%Y-%m-%d'),
-            'total_value': total_value,
-            'return': (total_value / initial_capital - 1) * 100
-        })
-    
-    return daily_values
-
-
-def calculate_statistics(daily_values, trades):
-    """计算策略统计指标"""
-    if not daily_values:
-        return {}
-    
-    returns = [d['return'] for d in daily_values]
-    values = [d['total_value'] for d in daily_values]
-    
-    # 计算最大回撤
-    peak = values[0]
-    max_drawdown = 0
-    for v in values:
-        if v > peak:
-            peak = v
-        drawdown = (peak - v) / peak * 100
-        if drawdown > max_drawdown:
-            max_drawdown = drawdown
-    
-    # 计算年化收益（使用自然日天数，而非交易日数）
-    trading_days = len(daily_values)
-    total_return = returns[-1]
-    # 计算起止日期的自然天数
-    from datetime import datetime
-    start_date = datetime.strptime(daily_values[0]['date'], '%Y-%m-%d')
-    end_date = datetime.strptime(daily_values[-1]['date'], '%Y-%m-%d')
-    calendar_days = (end_date - start_date).days
-    annual_return = ((1 + total_return / 100) ** (365 / calendar_days) - 1) * 100 if calendar_days > 0 else 0
-    
-    # 交易统计
-    buy_trades = [t for t in trades if t['action'] == '买入']
-    sell_trades = [t for t in trades if t['action'] == '卖出']
-    
-    # 计算胜率
-    wins = 0
-    for i, sell in enumerate(sell_trades):
-        if i < len(buy_trades):
-            if sell['price'] > buy_trades[i]['price']:
-                wins += 1
-    win_rate = (wins / len(sell_trades) * 100) if sell_trades else 0
-    
-    return {
-        'total_return': round(total_return, 2),
-        'annual_return': round(annual_return, 2),
-        'max_drawdown': round(max_drawdown, 2),
-        'trade_count': len(buy_trades),
-        'win_rate': round(win_rate, 2),
-        'start_date': daily_values[0]['date'],
-        'end_date': daily_values[-1]['date'],
-        'days': trading_days,
-        'calendar_days': calendar_days
-    }
+        calendar = TradingCalendar(reference_dates)
+        prices = calendar.align(df['date'], df['close'])
+        labels = calendar.labels
+    else:
+        prices = df['close'].to_numpy(dtype=np.float64)
+        labels = date_labels(df['date'])
+    
+    valid = ~np.isnan(prices)
+    if not valid.any():
+        return []
+    first = int(np.argmax(valid))
+    total_values = initial_capital * (prices[first:] / prices[first])
+    returns = (total_values / initial_capital - 1) * 100
+    
+    return [
+        {'date': date_str, 'total_value': total_value, 'return': ret}
+        for date_str, total_value, ret in zip(labels[first:], total_values.tolist(), returns.tolist())
+    ]
 
 
 def calculate_annual_return(total_return_pct, calendar_days):
@@ -348,26 +265,28 @@ def main():
     end_date = etf_df['date'].max()
     print(f"\n回测区间: {start_date.strftime('%Y-%m-%d')} 至 {end_date.strftime('%Y-%m-%d')}")
     
-    # 3. 获取基准ETF数据
+    # 3. 获取基准ETF数据（并发获取，总耗时取决于最慢的标的）
+    print(f"正在并发获取 {len(BENCHMARK_ETFS)} 个基准ETF数据...")
+    histories = get_etf_histories([info['code'] for info in BENCHMARK_ETFS.values()],
+                                  period="daily", adjust="qfq")
     benchmark_data = {}
     for key, info in BENCHMARK_ETFS.items():
-        print(f"正在获取 {info['name']} ({info['code']}) 数据...")
-        try:
-            df = ak.fund_etf_hist_em(symbol=info['code'], period="daily", adjust="qfq")
-            df['日期'] = pd.to_datetime(df['日期'])
-            df = df.rename(columns={'日期': 'date', '收盘': 'close'})
-            df = df.sort_values('date').reset_index(drop=True)
-            # 筛选到相同时间范围
-            df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-            benchmark_data[key] = df[['date', 'close']]
-            print(f"  获取到 {len(df)} 条数据")
-        except Exception as e:
-            print(f"  获取失败: {e}")
+        df = histories.get(info['code'])
+        if df is None:
+            print(f"  {info['name']} ({info['code']}) 获取失败")
             benchmark_data[key] = None
+            continue
+        # 筛选到相同时间范围
+        df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
+        benchmark_data[key] = df[['date', 'close']]
+        print(f"  {info['name']} ({info['code']}) 获取到 {len(df)} 条数据")
     
     # 4. 执行回测（无需分红处理，累积型ETF分红已体现在价格中）
     print("\n正在执行RSI策略回测...")
-    trades, strategy_values = run_backtest(etf_df)
+    # 只追加了新K线时从上次终态续算（build_cache/）
+    cache = BuildCache(etf_df, columns=('date', 'close'))
+    trades, strategy_values = cache.run('rsi_backtest_strategy', run_backtest)
+    print(f"  {cache.summary()}")
     
     print("正在计算买入持有收益...")
     buyhold_values = calculate_buy_and_hold(etf_df)
@@ -390,8 +309,8 @@ def main():
             benchmark_returns[key] = None
     
     # 5. 计算统计指标
-    strategy_stats = calculate_statistics(strategy_values, trades)
-    buyhold_stats = calculate_statistics(buyhold_values, [])
+    strategy_stats = state_statistics(cache.states['rsi_backtest_strategy'])
+    buyhold_stats = calculate_statistics(buyhold_values, [], position=1)
     
     # 使用自然日天数计算年化收益率
     calendar_days = strategy_stats.get('calendar_days', strategy_stats['days'])
@@ -462,15 +381,15 @@ def main():
         }
     }
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(export_data, f, ensure_ascii=False, indent=2)
+    # 同时写到docs目录供网页使用
+    docs_output = os.path.join(os.path.dirname(output_dir), "docs", "backtest_result.json")
+    export_result(export_data, output_file, docs_output)
     
     print(f"\n回测结果已保存至: {output_file}")
     
-    # 同时复制到docs目录供网页使用
-    docs_output = os.path.join(os.path.dirname(output_dir), "docs", "backtest_result.json")
-    with open(docs_output, 'w', encoding='utf-8') as f:
-        json.dump(export_data, f, ensure_ascii=False)
+    # 同时写出二进制价格文件，供优化脚本内存映射读取
+    write_prices_from_daily_values(export_data['daily_values']['strategy'])
+    print(f"价格文件已保存至: {PRICES_FILE}")
     print(f"网页数据已保存至: {docs_output}")
     
     return export_data
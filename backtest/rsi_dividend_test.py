@@ -7,9 +7,10 @@
 
 import pandas as pd
 import numpy as np
-import akshare as ak
 from datetime import datetime
 
+from market_data import get_etf_history
+
 # ============ 配置参数 ============
 ETF_CODE = "512890"
 RSI_PERIOD = 14
@@ -39,10 +40,7 @@ def calculate_rsi(prices, period=14):
 def get_etf_data(code):
     """获取ETF日线数据"""
     print(f"正在获取 {code} 历史数据...")
-    df = ak.fund_etf_hist_em(symbol=code, period="daily", adjust="qfq")
-    df['日期'] = pd.to_datetime(df['日期'])
-    df = df.rename(columns={'日期': 'date', '收盘': 'close'})
-    df = df.sort_values('date').reset_index(drop=True)
+    df = get_etf_history(code, period="daily", adjust="qfq")
     print(f"获取到 {len(df)} 条数据")
     return df
 
@@ -11,6 +11,8 @@ import numpy as np
 import json
 import os
 from datetime import datetime
+
+from price_store import load_strategy_prices
 # ============ 配置参数 ============
 INITIAL_CAPITAL = 100000
 
@@ -112,19 +114,7 @@ def main():
     
     # 获取数据
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    json_path = os.path.join(script_dir, "backtest_result.json")
-    
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    strategy_values = data['daily_values']['strategy']
-    
-    df = pd.DataFrame([{
-        'date': pd.to_datetime(d['date']),
-        'close': d['close']
-    } for d in strategy_values])
-    
-    df = df.sort_values('date').reset_index(drop=True)
+    df = load_strategy_prices()
     
     start_date = df['date'].min().strftime('%Y-%m-%d')
     end_date = df['date'].max().strftime('%Y-%m-%d')
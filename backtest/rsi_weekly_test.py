@@ -5,9 +5,10 @@
 
 import pandas as pd
 import numpy as np
-import akshare as ak
 from datetime import datetime
 
+from market_data import get_etf_history
+
 # ============ 配置参数 ============
 ETF_CODE = "512890"
 ETF_NAME = "红利低波ETF"
@@ -45,17 +46,7 @@ def get_etf_data(code, period="daily"):
     """
     print(f"正在获取 {code} {period} 数据...")
     try:
-        df = ak.fund_etf_hist_em(symbol=code, period=period, adjust="qfq")
-        df['日期'] = pd.to_datetime(df['日期'])
-        df = df.rename(columns={
-            '日期': 'date',
-            '开盘': 'open',
-            '收盘': 'close',
-            '最高': 'high',
-            '最低': 'low',
-            '成交量': 'volume'
-        })
-        df = df.sort_values('date').reset_index(drop=True)
+        df = get_etf_history(code, period=period, adjust="qfq")
         print(f"获取到 {len(df)} 条 {period} 数据")
         return df
     except Exception as e:
@@ -0,0 +1,96 @@
+"""
+分片导出 - 小清单 + 按曲线拆分、文件名带内容哈希的分片
+
+网页首屏只需要统计数据和两三条可见曲线，不必下载整份结果文件：
+  docs/backtest_manifest.json          清单：meta / statistics / derived 等小字段 + 各分片文件名
+  docs/shards/dates.<哈希>.json        共用日期轴
+  docs/shards/<曲线>.<哈希>.json       单条曲线（v2 列式：start/length 或 index + columns）
+  docs/shards/<曲线>.lod300.<哈希>.json 降采样版本（序号指向完整日期轴）
+  docs/shards/trades.<哈希>.json       交易记录
+
+逐条曲线生成并写出分片（完整与各级降采样），同一时刻只持有一条曲线的列式数据。
+分片内容不变则文件名不变，CDN / 浏览器缓存可长期有效；清单本身不带哈希，每次覆盖。
+旧分片保留到下一次导出（仍持有上一版清单的页面可以继续加载），之后清理。
+"""
+
+import os
+import json
+import hashlib
+
+from result_format import _date_axis, _series_entry, dumps, write_atomic
+from downsample import LOD_LEVELS, downsample_records, lod_dates
+
+MANIFEST_NAME = "backtest_manifest.json"
+SHARD_DIR = "shards"
+HASH_LENGTH = 12
+
+
+def write_shard(shard_dir, name, payload):
+    """写出一个分片，返回相对清单的路径（内容相同的分片已存在时不重写）"""
+    body = dumps(payload)
+    filename = f"{name}.{hashlib.sha1(body).hexdigest()[:HASH_LENGTH]}.json"
+    path = os.path.join(shard_dir, filename)
+    if not os.path.exists(path):
+        write_atomic(path, [body])
+    return f"{SHARD_DIR}/{filename}"
+
+
+def _manifest_files(manifest):
+    """清单引用的所有分片路径"""
+    files = {manifest.get('dates')}
+    files.update(manifest.get('trades', {}).values())
+    for entry in manifest.get('series', {}).values():
+        files.add(entry.get('file'))
+        files.update(entry.get('lod', {}).values())
+    return {f for f in files if f}
+
+
+def write_sharded(data, out_dir, levels=LOD_LEVELS):
+    """写出清单和分片
+
+    Args:
+        data: v1 结构的结果 dict
+        out_dir: 输出目录（通常为 docs/）
+        levels: 降采样级别
+
+    Returns:
+        清单 dict
+    """
+    shard_dir = os.path.join(out_dir, SHARD_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    previous = set()
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = _manifest_files(json.load(f))
+
+    daily_values = data.get('daily_values', {})
+    axis = _date_axis(daily_values)
+    position = {d: i for i, d in enumerate(axis)}
+    lod_keep = {n: lod_dates(data, n) for n in levels}
+
+    manifest = {'format': 'sharded'}
+    manifest.update({k: v for k, v in data.items() if k != 'daily_values' and not k.startswith('trades')})
+    manifest['dates'] = write_shard(shard_dir, 'dates', axis)
+    manifest['trades'] = {k: write_shard(shard_dir, k, v) for k, v in data.items() if k.startswith('trades')}
+    manifest['series'] = {}
+    for name, records in daily_values.items():
+        points = len(records)
+        manifest['series'][name] = {
+            'file': write_shard(shard_dir, name, _series_entry(records, position)),
+            'points': points,
+            'lod': {
+                str(n): write_shard(shard_dir, f"{name}.lod{n}",
+                                    _series_entry(downsample_records(records, lod_keep[n], n), position))
+                for n in levels if points > n
+            },
+        }
+
+    write_atomic(manifest_path, [dumps(manifest)])
+
+    # 清理既不被本次也不被上一版清单引用的分片
+    keep = _manifest_files(manifest) | previous
+    for filename in os.listdir(shard_dir):
+        if f"{SHARD_DIR}/{filename}" not in keep and filename.endswith('.json'):
+            os.remove(os.path.join(shard_dir, filename))
+    return manifest
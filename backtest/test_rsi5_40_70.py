@@ -7,9 +7,9 @@ RSI周期: 5日（更敏感）
 
 import pandas as pd
 import numpy as np
-import json
 import os
-from datetime import datetime
+from result_format import load_result
+from backtest_stats import calculate_statistics
 
 # ============ 配置参数 ============
 RSI_PERIOD = 5  # 5日RSI
@@ -106,53 +106,6 @@ def run_backtest(df, rsi_period, buy_threshold, sell_threshold):
     return trades, daily_values
 
 
-def calculate_statistics(daily_values, trades):
-    """计算统计指标"""
-    if not daily_values:
-        return {}
-    
-    returns = [d['return'] for d in daily_values]
-    values = [d['total_value'] for d in daily_values]
-    
-    # 计算最大回撤
-    peak = values[0]
-    max_drawdown = 0
-    for v in values:
-        if v > peak:
-            peak = v
-        drawdown = (peak - v) / peak * 100
-        if drawdown > max_drawdown:
-            max_drawdown = drawdown
-    
-    # 计算年化收益（使用自然日天数）
-    trading_days = len(daily_values)
-    total_return = returns[-1]
-    start_date = datetime.strptime(daily_values[0]['date'], '%Y-%m-%d')
-    end_date = datetime.strptime(daily_values[-1]['date'], '%Y-%m-%d')
-    calendar_days = (end_date - start_date).days
-    annual_return = ((1 + total_return / 100) ** (365 / calendar_days) - 1) * 100 if calendar_days > 0 else 0
-    
-    # 交易统计
-    buy_trades = [t for t in trades if t['action'] == '买入']
-    sell_trades = [t for t in trades if t['action'] == '卖出']
-    
-    wins = 0
-    for i, sell in enumerate(sell_trades):
-        if i < len(buy_trades):
-            if sell['price'] > buy_trades[i]['price']:
-                wins += 1
-    win_rate = (wins / len(sell_trades) * 100) if sell_trades else 0
-    
-    return {
-        'total_return': round(total_return, 2),
-        'annual_return': round(annual_return, 2),
-        'max_drawdown': round(max_drawdown, 2),
-        'trade_count': len(buy_trades),
-        'win_rate': round(win_rate, 2),
-        'calendar_days': calendar_days
-    }
-
-
 def main():
     print("=" * 60)
     print(f"5日RSI {RSI_BUY}/{RSI_SELL} 策略回测")
@@ -162,8 +115,7 @@ def main():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     json_path = os.path.join(script_dir, "backtest_result.json")
     
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_result(json_path)
     
     strategy_values = data['daily_values']['strategy']
     
@@ -0,0 +1,123 @@
+"""
+交易日历 - 用整数K线序号做所有日期对齐
+
+日期在内部统一用 int32 天数（距 1970-01-01）表示，交易日历把天数映射到K线序号：
+  - index_of(): 向量化 searchsorted，把一组日期映射为序号（精确匹配或向前取最近交易日）
+  - align(): 把另一条序列按日期对齐到本日历并前值填充，替代逐行构建 {日期字符串: 价格} 字典
+  - labels: 'YYYY-MM-DD' 字符串只在导出时生成一次，回测循环里不再逐行 strftime
+
+另外建一张日历天 -> 序号的查表，单个日期定位为 O(1)
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def to_days(dates):
+    """日期序列（字符串 / datetime / datetime64）转 int32 天数"""
+    if isinstance(dates, np.ndarray) and dates.dtype.kind == 'M':
+        return dates.astype('datetime64[D]').astype(np.int32)
+    return pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]').astype(np.int32)
+
+
+def date_labels(dates):
+    """批量格式化为 'YYYY-MM-DD' 字符串列表"""
+    return days_to_labels(to_days(dates))
+
+
+def days_to_labels(days):
+    """int32 天数批量格式化为 'YYYY-MM-DD' 字符串列表"""
+    return np.datetime_as_string(np.asarray(days).astype('datetime64[D]'), unit='D').tolist()
+
+
+class TradingCalendar:
+    """交易日历
+
+    Attributes:
+        days: 升序 int32 天数数组，第 i 个元素是第 i 根K线的日期
+    """
+
+    def __init__(self, dates):
+        days = to_days(dates) if not (isinstance(dates, np.ndarray) and dates.dtype == np.int32) else dates
+        self.days = np.unique(days)
+        self._labels = None
+        if len(self.days):
+            offsets = np.arange(self.days[0], self.days[-1] + 1, dtype=np.int32)
+            # 日历天 -> 不晚于该日的最后一个交易日序号
+            self._day_to_bar = (np.searchsorted(self.days, offsets, side='right') - 1).astype(np.int32)
+        else:
+            self._day_to_bar = np.empty(0, np.int32)
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def labels(self):
+        """'YYYY-MM-DD' 字符串列表（首次访问时生成并缓存）"""
+        if self._labels is None:
+            self._labels = days_to_labels(self.days)
+        return self._labels
+
+    @property
+    def dates(self):
+        """交易日（DatetimeIndex）"""
+        return pd.DatetimeIndex(self.days.astype('datetime64[D]').astype('datetime64[ns]'))
+
+    def locate(self, date, side='left'):
+        """单个日期的K线序号（O(1) 查表）
+
+        Args:
+            side: 'left' 返回不早于该日的第一个交易日，'right' 返回不晚于该日的最后一个交易日
+                  超出日历范围时分别返回 len(self) 或 -1
+        """
+        day = int(to_days([date])[0])
+        n = len(self.days)
+        if n == 0 or day < self.days[0]:
+            return 0 if side == 'left' else -1
+        if day > self.days[-1]:
+            return n if side == 'left' else n - 1
+        bar = int(self._day_to_bar[day - self.days[0]])
+        if side == 'left' and self.days[bar] != day:
+            bar += 1
+        return bar
+
+    def index_of(self, dates, how='exact'):
+        """批量把日期映射为K线序号
+
+        Args:
+            how: 'exact' 不在日历中的日期返回 -1；
+                 'ffill' 返回不晚于该日的最后一个交易日，早于日历起点返回 -1
+
+        Returns:
+            int32 数组
+        """
+        days = to_days(dates)
+        pos = np.searchsorted(self.days, days, side='right').astype(np.int32) - 1
+        if how == 'exact':
+            hit = pos >= 0
+            hit[hit] = self.days[pos[hit]] == days[hit]
+            pos[~hit] = -1
+        return pos
+
+    def align(self, dates, values):
+        """把 (dates, values) 序列对齐到本日历
+
+        只使用恰好落在日历上的数据点，缺失的交易日用前值填充，首个数据点之前为 NaN
+
+        Returns:
+            float64 数组，长度为 len(self)
+        """
+        values = np.asarray(values, dtype=np.float64)
+        pos = self.index_of(dates, how='exact')
+        hit = pos >= 0
+        out = np.full(len(self.days), np.nan)
+        out[pos[hit]] = values[hit]
+        return ffill(out)
+
+
+def ffill(values):
+    """一维数组前值填充（首个有效值之前保持 NaN）"""
+    valid = ~np.isnan(values)
+    idx = np.where(valid, np.arange(len(values)), 0)
+    np.maximum.accumulate(idx, out=idx)
+    return values[idx]
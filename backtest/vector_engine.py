@@ -0,0 +1,547 @@
+"""
+向量化回测引擎 - 参数扫描专用
+
+将逐行循环改写为矩阵运算，一次处理成百上千组参数：
+  - 指标矩阵：所有窗口的均线由一次累积和得到，形状 (交易日数, 窗口数)
+  - 信号矩阵：金叉/死叉等条件对每组参数用数组比较一次性得到
+  - 持仓判定：买卖信号前向填充得到每日持仓，无需逐日状态机
+  - 净值统计：按持仓累乘日收益率，回撤/胜率均为数组运算
+
+约定：
+  - 所有矩阵第 0 维为交易日，第 1 维为参数组合
+  - 买卖信号需互斥（同一天不会同时满足），与原逐行回测的判定顺序一致
+  - 净值支持联接基金模式（全仓进出，允许小数份额）与场内整手模式
+  - 指标与 pandas 逐列计算的结果仅在浮点舍入（~1e-15）上有差异，
+    价格恰好等于阈值时个别信号可能不同，导出用的逐行回测仍以原脚本为准
+"""
+
+import numpy as np
+import pandas as pd
+
+INITIAL_CAPITAL = 100000
+
+
+# ============ 指标矩阵 ============
+
+def sma_matrix(close, windows):
+    """由一次累积和计算多个窗口的简单移动平均
+
+    Args:
+        close: 收盘价序列
+        windows: 窗口长度列表
+
+    Returns:
+        (交易日数, 窗口数) 矩阵，不足窗口长度的位置为 NaN
+    """
+    close = np.asarray(close, dtype=np.float64)
+    windows = np.asarray(list(windows), dtype=np.int64)
+    n = len(close)
+
+    # 减去首日价格再累加，降低累积和的量级以减少相减时的精度损失
+    base = close[0] if n else 0.0
+    csum = np.concatenate(([0.0], np.cumsum(close - base)))
+
+    end = np.arange(1, n + 1)[:, None]
+    start = end - windows[None, :]
+    valid = start >= 0
+
+    sma = (csum[end] - csum[np.maximum(start, 0)]) / windows[None, :] + base
+    sma[~valid] = np.nan
+    return sma
+
+
+def rolling_mean_std(close, windows):
+    """由一次累积一阶/二阶矩计算多个窗口的滚动均值与标准差
+
+    标准差为样本标准差（ddof=1），与 pandas rolling().std() 一致
+
+    Returns:
+        (mean, std) 两个 (交易日数, 窗口数) 矩阵，不足窗口长度的位置为 NaN
+    """
+    close = np.asarray(close, dtype=np.float64)
+    windows = np.asarray(list(windows), dtype=np.int64)
+    n = len(close)
+
+    # 以首日价格为中心，避免二阶矩累加后大数相减
+    base = close[0] if n else 0.0
+    x = close - base
+    s1 = np.concatenate(([0.0], np.cumsum(x)))
+    s2 = np.concatenate(([0.0], np.cumsum(x * x)))
+
+    end = np.arange(1, n + 1)[:, None]
+    start = end - windows[None, :]
+    valid = start >= 0
+    start = np.maximum(start, 0)
+    w = windows[None, :].astype(np.float64)
+
+    sum1 = s1[end] - s1[start]
+    sum2 = s2[end] - s2[start]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var = (sum2 - sum1 * sum1 / w) / (w - 1)
+    std = np.sqrt(np.maximum(var, 0.0))
+    mean = sum1 / w + base
+
+    mean[~valid] = np.nan
+    std[~valid] = np.nan
+    return mean, std
+
+
+def span_to_alpha(spans):
+    """EMA 跨度换算为平滑系数，与 pandas ewm(span=...) 一致"""
+    return 2.0 / (np.asarray(list(spans), dtype=np.float64) + 1.0)
+
+
+def ema_matrix(values, alphas):
+    """批量指数移动平均（adjust=False 口径）
+
+    将多条 EMA 叠成一个线性递推 y[t] = (1 - a) * y[t-1] + a * x[t]，
+    每个交易日只做一次向量运算，所有平滑系数同时推进
+
+    Args:
+        values: 一维序列（对每个系数共用同一输入）或 (交易日数, 列数) 矩阵
+        alphas: 平滑系数，长度等于输出列数
+
+    Returns:
+        (交易日数, 列数) 矩阵；前导 NaN 保持为 NaN，首个有效值作为初值
+    """
+    alphas = np.asarray(alphas, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = np.broadcast_to(values[:, None], (len(values), len(alphas)))
+
+    out = np.empty(values.shape, dtype=np.float64)
+    decay = 1.0 - alphas
+    prev = values[0].copy()
+    out[0] = prev
+    for t in range(1, len(values)):
+        x = values[t]
+        prev = np.where(np.isnan(prev), x, decay * prev + alphas * x)
+        out[t] = prev
+    return out
+
+
+def macd_histogram(close, fast, slow, signal):
+    """批量计算 MACD 柱（macd - signal），每组 (fast, slow, signal) 占一列
+
+    所有出现过的跨度只对价格做一次 EMA，信号线 EMA 对全部组合同时递推
+    """
+    fast = np.asarray(fast, dtype=np.int64)
+    slow = np.asarray(slow, dtype=np.int64)
+    signal = np.asarray(signal, dtype=np.int64)
+
+    spans = np.unique(np.concatenate([fast, slow]))
+    price_ema = ema_matrix(close, span_to_alpha(spans))
+    col = {int(s): i for i, s in enumerate(spans)}
+    macd = (price_ema[:, [col[int(f)] for f in fast]]
+            - price_ema[:, [col[int(s)] for s in slow]])
+    macd_signal = ema_matrix(macd, span_to_alpha(signal))
+    return macd - macd_signal
+
+
+def atr_matrix(close, windows, high=None, low=None):
+    """批量计算 ATR（真实波幅的简单移动平均），每个窗口一列
+
+    缺少高低价时用收盘价代替，与 generate_multi_strategy_data.add_atr 一致：
+    首日无前收盘价，真实波幅为 NaN，因此窗口从第二个交易日开始计数
+    """
+    close = np.asarray(close, dtype=np.float64)
+    high = close if high is None else np.asarray(high, dtype=np.float64)
+    low = close if low is None else np.asarray(low, dtype=np.float64)
+
+    prev_close = close[:-1]
+    tr = np.max([
+        np.abs(high[1:] - low[1:]),
+        np.abs(high[1:] - prev_close),
+        np.abs(low[1:] - prev_close),
+    ], axis=0)
+
+    windows = list(windows)
+    atr = np.full((len(close), len(windows)), np.nan)
+    if len(tr):
+        atr[1:] = sma_matrix(tr, windows)
+    return atr
+
+
+def rsi_ema_matrix(close, periods):
+    """批量计算 RSI（EMA 平滑，alpha = 1/period），每个周期一列
+
+    口径与各脚本 calculate_rsi_ema 一致：前 period-1 个交易日为 NaN
+    """
+    close = np.asarray(close, dtype=np.float64)
+    periods = np.asarray(list(periods), dtype=np.int64)
+    delta = np.diff(close, prepend=np.nan)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+
+    alphas = 1.0 / periods
+    avg_gain = ema_matrix(gain, alphas)
+    avg_loss = ema_matrix(loss, alphas)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+
+    rows = np.arange(len(close))[:, None]
+    rsi[rows < periods[None, :] - 1] = np.nan
+    return rsi
+
+
+def volatility_matrix(close, windows):
+    """批量计算历史波动率（对数收益率滚动标准差，年化百分比），每个窗口一列"""
+    close = np.asarray(close, dtype=np.float64)
+    windows = list(windows)
+    vol = np.full((len(close), len(windows)), np.nan)
+    if len(close) > 1:
+        log_ret = np.log(close[1:] / close[:-1])
+        vol[1:] = rolling_mean_std(log_ret, windows)[1] * np.sqrt(252) * 100
+    return vol
+
+
+# ============ 信号与持仓 ============
+
+def cross_signals(fast, slow):
+    """检测每列的上穿/下穿
+
+    与逐行回测一致：
+      上穿：前一日 fast <= slow 且当日 fast > slow
+      下穿：前一日 fast >= slow 且当日 fast < slow
+    任一值为 NaN 时不产生信号
+
+    Returns:
+        (golden, dead) 两个布尔矩阵，形状与输入相同
+    """
+    diff = np.asarray(fast, dtype=np.float64) - np.asarray(slow, dtype=np.float64)
+    golden = np.zeros(diff.shape, dtype=bool)
+    dead = np.zeros(diff.shape, dtype=bool)
+    prev, cur = diff[:-1], diff[1:]
+    golden[1:] = (prev <= 0) & (cur > 0)
+    dead[1:] = (prev >= 0) & (cur < 0)
+    return golden, dead
+
+
+def _accumulate_rows(ufunc, values):
+    """沿交易日方向逐行累积（等价于 ufunc.accumulate(axis=0)）
+
+    参数组合很多时逐行原地运算可留在缓存内，比整列 accumulate 快数倍
+    """
+    out = np.empty_like(values)
+    if len(values):
+        out[0] = values[0]
+    for t in range(1, len(values)):
+        ufunc(out[t - 1], values[t], out=out[t])
+    return out
+
+
+def _ffill_index(mask):
+    """返回每个位置之前（含当日）最近一次 mask 为 True 的行号，不存在时为 -1"""
+    rows = np.arange(mask.shape[0]).reshape((-1,) + (1,) * (mask.ndim - 1))
+    idx = np.where(mask, rows, -1)
+    return _accumulate_rows(np.maximum, idx)
+
+
+def resolve_positions(buy, sell):
+    """由买卖信号得到每日收盘后的持仓（0 空仓 / 1 持仓）
+
+    空仓时遇买入信号建仓、持仓时遇卖出信号清仓，等价于
+    "最近一次有效信号是买入则持仓"，因此用前向填充即可求出
+    """
+    buy = np.asarray(buy, dtype=bool)
+    sell = np.asarray(sell, dtype=bool)
+    last_buy = _ffill_index(buy)
+    last_sell = _ffill_index(sell)
+    return (last_buy > last_sell).astype(np.int8)
+
+
+def trailing_stop_positions(close, buy, offset, floor=None):
+    """带止损的持仓判定
+
+    Args:
+        close: 收盘价序列
+        buy: (交易日数, 组合数) 入场信号
+        offset: (交易日数, 组合数) 止损距离（如 k * ATR）
+        floor: 止损基准线。给定时止损线为 floor - offset（如 MA - k*ATR），
+            与入场时点无关，直接由信号前向填充求解；
+            为 None 时止损线为"入场以来最高收盘价 - offset"（移动止损）
+
+    移动止损按"第 k 笔交易"对所有组合同时推进：
+      1) 在上一笔离场之后查找下一个入场信号
+      2) 以入场日为起点做分段累计最大值，得到入场以来的最高价
+      3) 向量化查找首个跌破止损线的交易日作为离场日
+    """
+    close = np.asarray(close, dtype=np.float64)
+    buy = np.asarray(buy, dtype=bool)
+    offset = np.asarray(offset, dtype=np.float64)
+    price = close[:, None]
+
+    if floor is not None:
+        with np.errstate(invalid='ignore'):
+            sell = price < np.asarray(floor, dtype=np.float64) - offset
+        return resolve_positions(buy, sell)
+
+    n_days, n_cols = buy.shape
+    rows = np.arange(n_days)[:, None]
+    position = np.zeros((n_days, n_cols), dtype=np.int8)
+    search_from = np.zeros(n_cols, dtype=np.int64)
+    active = np.arange(n_cols)
+
+    while len(active):
+        # 仅处理仍可能继续交易的组合，且只扫描最早搜索起点之后的交易日
+        start = int(search_from[active].min())
+        seg_rows = rows[start:]
+        seg_price = price[start:]
+        seg_buy = buy[start:, active]
+        seg_offset = offset[start:, active]
+
+        # 1) 下一个入场日
+        candidates = seg_buy & (seg_rows >= search_from[None, active])
+        has_entry = candidates.any(axis=0)
+        entry = np.argmax(candidates, axis=0) + start
+
+        # 2) 入场以来的最高收盘价（入场前置为 -inf 后做累计最大）
+        after_entry = seg_rows >= entry[None, :]
+        running_max = np.maximum.accumulate(np.where(after_entry, seg_price, -np.inf), axis=0)
+
+        # 3) 首个跌破止损线的交易日
+        with np.errstate(invalid='ignore'):
+            hit = (seg_rows > entry[None, :]) & (seg_price < running_max - seg_offset)
+        has_exit = hit.any(axis=0) & has_entry
+        exit_row = np.where(has_exit, np.argmax(hit, axis=0) + start, n_days)
+
+        held = after_entry & (seg_rows < exit_row[None, :]) & has_entry[None, :]
+        position[start:, active] |= held.astype(np.int8)
+
+        search_from[active] = exit_row + 1
+        active = active[has_exit & (exit_row + 1 < n_days)]
+
+    return position
+
+
+def dynamic_threshold_positions(rsi, vol, buy_bases, sell_bases, k_vols,
+                                buy_clip=(20, 50), sell_clip=(60, 90), vol_center=15,
+                                warmup=0, memory_budget_mb=256):
+    """波动率动态阈值 RSI 策略的批量持仓判定（按内存预算分块产出）
+
+    阈值口径与 run_backtest_dynamic_rsi 一致：
+      买入阈值 = clip(buy_base - k_vol * (vol - vol_center), *buy_clip)
+      卖出阈值 = clip(sell_base + k_vol * (vol - vol_center), *sell_clip)
+
+    买入信号只依赖 (vol窗口, k_vol, buy_base)，卖出信号只依赖 (vol窗口, k_vol, sell_base)，
+    因此分别求"最近一次信号"的行号后再广播组合，避免物化完整的信号张量
+
+    Args:
+        rsi: 单条 RSI 序列
+        vol: (交易日数, vol窗口数) 波动率矩阵
+        warmup: 前 warmup 个交易日不交易
+        memory_budget_mb: 单块持仓/净值计算的内存上限
+
+    Yields:
+        (params, position)：params 为每列的 vol_idx / k_vol / buy_base / sell_base，
+        position 形状为 (交易日数, 本块组合数)
+    """
+    rsi = np.asarray(rsi, dtype=np.float64)
+    vol = np.asarray(vol, dtype=np.float64)
+    buy_bases = np.asarray(list(buy_bases), dtype=np.float64)
+    sell_bases = np.asarray(list(sell_bases), dtype=np.float64)
+    k_vols = np.asarray(list(k_vols), dtype=np.float64)
+    n_days = len(rsi)
+
+    groups = [(v, k) for v in range(vol.shape[1]) for k in k_vols]
+    # 每个组合每个交易日约占用：持仓 1 + 净值/峰值/回撤等 float64 临时数组 ~48 字节
+    per_group = n_days * len(buy_bases) * len(sell_bases) * 48
+    groups_per_chunk = max(1, int(memory_budget_mb * 1024 * 1024 // max(per_group, 1)))
+    tradable = (np.arange(n_days) >= warmup)[:, None, None]
+
+    for start in range(0, len(groups), groups_per_chunk):
+        chunk = groups[start:start + groups_per_chunk]
+        vol_idx = np.array([v for v, _ in chunk])
+        k = np.array([k for _, k in chunk])
+
+        # (交易日, 组, 阈值基数)
+        shift = (vol[:, vol_idx] - vol_center) * k[None, :]
+        buy_thr = np.clip(buy_bases[None, None, :] - shift[:, :, None], *buy_clip)
+        sell_thr = np.clip(sell_bases[None, None, :] + shift[:, :, None], *sell_clip)
+        with np.errstate(invalid='ignore'):
+            buy = (rsi[:, None, None] < buy_thr) & tradable
+            sell = (rsi[:, None, None] > sell_thr) & tradable
+
+        last_buy = _ffill_index(buy)
+        last_sell = _ffill_index(sell)
+        position = (last_buy[:, :, :, None] > last_sell[:, :, None, :]).astype(np.int8)
+        position = position.reshape(n_days, -1)
+
+        n_b, n_s = len(buy_bases), len(sell_bases)
+        params = {
+            'vol_idx': np.repeat(vol_idx, n_b * n_s),
+            'k_vol': np.repeat(k, n_b * n_s),
+            'buy_base': np.tile(np.repeat(buy_bases, n_s), len(chunk)),
+            'sell_base': np.tile(sell_bases, len(chunk) * n_b),
+        }
+        yield params, position
+
+
+# ============ 净值与统计 ============
+
+def equity_fractional(close, position, initial_capital=INITIAL_CAPITAL):
+    """联接基金模式净值矩阵（全仓进出，允许小数份额）
+
+    当日收盘价成交，前一日持仓则当日净值随价格变动
+    """
+    close = np.asarray(close, dtype=np.float64)
+    growth = np.ones(position.shape, dtype=np.float64)
+    ratio = (close[1:] / close[:-1]).reshape((-1,) + (1,) * (position.ndim - 1))
+    growth[1:] = np.where(position[:-1] == 1, ratio, 1.0)
+    growth[0] *= initial_capital
+    return _accumulate_rows(np.multiply, growth)
+
+
+def equity_lots(close, position, initial_capital=INITIAL_CAPITAL, lot_size=100):
+    """场内ETF整手模式净值矩阵（买入按整手取整，卖出全部清仓）
+
+    逐笔交易的资金结转只依赖上一笔，按"第 k 笔交易"对所有参数列同时推进，
+    循环次数等于最大交易笔数而非交易日数
+
+    假设资金始终足够买入至少一手（与原回测在本标的上的情形一致）
+    """
+    close = np.asarray(close, dtype=np.float64)
+    position = np.asarray(position)
+    if position.ndim == 1:
+        return equity_lots(close, position[:, None], initial_capital, lot_size)[:, 0]
+
+    entries, exits = trade_points(position)
+    n_cols = position.shape[1]
+    max_trades = int(entries.sum(axis=0).max()) if entries.size else 0
+
+    # 每列第 k 笔买入/卖出所在行号（不足 k 笔时为 -1）
+    def nth_rows(mask):
+        rows = np.full((max_trades, n_cols), -1, dtype=np.int64)
+        col_idx, row_idx = np.nonzero(mask.T)
+        rank = np.arange(len(col_idx)) - np.searchsorted(col_idx, col_idx)
+        rows[rank, col_idx] = row_idx
+        return rows
+
+    entry_rows = nth_rows(entries)
+    exit_rows = nth_rows(exits)
+
+    cash_before = np.empty((max_trades + 1, n_cols), dtype=np.float64)
+    cash_during = np.zeros((max_trades, n_cols), dtype=np.float64)
+    shares = np.zeros((max_trades, n_cols), dtype=np.float64)
+    cash = np.full(n_cols, float(initial_capital))
+    cash_before[0] = cash
+    for k in range(max_trades):
+        has_entry = entry_rows[k] >= 0
+        buy_price = close[np.maximum(entry_rows[k], 0)]
+        lots = np.where(has_entry, np.floor(cash / buy_price / lot_size) * lot_size, 0.0)
+        cash_during[k] = cash - lots * buy_price
+        shares[k] = lots
+        has_exit = exit_rows[k] >= 0
+        sell_price = close[np.maximum(exit_rows[k], 0)]
+        cash = np.where(has_exit, cash_during[k] + lots * sell_price, cash_during[k])
+        cash_before[k + 1] = cash
+
+    # 每日所处的交易段：已发生的买入笔数
+    seg = np.cumsum(entries, axis=0)
+    cols = np.arange(n_cols)[None, :]
+    held = position == 1
+    trade_k = np.maximum(seg - 1, 0)
+    if max_trades:
+        held_value = cash_during[trade_k, cols] + shares[trade_k, cols] * close[:, None]
+    else:
+        held_value = np.zeros(position.shape)
+    flat_value = cash_before[seg, cols]
+    return np.where(held, held_value, flat_value)
+
+
+def trade_points(position):
+    """买入/卖出发生的位置（布尔矩阵）"""
+    prev = np.zeros_like(position)
+    prev[1:] = position[:-1]
+    entries = (position == 1) & (prev == 0)
+    exits = (position == 0) & (prev == 1)
+    return entries, exits
+
+
+def extract_trades(dates, close, position, initial_capital=INITIAL_CAPITAL,
+                   lot_size=None, signals=('买入', '卖出')):
+    """从单列持仓还原交易记录，字段与逐行回测的 trades 一致
+
+    Args:
+        lot_size: 为 None 时按联接基金模式（小数份额），否则按整手取整
+        signals: (买入说明, 卖出说明)，写入每笔交易的 signal 字段
+    """
+    close = np.asarray(close, dtype=np.float64)
+    position = np.asarray(position).reshape(-1)
+    dates = pd.to_datetime(pd.Series(dates)).dt.strftime('%Y-%m-%d').to_numpy()
+    entries, exits = trade_points(position)
+
+    cash = float(initial_capital)
+    shares = 0
+    trades = []
+    for i in np.flatnonzero(entries | exits):
+        price = float(close[i])
+        if entries[i]:
+            if lot_size is None:
+                shares, amount, cash = cash / price, cash, 0.0
+            else:
+                shares = int(cash / price / lot_size) * lot_size
+                amount = shares * price
+                cash -= amount
+            trades.append({'date': dates[i], 'action': '买入', 'price': price,
+                           'shares': shares, 'amount': amount, 'signal': signals[0]})
+        else:
+            amount = shares * price
+            cash += amount
+            trades.append({'date': dates[i], 'action': '卖出', 'price': price,
+                           'shares': shares, 'amount': amount, 'signal': signals[1]})
+            shares = 0
+    return trades
+
+
+def batch_metrics(dates, close, position, equity, initial_capital=INITIAL_CAPITAL):
+    """批量计算统计指标，口径与 backtest_stats.calculate_statistics 一致
+
+    Returns:
+        dict，每项为长度等于参数组合数的数组：
+        total_return / annual_return / max_drawdown / trade_count / win_rate
+    """
+    close = np.asarray(close, dtype=np.float64)
+    dates = pd.to_datetime(pd.Series(dates))
+    calendar_days = (dates.iloc[-1] - dates.iloc[0]).days
+
+    total_return = (equity[-1] / initial_capital - 1) * 100
+    if calendar_days > 0:
+        annual_return = ((1 + total_return / 100) ** (365 / calendar_days) - 1) * 100
+    else:
+        annual_return = np.zeros_like(total_return)
+
+    entries, exits = trade_points(position)
+    trade_count = entries.sum(axis=0)
+    sell_count = exits.sum(axis=0)
+
+    # 逐行推进峰值/最大回撤/持仓成本，不物化整块中间矩阵
+    # 每次卖出与最近一次买入配对（交易严格交替，等价于按序号配对）
+    peak = equity[0].copy()
+    max_drawdown = np.zeros(equity.shape[1:])
+    entry_price = np.zeros(equity.shape[1:])
+    wins = np.zeros(equity.shape[1:], dtype=np.int64)
+    for t in range(len(equity)):
+        np.maximum(peak, equity[t], out=peak)
+        np.maximum(max_drawdown, (peak - equity[t]) / peak * 100, out=max_drawdown)
+        entry_price[entries[t]] = close[t]
+        wins += exits[t] & (close[t] > entry_price)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        win_rate = np.where(sell_count > 0, wins / np.maximum(sell_count, 1) * 100, 0.0)
+
+    return {
+        'total_return': total_return,
+        'annual_return': annual_return,
+        'max_drawdown': max_drawdown,
+        'trade_count': trade_count,
+        'win_rate': win_rate,
+    }
+
+
+def metrics_table(params, metrics, decimals=2):
+    """将参数与统计指标拼接为 参数组合 × 指标 表格"""
+    table = pd.DataFrame(params).reset_index(drop=True)
+    for key, values in metrics.items():
+        values = np.asarray(values)
+        table[key] = values.round(decimals) if values.dtype.kind == 'f' else values
+    return table
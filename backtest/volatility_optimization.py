@@ -22,6 +22,8 @@ from datetime import datetime
 import pandas as pd
 import numpy as np
 
+from price_store import load_strategy_prices
+
 INITIAL_CAPITAL = 100000
 ETF_CODE = "512890"
 USE_LOCAL_BACKTEST_JSON = True  # 使用本地 backtest_result.json 避免联网
@@ -37,13 +39,7 @@ SELL_THRESHOLDS = np.arange(4.0, 12.1, 0.5)   # HV 低于此值卖出（波动
 def fetch_etf():
     """从本地 backtest_result.json 获取 ETF 数据"""
     if USE_LOCAL_BACKTEST_JSON:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        json_path = os.path.join(script_dir, 'backtest_result.json')
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        daily = data['daily_values']['strategy']
-        df = pd.DataFrame([{'date': pd.to_datetime(d['date']), 'close': d['close']} for d in daily])
-        return df.sort_values('date').reset_index(drop=True)
+        return load_strategy_prices()
     raise RuntimeError("请先运行 rsi_backtest.py 生成 backtest_result.json")
 
 
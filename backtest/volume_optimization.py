@@ -22,6 +22,8 @@ from datetime import datetime
 import pandas as pd
 import numpy as np
 
+from price_store import load_strategy_prices
+
 INITIAL_CAPITAL = 100000
 ETF_CODE = "512890"
 
@@ -32,17 +34,8 @@ SELL_VOLUME_THRESHOLDS = [0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]  # 缩量倍
 
 
 def fetch_etf_local():
-    """从本地 backtest_result.json 读取 ETF 数据并模拟成交量"""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    json_path = os.path.join(script_dir, 'backtest_result.json')
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    daily = data['daily_values']['strategy']
-    df = pd.DataFrame([{
-        'date': pd.to_datetime(d['date']), 
-        'close': d['close']
-    } for d in daily])
-    df = df.sort_values('date').reset_index(drop=True)
+    """从本地价格文件（backtest_prices.npy）读取 ETF 数据并模拟成交量"""
+    df = load_strategy_prices()
     
     # 模拟成交量：基于价格波动率
     df['return'] = df['close'].pct_change().fillna(0)
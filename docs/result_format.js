@@ -0,0 +1,141 @@
+// 回测结果 v2 列式布局 -> v1 结构（daily_values 逐日对象列表）
+// 格式说明见 backtest/result_format.py
+function expandBacktestResult(data) {
+    if (!data || data.format !== 2) return data;
+
+    const axis = data.dates;
+    const dailyValues = {};
+    for (const [name, entry] of Object.entries(data.series)) {
+        const dates = entry.index
+            ? entry.index.map(i => axis[i])
+            : axis.slice(entry.start, entry.start + entry.length);
+        const keys = Object.keys(entry.columns);
+        const columns = keys.map(k => entry.columns[k]);
+        const rows = new Array(dates.length);
+        for (let i = 0; i < dates.length; i++) {
+            const row = { date: dates[i] };
+            for (let j = 0; j < keys.length; j++) row[keys[j]] = columns[j][i];
+            rows[i] = row;
+        }
+        dailyValues[name] = rows;
+    }
+
+    const result = {};
+    for (const [key, value] of Object.entries(data)) {
+        if (key !== 'format' && key !== 'dates' && key !== 'series') result[key] = value;
+    }
+    result.daily_values = dailyValues;
+    return result;
+}
+
+// 先加载降采样文件（backtest_result.lod300.json）快速出图，渲染后再加载完整数据替换
+// onData(data, isFinal) 可能被调用两次；降采样文件不存在时只调用一次
+async function loadBacktestResult(onData, coarseLevel = 300) {
+    const fetchJson = async (url) => {
+        const res = await fetch(url);
+        if (!res.ok) throw new Error(`${url} not found`);
+        return expandBacktestResult(await res.json());
+    };
+
+    // 粗粒度数据渲染后再请求完整文件，慢速网络下两者不争抢带宽
+    try {
+        const coarse = await fetchJson(`backtest_result.lod${coarseLevel}.json`);
+        onData(coarse, false);
+    } catch (e) {
+        // 无降采样文件时直接加载完整数据
+    }
+    onData(await fetchJson('backtest_result.json'), true);
+}
+
+// 分片加载（backtest_manifest.json + shards/，见 backtest/sharded_export.py）
+// 首屏：清单 + 日期轴 + 交易记录 + first 中各曲线的降采样分片 -> onData(data, false)
+// 首屏渲染后再加载全部曲线的完整分片 -> onData(data, true)
+// 没有清单时退回 loadBacktestResult
+async function loadShardedResult(onData, first = [], level = 300) {
+    const cache = {};
+    const fetchJson = (url, options) => {
+        if (!cache[url]) {
+            cache[url] = fetch(url, options).then(res => {
+                if (!res.ok) throw new Error(`${url} not found`);
+                return res.json();
+            });
+        }
+        return cache[url];
+    };
+
+    let manifest;
+    try {
+        manifest = await fetchJson('backtest_manifest.json', { cache: 'no-cache' });
+    } catch (e) {
+        return loadBacktestResult(onData, level);
+    }
+
+    const assemble = async (files) => {
+        const names = Object.keys(files);
+        const tradeKeys = Object.keys(manifest.trades);
+        const [dates, trades, series] = await Promise.all([
+            fetchJson(manifest.dates),
+            Promise.all(tradeKeys.map(k => fetchJson(manifest.trades[k]))),
+            Promise.all(names.map(n => fetchJson(files[n])))
+        ]);
+        const data = { format: 2, dates, series: {} };
+        for (const [key, value] of Object.entries(manifest)) {
+            if (!['format', 'dates', 'series', 'trades'].includes(key)) data[key] = value;
+        }
+        tradeKeys.forEach((k, i) => { data[k] = trades[i]; });
+        names.forEach((n, i) => { data.series[n] = series[i]; });
+        return expandBacktestResult(data);
+    };
+
+    const firstFiles = {};
+    for (const name of first) {
+        const entry = manifest.series[name];
+        if (entry) firstFiles[name] = entry.lod[level] || entry.file;
+    }
+    const fullFiles = {};
+    for (const [name, entry] of Object.entries(manifest.series)) fullFiles[name] = entry.file;
+
+    // 首屏分片渲染后再请求完整分片，慢速网络下不与首屏争抢带宽
+    if (first.length) onData(await assemble(firstFiles), false);
+    onData(await assemble(fullFiles), true);
+}
+
+// 二进制列式文件（backtest_result.bin，格式见 backtest/binary_export.py）
+// 返回 { meta, dates, series: {name: {dates, columns: {col: Float32Array | Float64Array}}} }
+// dates 为 Int32Array（距 1970-01-01 的天数，dayToLabel 转字符串）
+// 连续曲线的数组都是 ArrayBuffer 上的视图，不复制（typed array 按平台字节序读取，浏览器均为小端）
+const BINARY_ARRAY_TYPES = { '<f4': Float32Array, '<f8': Float64Array, '<i4': Int32Array };
+
+function parseBinaryResult(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== 'RSIB') throw new Error('not a binary backtest result');
+    const headerLength = view.getUint32(8, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 12, headerLength)));
+    const base = 12 + headerLength;
+    const array = (d) => new BINARY_ARRAY_TYPES[d.dtype](buffer, base + d.offset, d.length);
+
+    const dates = array(header.dates);
+    const series = {};
+    for (const [name, entry] of Object.entries(header.series)) {
+        const columns = {};
+        for (const [key, desc] of Object.entries(entry.columns)) columns[key] = array(desc);
+        series[name] = {
+            dates: entry.index
+                ? Int32Array.from(array(entry.index), i => dates[i])
+                : dates.subarray(entry.start, entry.start + entry.length),
+            columns
+        };
+    }
+    return { meta: header.meta, dates, series };
+}
+
+async function loadBinaryResult(url = 'backtest_result.bin') {
+    const res = await fetch(url);
+    if (!res.ok) throw new Error(`${url} not found`);
+    return parseBinaryResult(await res.arrayBuffer());
+}
+
+function dayToLabel(day) {
+    return new Date(day * 86400000).toISOString().slice(0, 10);
+}
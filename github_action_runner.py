@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import smtplib
 from email.mime.text import MIMEText
@@ -8,6 +9,9 @@ import requests
 import pandas as pd
 import numpy as np
 
+# 行情数据通过 backtest/market_data.py 的本地仓库获取
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backtest"))
+
 # ==========================================
 # 配置读取 (优先从环境变量读取)
 # ==========================================
@@ -95,19 +99,13 @@ def fetch_etf_data(code, days=60):
     使用 akshare 获取ETF历史数据
     返回最近N天的数据用于计算RSI
     """
-    import akshare as ak
+    from market_data import get_etf_history
     
     print(f"[{datetime.now().strftime('%H:%M:%S')}] 开始获取 {code} 数据...")
     
     try:
-        # 获取ETF日线数据（前复权）
-        df = ak.fund_etf_hist_em(symbol=code, period="daily", adjust="qfq")
-        df['日期'] = pd.to_datetime(df['日期'])
-        df = df.rename(columns={
-            '日期': 'date',
-            '收盘': 'close'
-        })
-        df = df.sort_values('date').reset_index(drop=True)
+        # 获取ETF日线数据（前复权，本地行情仓库增量刷新）
+        df = get_etf_history(code, period="daily", adjust="qfq")
         
         # 只取最近N天
         df = df.tail(days).reset_index(drop=True)
@@ -143,6 +141,18 @@ def fetch_rsi_and_price():
     latest_price = latest['close']
     latest_date = latest['date'].strftime('%Y-%m-%d')
     
+    # 盘中用最新分钟价估算临时日线 RSI（获取失败时沿用日线数据）
+    try:
+        from intraday import update_minute_bars, provisional_daily_rsi
+        _, latest_bar = update_minute_bars(ETF_CODE)
+        if latest_bar is not None and latest_bar['time'].normalize() >= latest['date']:
+            rsi_value = provisional_daily_rsi(df, latest_bar['close'], latest_bar['time'], RSI_PERIOD)
+            latest_price = latest_bar['close']
+            latest_date = latest_bar['time'].strftime('%Y-%m-%d %H:%M')
+            print("使用分钟线临时价格计算盘中 RSI")
+    except Exception as e:
+        print(f"获取分钟线失败，使用日线数据: {e}")
+    
     if pd.notna(rsi_value):
         print(f"获取到 RSI({RSI_PERIOD}) EMA: {rsi_value:.2f}")
         print(f"最新价格: {latest_price:.4f}")
@@ -218,18 +228,11 @@ def send_wechat(title, content):
     except Exception as e:
         print(f"微信通知发送失败: {e}")
 
-def main():
-    rsi, price = fetch_rsi_and_price()
-    
-    if rsi is None:
-        print("未能获取有效 RSI 数据，程序结束。")
-        return
-
-    print(f"当前状态: RSI={rsi}, 价格={price}")
-
-    subject = ""
-    content = ""
-
+def build_alert(rsi, price):
+    """
+    根据 RSI 生成提醒的标题和正文
+    RSI 在正常范围内时返回 (None, None)
+    """
     if rsi < RSI_BUY_THRESHOLD:
         subject = f"【买入提醒】{ETF_NAME} RSI低于{RSI_BUY_THRESHOLD}"
         content = f"""当前{ETF_NAME} ({ETF_CODE}) 的 RSI({RSI_PERIOD}) EMA 为 {rsi:.2f}，已低于 {RSI_BUY_THRESHOLD}，建议关注买入机会。
@@ -259,27 +262,28 @@ def main():
 
 当前价格: {price}"""
     else:
-        print(f"RSI 在正常范围内 ({RSI_BUY_THRESHOLD}-{RSI_SELL_THRESHOLD})，无需发送提醒。")
+        return None, None
+    return subject, content
 
-    if subject:
-        print(f"触发条件，准备发送邮件: {subject}")
-        subscribers = fetch_subscriber_emails()
-        if not subscribers:
-            print("没有配置订阅者邮箱，无法发送。")
+def send_alerts(subject, content):
+    """
+    发送邮件和微信提醒
+    """
+    print(f"触发条件，准备发送邮件: {subject}")
+    subscribers = fetch_subscriber_emails()
+    if not subscribers:
+        print("没有配置订阅者邮箱，无法发送。")
+    
+    for email in subscribers:
+        send_email(email, subject, content)
         
-        for email in subscribers:
-            send_email(email, subject, content)
-            
-        # 发送微信通知
-        send_wechat(subject, content)
+    # 发送微信通知
+    send_wechat(subject, content)
 
-    # ==========================================
-    # 生成静态数据文件 (供 GitHub Pages 使用)
-    # ==========================================
-    docs_dir = "docs"
-    if not os.path.exists(docs_dir):
-        os.makedirs(docs_dir)
-    
+def build_status_data(rsi, price):
+    """
+    生成页面展示用的状态数据 (data.json 内容)
+    """
     # GitHub Actions 运行在 UTC 时区，需要转换为北京时间 (UTC+8)
     beijing_time = datetime.utcnow() + timedelta(hours=8)
     
@@ -294,7 +298,7 @@ def main():
         signal = "持有"
         signal_color = "#3b82f6"  # 蓝色
     
-    data = {
+    return {
         "etf_code": ETF_CODE,
         "etf_name": ETF_NAME,
         "rsi": round(rsi, 2),
@@ -309,10 +313,40 @@ def main():
         "backtest_annual": "20.90%",
         "timestamp": beijing_time.strftime("%Y-%m-%d %H:%M:%S") + " (北京时间)"
     }
+
+def write_status_data(rsi, price, docs_dir="docs"):
+    """
+    生成静态数据文件 (供 GitHub Pages 使用)
+    """
+    if not os.path.exists(docs_dir):
+        os.makedirs(docs_dir)
     
+    data = build_status_data(rsi, price)
     with open(os.path.join(docs_dir, "data.json"), "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
     print(f"静态数据已保存至 {docs_dir}/data.json")
+    return data
+
+def main():
+    rsi, price = fetch_rsi_and_price()
+    
+    if rsi is None:
+        print("未能获取有效 RSI 数据，程序结束。")
+        return
+
+    print(f"当前状态: RSI={rsi}, 价格={price}")
+
+    subject, content = build_alert(rsi, price)
+    if subject:
+        send_alerts(subject, content)
+    else:
+        print(f"RSI 在正常范围内 ({RSI_BUY_THRESHOLD}-{RSI_SELL_THRESHOLD})，无需发送提醒。")
+
+    # ==========================================
+    # 生成静态数据文件 (供 GitHub Pages 使用)
+    # ==========================================
+    docs_dir = "docs"
+    write_status_data(rsi, price, docs_dir)
 
     # ==========================================
     # 动态注入订阅服务地址 (从环境变量)
@@ -350,4 +384,20 @@ def main():
             print(f"更新 index.html 失败: {e}")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description=f"{ETF_NAME} RSI 监控")
+    parser.add_argument("--daemon", action="store_true", help="常驻运行，交易时段内按间隔轮询行情")
+    parser.add_argument("--interval", type=int, default=int(os.environ.get("MONITOR_INTERVAL", 30)),
+                        help="轮询间隔（秒），默认 30")
+    parser.add_argument("--quote-source", default=os.environ.get("QUOTE_SOURCE", "eastmoney"),
+                        choices=["eastmoney", "stub"], help="实时行情源，stub 为本地模拟行情")
+    parser.add_argument("--ignore-hours", action="store_true", help="忽略交易时段限制（调试用）")
+    parser.add_argument("--write-docs", action="store_true", help="每次轮询后更新 docs/data.json")
+    args = parser.parse_args()
+
+    if args.daemon:
+        from monitor_daemon import run_daemon
+        run_daemon(args.interval, args.quote_source, args.ignore_hours, args.write_docs)
+    else:
+        main()
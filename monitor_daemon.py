@@ -0,0 +1,218 @@
+"""
+实时监控守护进程 - 常驻内存，交易时段内按固定间隔轮询行情
+
+与 GitHub Actions 每小时冷启动一次不同，守护进程：
+  - 启动时加载一次日线历史，RSI 状态（StreamingRSI）常驻内存
+  - 行情请求复用同一个 HTTP 会话（连接保持）
+  - 交易时段内每 N 秒（默认 30 秒）取一次最新价，用 "历史日线 + 最新价" 计算临时日线 RSI，
+    进入买入/卖出区间时立即发送提醒（同一信号每个交易日只提醒一次）
+  - 每个交易日开盘前重新加载日线历史
+
+用法：
+  python github_action_runner.py --daemon                          # 东方财富实时行情，30 秒轮询
+  python github_action_runner.py --daemon --quote-source stub \\
+      --interval 1 --ignore-hours                                  # 本地模拟行情，随时可运行
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import requests
+
+import github_action_runner as runner  # 同时把 backtest/ 加入 sys.path
+from intraday import StreamingRSI
+from market_data import get_etf_history
+
+TIMEZONE = "Asia/Shanghai"
+DEFAULT_INTERVAL = int(os.environ.get("MONITOR_INTERVAL", 30))
+TRADING_SESSIONS = [((9, 30), (11, 30)), ((13, 0), (15, 0))]
+
+
+def beijing_now():
+    """当前北京时间（不依赖运行环境时区）"""
+    return datetime.utcnow() + timedelta(hours=8)
+
+
+def is_trading_time(now=None):
+    """是否处于 A 股交易时段（周一至周五 9:30-11:30, 13:00-15:00，不含节假日判断）"""
+    now = now or beijing_now()
+    if now.weekday() >= 5:
+        return False
+    t = (now.hour, now.minute)
+    return any(start <= t <= end for start, end in TRADING_SESSIONS)
+
+
+# ============ 行情源 ============
+
+class EastmoneyQuoteSource:
+    """东方财富实时行情（复用 HTTP 会话）"""
+
+    URL = "https://push2.eastmoney.com/api/qt/stock/get"
+
+    def __init__(self, timeout=5):
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": "Mozilla/5.0"})
+        self.timeout = timeout
+
+    @staticmethod
+    def secid(code):
+        # 沪市（5/6 开头）市场代码为 1，深市为 0
+        return f"{1 if code.startswith(('5', '6')) else 0}.{code}"
+
+    def get_quote(self, code):
+        """返回 (最新价, 行情时间)"""
+        params = {"secid": self.secid(code), "fltt": 2, "fields": "f43,f57,f86"}
+        response = self.session.get(self.URL, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json().get("data") or {}
+        price = data.get("f43")
+        if price in (None, "-"):
+            raise ValueError(f"{code} 暂无实时价格")
+        quote_time = datetime.utcfromtimestamp(data["f86"]) + timedelta(hours=8) if data.get("f86") else beijing_now()
+        return float(price), quote_time
+
+
+class StubQuoteSource:
+    """本地模拟行情：按给定价格序列或随机游走生成报价，用于离线调试"""
+
+    def __init__(self, start_price=1.0, volatility=0.002, prices=None, seed=None):
+        self.price = start_price
+        self.volatility = volatility
+        self.prices = list(prices) if prices is not None else None
+        self.rng = np.random.default_rng(seed)
+
+    def get_quote(self, code):
+        if self.prices:
+            self.price = float(self.prices.pop(0))
+        else:
+            self.price *= 1 + self.rng.normal(0, self.volatility)
+        return self.price, beijing_now()
+
+
+def create_quote_source(name, start_price=1.0):
+    if name == "stub":
+        return StubQuoteSource(start_price=start_price)
+    if name == "eastmoney":
+        return EastmoneyQuoteSource()
+    raise ValueError(f"未知行情源: {name}")
+
+
+# ============ 监控状态 ============
+
+class MonitorState:
+    """常驻内存的指标状态（线程安全，供调度任务和 API 共同读取）"""
+
+    def __init__(self, code=runner.ETF_CODE, period=runner.RSI_PERIOD):
+        self.code = code
+        self.period = period
+        self.lock = threading.Lock()
+        self.rsi_state = None
+        self.history = None
+        self.last_close = None
+        self.latest = None           # 最新一次轮询结果
+        self.alerted = set()         # 已发送提醒的 (日期, 信号)
+
+    def refresh_history(self):
+        """重新加载日线历史，用今天之前的收盘价初始化 RSI"""
+        df = get_etf_history(self.code, period="daily", adjust="qfq")
+        today = beijing_now().replace(hour=0, minute=0, second=0, microsecond=0)
+        history = df[df['date'] < today]
+        state = StreamingRSI(self.period).warmup(history['close'])
+        with self.lock:
+            self.history = df
+            self.rsi_state = state
+            self.last_close = float(history['close'].iloc[-1]) if len(history) else None
+        print(f"[{beijing_now().strftime('%H:%M:%S')}] 已加载 {len(history)} 条日线，昨日 RSI={state.value:.2f}")
+
+    def on_quote(self, price, quote_time):
+        """处理一次最新价：计算临时 RSI，需要时发送提醒
+
+        Returns:
+            状态 dict（rsi/price/time/signal）
+        """
+        with self.lock:
+            rsi = self.rsi_state.peek(price)
+            if rsi < runner.RSI_BUY_THRESHOLD:
+                signal = "买入"
+            elif rsi > runner.RSI_SELL_THRESHOLD:
+                signal = "卖出"
+            else:
+                signal = "持有"
+            self.latest = {
+                'rsi': rsi,
+                'price': price,
+                'time': quote_time.strftime('%Y-%m-%d %H:%M:%S'),
+                'signal': signal,
+            }
+            key = (quote_time.date(), signal)
+            should_alert = signal != "持有" and key not in self.alerted
+            if should_alert:
+                self.alerted.add(key)
+
+        if should_alert:
+            subject, content = runner.build_alert(rsi, price)
+            runner.send_alerts(subject, content)
+        return self.latest
+
+    def status(self):
+        """当前状态：有轮询结果时返回最新一次，否则以最后一根日线收盘价计算（不发提醒）"""
+        with self.lock:
+            if self.latest is not None:
+                return dict(self.latest)
+            if self.history is None or not len(self.history):
+                return None
+            last = self.history.iloc[-1]
+            rsi = StreamingRSI(self.period).warmup(self.history['close']).value
+            return {
+                'rsi': rsi,
+                'price': float(last['close']),
+                'time': last['date'].strftime('%Y-%m-%d'),
+                'signal': None,
+            }
+
+
+# ============ 调度 ============
+
+def create_scheduler(state, quote_source, interval=DEFAULT_INTERVAL, ignore_hours=False,
+                     write_docs=False, background=False):
+    """创建调度器：行情轮询任务 + 每日开盘前刷新历史"""
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.schedulers.blocking import BlockingScheduler
+
+    def poll():
+        if not ignore_hours and not is_trading_time():
+            return
+        try:
+            price, quote_time = quote_source.get_quote(state.code)
+        except Exception as e:
+            print(f"[{beijing_now().strftime('%H:%M:%S')}] 获取行情失败: {e}")
+            return
+        latest = state.on_quote(price, quote_time)
+        print(f"[{latest['time']}] 价格 {price:.4f} RSI {latest['rsi']:.2f} {latest['signal']}")
+        if write_docs:
+            runner.write_status_data(latest['rsi'], price)
+
+    scheduler_cls = BackgroundScheduler if background else BlockingScheduler
+    scheduler = scheduler_cls(timezone=TIMEZONE)
+    # 首次立即轮询；须带时区，否则按调度器时区解释主机本地时间，非东八区主机会被当作错过的任务丢弃
+    scheduler.add_job(poll, 'interval', seconds=interval, id='poll_quote',
+                      max_instances=1, coalesce=True, next_run_time=datetime.now(ZoneInfo(TIMEZONE)))
+    scheduler.add_job(state.refresh_history, 'cron', day_of_week='mon-fri', hour=9, minute=15,
+                      id='refresh_history', max_instances=1, coalesce=True)
+    return scheduler
+
+
+def run_daemon(interval=DEFAULT_INTERVAL, quote_source="eastmoney", ignore_hours=False, write_docs=False):
+    """启动守护进程（阻塞运行，Ctrl+C 退出）"""
+    state = MonitorState()
+    state.refresh_history()
+    source = create_quote_source(quote_source, start_price=state.last_close or 1.0)
+    scheduler = create_scheduler(state, source, interval, ignore_hours, write_docs)
+    print(f"监控已启动: {state.code} RSI({state.period})，每 {interval} 秒轮询 ({quote_source})")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        print("监控已停止")